@@ -0,0 +1,253 @@
+"""
+Analisis faktor risiko: tabel kontingensi label skor (rumah/sanitasi/perilaku) x faktor
+demografi/rumah tangga, uji chi-kuadrat, dan rasio odds (odds ratio) per nilai faktor.
+
+Label setiap domain dipetakan ke posisi baris df (1 = Tidak Layak, 0 = Layak, 2 = tanpa
+skor), lalu ketiga label digabung menjadi satu kode status per baris (3 x 3 x 3 = 27).
+Untuk setiap faktor cukup satu bincount atas (kode faktor x 27 + status) untuk mendapat
+tabel kontingensi faktor itu terhadap ketiga domain sekaligus. Hasilnya disimpan per
+versi data (HasilPreprocessing.turunan), jadi berganti domain/faktor hanya membaca tabel.
+
+Nilai p chi-kuadrat dihitung dari fungsi gamma tak lengkap teregulasi (deret dan pecahan
+berlanjut, seperti Numerical Recipes), tanpa scipy.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+from filter_visualisasi import kelompok_usia
+from instrumen import tahap
+from skor import domain_skor
+
+# Faktor yang diuji terhadap setiap domain; "kelompok_usia" dibentuk dari kolom age
+FAKTOR_RISIKO = [
+    "pekerjaan", "total_pendapatan_keluarga_per_bulan", "status_gizi", "perilaku_merokok",
+    "kepemilikan_jkn", "gender", "kelompok_usia", "type_tb", "pekerjaan_kepala_keluarga",
+    "pola_asuh", "status_pernikahan", "jumlah_anggota_keluarga", "mendapatkan_bantuan",
+    "anggota_keluarga_merokok", "status_imunisasi", "status_rumah", "memiliki_hewan_ternak",
+    "kandang_hewan",
+]
+DOMAIN = list(domain_skor)
+# Kode label per domain dalam kode status gabungan
+TIDAK_LAYAK, LAYAK, TANPA_SKOR = 1, 0, 2
+_JUMLAH_STATUS = 3 ** len(DOMAIN)
+# Nilai kritis normal baku untuk selang kepercayaan 95%
+Z_95 = 1.959963984540054
+ALFA = 0.05
+
+_ITERASI_MAKS = 500
+_EPS = 3e-16
+_KECIL = 1e-300
+
+
+def _gamma_p_deret(a, x):
+    # P(a, x) lewat deret, konvergen cepat untuk x < a + 1
+    jumlah = suku = 1.0 / a
+    ap = a
+    for _ in range(_ITERASI_MAKS):
+        ap += 1
+        suku *= x / ap
+        jumlah += suku
+        if abs(suku) < abs(jumlah) * _EPS:
+            break
+    return jumlah * math.exp(-x + a * math.log(x) - math.lgamma(a))
+
+
+def _gamma_q_pecahan(a, x):
+    # Q(a, x) lewat pecahan berlanjut (algoritma Lentz), untuk x >= a + 1
+    b = x + 1 - a
+    c = 1 / _KECIL
+    d = 1 / b
+    h = d
+    for i in range(1, _ITERASI_MAKS):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = _KECIL if abs(d) < _KECIL else d
+        c = b + an / c
+        c = _KECIL if abs(c) < _KECIL else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < _EPS:
+            break
+    return math.exp(-x + a * math.log(x) - math.lgamma(a)) * h
+
+
+def gamma_q(a, x):
+    """Fungsi gamma tak lengkap atas teregulasi Q(a, x) = Γ(a, x) / Γ(a)."""
+    if a <= 0:
+        raise ValueError("a harus positif")
+    if x <= 0:
+        return 1.0
+    if x < a + 1:
+        return max(0.0, 1.0 - _gamma_p_deret(a, x))
+    return _gamma_q_pecahan(a, x)
+
+
+def p_chi_kuadrat(statistik, derajat_bebas):
+    """Nilai p uji chi-kuadrat: P(X >= statistik) untuk X ~ chi-kuadrat(derajat_bebas)."""
+    if derajat_bebas <= 0 or not np.isfinite(statistik):
+        return float("nan")
+    return gamma_q(derajat_bebas / 2, statistik / 2)
+
+
+def uji_chi_kuadrat(tabel):
+    """
+    Uji independensi untuk tabel kontingensi (array r x c, baris/kolom nol dibuang).
+    Mengembalikan (chi2, derajat bebas, p, Cramér's V, persentase sel harapan < 5).
+    """
+    tabel = np.asarray(tabel, dtype=float)
+    tabel = tabel[tabel.sum(axis=1) > 0][:, tabel.sum(axis=0) > 0]
+    r, c = tabel.shape
+    n = tabel.sum()
+    if r < 2 or c < 2:
+        return float("nan"), 0, float("nan"), float("nan"), float("nan")
+    harapan = np.outer(tabel.sum(axis=1), tabel.sum(axis=0)) / n
+    chi2 = float(((tabel - harapan) ** 2 / harapan).sum())
+    derajat_bebas = (r - 1) * (c - 1)
+    cramer_v = math.sqrt(chi2 / (n * (min(r, c) - 1)))
+    return chi2, derajat_bebas, p_chi_kuadrat(chi2, derajat_bebas), cramer_v, float((harapan < 5).mean() * 100)
+
+
+def rasio_odds_2x2(a, b, c, d):
+    """
+    Rasio odds dan selang kepercayaan 95% (metode Woolf) untuk tabel
+    [[a, b], [c, d]] = [[terpapar & Tidak Layak, terpapar & Layak], [lainnya & Tidak Layak, lainnya & Layak]].
+    Jika ada sel nol, semua sel ditambah 0,5 (koreksi Haldane-Anscombe).
+    """
+    a, b, c, d = (np.asarray(v, dtype=float) for v in (a, b, c, d))
+    nol = (a == 0) | (b == 0) | (c == 0) | (d == 0)
+    a, b, c, d = (np.where(nol, v + 0.5, v) for v in (a, b, c, d))
+    log_or = np.log(a * d / (b * c))
+    galat = np.sqrt(1 / a + 1 / b + 1 / c + 1 / d)
+    return np.exp(log_or), np.exp(log_or - Z_95 * galat), np.exp(log_or + Z_95 * galat)
+
+
+def _kode_faktor(df, faktor):
+    """(kode per baris, daftar nilai) faktor; None jika kolom tidak ada."""
+    if faktor == "kelompok_usia":
+        if "age" not in df.columns:
+            return None
+        s = kelompok_usia(df["age"])
+    elif faktor in df.columns:
+        s = df[faktor]
+    else:
+        return None
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return s.cat.codes.to_numpy().astype(np.int64), [str(v) for v in s.cat.categories]
+    kode, nilai = pd.factorize(s, sort=True)
+    return kode.astype(np.int64), [str(v) for v in nilai]
+
+
+class AnalisisRisiko:
+    """
+    Tabel kontingensi faktor x label untuk semua pasangan (domain, faktor) satu versi data.
+    Pasangan yang faktornya termasuk kolom skor domain itu (mis. perilaku_merokok untuk
+    perilaku) tidak diuji karena labelnya dibentuk dari faktor itu sendiri.
+    """
+
+    def __init__(self, df: pd.DataFrame, skor: dict, faktor=None):
+        self.domain = [dom for dom in DOMAIN if dom in skor]
+        self.nilai = {}
+        # tabel[faktor] = array (jumlah nilai, domain, 2) berisi [Layak, Tidak Layak]
+        self.tabel = {}
+        with tahap("risiko:kontingensi", baris=len(df)):
+            # Kode status gabungan per baris; label dipetakan lewat posisi index (bukan .loc),
+            # jadi tetap benar walaupun skor hanya berisi sebagian baris (dropna)
+            status = np.zeros(len(df), dtype=np.int64)
+            for i, dom in enumerate(DOMAIN):
+                kode_dom = np.full(len(df), TANPA_SKOR, dtype=np.int64)
+                if dom in skor:
+                    posisi = df.index.get_indexer(skor[dom].index)
+                    ada = posisi >= 0
+                    kode_dom[posisi[ada]] = np.where(skor[dom]["Label"].to_numpy()[ada] == "Tidak Layak", TIDAK_LAYAK, LAYAK)
+                status += kode_dom * 3 ** i
+            for faktor in faktor or FAKTOR_RISIKO:
+                hasil_kode = _kode_faktor(df, faktor)
+                if hasil_kode is None:
+                    continue
+                kode, nilai = hasil_kode
+                valid = kode >= 0
+                jumlah = np.bincount(
+                    kode[valid] * _JUMLAH_STATUS + status[valid], minlength=len(nilai) * _JUMLAH_STATUS
+                ).reshape(len(nilai), _JUMLAH_STATUS)
+                # Marginal per domain: jumlah status dengan digit domain tertentu
+                digit = (np.arange(_JUMLAH_STATUS)[None, :] // 3 ** np.arange(len(DOMAIN))[:, None]) % 3
+                self.tabel[faktor] = np.stack([
+                    np.stack([jumlah[:, digit[i] == LAYAK].sum(axis=1), jumlah[:, digit[i] == TIDAK_LAYAK].sum(axis=1)], axis=1)
+                    for i in range(len(DOMAIN))
+                ], axis=1)
+                self.nilai[faktor] = nilai
+        self._peringkat = None
+
+    @classmethod
+    def dari_hasil(cls, hasil):
+        return cls(hasil.df, hasil.skor)
+
+    def faktor(self, domain=None):
+        """Faktor yang tersedia (dan boleh diuji terhadap domain, jika diberikan)."""
+        return [f for f in self.tabel if domain is None or f not in domain_skor[domain][0]]
+
+    def kontingensi(self, domain, faktor) -> pd.DataFrame:
+        """Tabel kontingensi: satu baris per nilai faktor, kolom Layak, Tidak Layak, Total, % Tidak Layak."""
+        tabel = self.tabel[faktor][:, DOMAIN.index(domain), :]
+        hasil = pd.DataFrame(tabel, index=pd.Index(self.nilai[faktor], name=faktor), columns=["Layak", "Tidak Layak"])
+        hasil = hasil[hasil.sum(axis=1) > 0]
+        hasil["Total"] = hasil["Layak"] + hasil["Tidak Layak"]
+        hasil["% Tidak Layak"] = hasil["Tidak Layak"] / hasil["Total"] * 100
+        return hasil
+
+    def rasio_odds(self, domain, faktor) -> pd.DataFrame:
+        """
+        Rasio odds Tidak Layak untuk setiap nilai faktor dibanding semua nilai lain,
+        dengan selang kepercayaan 95%. Urut rasio odds terbesar.
+        """
+        tabel = self.kontingensi(domain, faktor)
+        a = tabel["Tidak Layak"].to_numpy()
+        b = tabel["Layak"].to_numpy()
+        c = a.sum() - a
+        d = b.sum() - b
+        rasio, bawah, atas = rasio_odds_2x2(a, b, c, d)
+        hasil = tabel[["Total", "% Tidak Layak"]].copy()
+        hasil["Rasio Odds"] = rasio
+        hasil["CI 95% Bawah"] = bawah
+        hasil["CI 95% Atas"] = atas
+        hasil["Signifikan"] = (bawah > 1) | (atas < 1)
+        return hasil.sort_values("Rasio Odds", ascending=False)
+
+    def peringkat(self) -> pd.DataFrame:
+        """
+        Semua pasangan (domain, faktor) diurutkan menurut kekuatan asosiasi (Cramér's V),
+        dengan hasil uji chi-kuadrat dan nilai faktor berisiko tertinggi: rasio odds terbesar
+        di antara nilai yang selang kepercayaannya di atas 1 (kosong jika tidak ada).
+        """
+        if self._peringkat is None:
+            baris = []
+            for domain in self.domain:
+                for faktor in self.faktor(domain):
+                    tabel = self.kontingensi(domain, faktor)
+                    if len(tabel) < 2:
+                        continue
+                    chi2, derajat_bebas, p, cramer_v, sel_kecil = uji_chi_kuadrat(tabel[["Layak", "Tidak Layak"]])
+                    if not derajat_bebas:
+                        continue
+                    odds = self.rasio_odds(domain, faktor)
+                    berisiko = odds[odds["CI 95% Bawah"] > 1]
+                    teratas = berisiko.iloc[0] if len(berisiko) else None
+                    baris.append({
+                        "Domain": domain, "Faktor": faktor, "n": int(tabel["Total"].sum()),
+                        "Chi-kuadrat": chi2, "db": derajat_bebas, "p": p, "Cramér's V": cramer_v,
+                        "Signifikan": p < ALFA,
+                        "Nilai Berisiko": None if teratas is None else teratas.name,
+                        "Rasio Odds": np.nan if teratas is None else teratas["Rasio Odds"],
+                        "CI 95%": None if teratas is None else f"{teratas['CI 95% Bawah']:.2f}–{teratas['CI 95% Atas']:.2f}",
+                        "% Sel Harapan < 5": sel_kecil,
+                    })
+            kolom = ["Domain", "Faktor", "n", "Chi-kuadrat", "db", "p", "Cramér's V", "Signifikan",
+                     "Nilai Berisiko", "Rasio Odds", "CI 95%", "% Sel Harapan < 5"]
+            self._peringkat = pd.DataFrame(baris, columns=kolom).sort_values(
+                ["Signifikan", "Cramér's V"], ascending=False, kind="stable"
+            ).reset_index(drop=True)
+        return self._peringkat
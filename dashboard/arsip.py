@@ -0,0 +1,254 @@
+"""
+Arsip lokal data kasus dalam format kolumnar Arrow IPC (Feather v2), dipartisi
+per bulan date_start dan per puskesmas:
+
+    data/kasus/year_month=2024-09/puskesmas=Puskesmas%20Genuk/kasus.arrow
+
+File Arrow IPC tanpa kompresi bisa dibaca lewat memory mapping: buffer kolom
+langsung dipetakan dari file (tanpa parsing teks seperti CSV), dan hanya kolom yang
+diminta yang disentuh. Filter puskesmas/bulan cukup memilih folder partisi dari
+namanya, file partisi lain tidak dibuka sama sekali.
+
+Yang disimpan adalah data hasil ingest (tipe ringkas, Categorical sebagai dictionary,
+duplikasi pasien + date_start dibuang). Indeks hash kasus yang sudah tersimpan
+(dedup.IndeksHash, folder _indeks) membuat baris yang sama persis dengan isi arsip
+dilewati tanpa membuka partisinya, jadi upload ulang ekspor yang tumpang tindih murah. Imputasi modus tetap dilakukan di preprocessing
+karena nilai pengisinya bergantung pada seluruh data yang sedang dianalisis.
+"""
+import hashlib
+import os
+from urllib.parse import quote, unquote
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from dedup import SAMA, IndeksHash, buang_duplikat, ringkas_status
+from skema import (
+    fields_order, kolom_bulat, kolom_enumerasi, kolom_numerik, kolom_tanggal, kompakkan, gabung_data, urutkan_kategori
+)
+
+FOLDER_ARSIP = os.environ.get(
+    "TBC_ARSIP_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "kasus")
+)
+# Kolom partisi (nama folder), urut dari luar ke dalam
+KOLOM_PARTISI = ["year_month", "puskesmas"]
+KUNCI_ALAMI = ["pasien", "date_start"]
+NAMA_FILE = "kasus.arrow"
+FILE_INDEKS = os.path.join("_indeks", "dedup.npz")
+# Nilai partisi untuk puskesmas kosong / date_start tidak valid (dibaca kembali sebagai NaN)
+PARTISI_KOSONG = "__HIVE_DEFAULT_PARTITION__"
+
+
+# Tipe Arrow per kolom file (tanpa kolom partisi). Tipe ditetapkan dari skema, bukan dari
+# isi partisi, agar semua file sama skemanya (mis. kolom yang kosong semua tetap string)
+_TIPE_BULAT = {"Int32": pa.int32(), "Int16": pa.int16()}
+
+
+def skema_arsip() -> pa.Schema:
+    kolom = []
+    for col in fields_order:
+        if col in KOLOM_PARTISI:
+            continue
+        if col in kolom_enumerasi or col in kolom_tanggal:
+            tipe = pa.dictionary(pa.int32(), pa.string())
+        elif col in kolom_bulat:
+            tipe = _TIPE_BULAT[kolom_bulat[col]]
+        elif col in kolom_numerik:
+            tipe = pa.float64()
+        else:
+            tipe = pa.string()
+        kolom.append(pa.field(col, tipe))
+    return pa.schema(kolom)
+
+
+def _nilai_partisi(nilai):
+    return PARTISI_KOSONG if nilai is None or pd.isna(nilai) or nilai == "NaT" else quote(str(nilai), safe="")
+
+
+def _path_partisi(folder, bulan, puskesmas):
+    return os.path.join(folder, f"year_month={_nilai_partisi(bulan)}", f"puskesmas={_nilai_partisi(puskesmas)}", NAMA_FILE)
+
+
+def _bulan(df):
+    tanggal = pd.to_datetime(df["date_start"], errors="coerce") if "date_start" in df.columns \
+        else pd.Series(pd.NaT, index=df.index)
+    return tanggal.dt.strftime("%Y-%m")
+
+
+def _siapkan(df):
+    """Tipe ringkas untuk disimpan: enumerasi & tanggal (teks, sedikit nilai unik) jadi dictionary."""
+    df = kompakkan(df.reindex(columns=fields_order))
+    for col in kolom_tanggal:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    return df
+
+
+def _buang_duplikat(df):
+    # Kasus yang sama (pasien + date_start) cukup disimpan sekali: versi terakhir yang menang
+    return buang_duplikat(df, KUNCI_ALAMI, keep="last")
+
+
+def _tulis_ipc(df, path):
+    skema = skema_arsip()
+    tabel = pa.Table.from_pandas(df.reindex(columns=skema.names), schema=skema, preserve_index=False)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Tulis ke file sementara dulu agar pembaca lain tidak melihat file setengah jadi
+    sementara = path + ".tmp"
+    with pa.OSFile(sementara, "wb") as sink, ipc.new_file(sink, tabel.schema) as penulis:
+        penulis.write_table(tabel)
+    os.replace(sementara, path)
+
+
+def _baca_tabel(path):
+    # Buffer tabel menunjuk langsung ke halaman file yang dipetakan (zero-copy)
+    with pa.memory_map(path, "r") as sumber:
+        return ipc.open_file(sumber).read_all()
+
+
+def _baca_ipc(path):
+    return _baca_tabel(path).to_pandas()
+
+
+def indeks_arsip(folder: str = FOLDER_ARSIP) -> IndeksHash:
+    """Indeks hash kasus di arsip; dibangun sekali dari isi arsip jika filenya belum ada."""
+    indeks = IndeksHash(os.path.join(folder, FILE_INDEKS), KUNCI_ALAMI)
+    if not indeks.ada and ada_arsip(folder):
+        indeks.tambahkan(_siapkan(muat_arsip(folder=folder)))
+        indeks.simpan()
+    return indeks
+
+
+def cocokkan_arsip(df: pd.DataFrame, folder: str = FOLDER_ARSIP) -> dict:
+    """
+    Jumlah kasus df yang baru / sama persis / versi berubah dibanding isi arsip, setelah
+    duplikasi di dalam df sendiri dibuang ("duplikat" = jumlah baris yang dibuang itu).
+    """
+    data = _buang_duplikat(_siapkan(df))
+    return ringkas_status(indeks_arsip(folder).cocokkan(data)) | {"duplikat": len(df) - len(data)}
+
+
+def simpan_arsip(df: pd.DataFrame, folder: str = FOLDER_ARSIP, progress=None) -> dict:
+    """
+    Menyimpan (upsert) data kasus ke arsip. Baris yang sama persis dengan isi arsip
+    (menurut indeks hash) dilewati; hanya partisi bulan x puskesmas dari baris sisanya
+    yang ditulis ulang: isi lama partisi itu digabung dengan baris baru, lalu duplikasi
+    pasien + date_start dibuang (baris baru yang menang).
+    progress: fungsi opsional progress(fraksi, jumlah_partisi_selesai).
+    Mengembalikan {"partisi": jumlah partisi ditulis, "baris": jumlah baris di partisi itu,
+    "dilewati": jumlah baris yang sudah ada di arsip}.
+    """
+    # Versi lama dari kasus yang sama di df tidak perlu dicocokkan (tetap kalah oleh versi terakhir)
+    data = _buang_duplikat(_siapkan(df))
+    indeks = indeks_arsip(folder)
+    sudah_ada = indeks.cocokkan(data) == SAMA
+    data = data[~sudah_ada]
+    kunci_partisi = [_bulan(data).rename("year_month"), data["puskesmas"].astype(object).rename("puskesmas_partisi")]
+    kelompok = data.groupby(kunci_partisi, dropna=False, sort=False)
+    jumlah_baris = 0
+    for i, ((bulan, puskesmas), bagian) in enumerate(kelompok, start=1):
+        path = _path_partisi(folder, bulan, puskesmas)
+        bagian = bagian.drop(columns=["puskesmas"])
+        if os.path.exists(path):
+            bagian = gabung_data([_baca_ipc(path), bagian])
+        bagian = _buang_duplikat(bagian.reset_index(drop=True))
+        _tulis_ipc(bagian, path)
+        jumlah_baris += len(bagian)
+        if progress is not None:
+            progress(i / kelompok.ngroups, i)
+    # Indeks diperbarui setelah semua partisi tertulis (jika gagal di tengah, simpan ulang aman)
+    if len(data):
+        indeks.tambahkan(data)
+        indeks.simpan()
+    return {"partisi": kelompok.ngroups, "baris": jumlah_baris, "dilewati": int(sudah_ada.sum())}
+
+
+def _file_partisi(folder):
+    """(nilai partisi {year_month, puskesmas}, path file) untuk setiap partisi, urut path."""
+    if not os.path.isdir(folder):
+        return
+    for akar, subfolder, files in os.walk(folder):
+        subfolder.sort()
+        if NAMA_FILE not in files:
+            continue
+        bagian = dict(s.split("=", 1) for s in os.path.relpath(akar, folder).split(os.sep) if "=" in s)
+        nilai = {
+            col: (None if bagian.get(col, PARTISI_KOSONG) == PARTISI_KOSONG else unquote(bagian[col]))
+            for col in KOLOM_PARTISI
+        }
+        yield nilai, os.path.join(akar, NAMA_FILE)
+
+
+def ada_arsip(folder: str = FOLDER_ARSIP) -> bool:
+    return next(_file_partisi(folder), None) is not None
+
+
+def daftar_partisi(folder: str = FOLDER_ARSIP) -> pd.DataFrame:
+    """Isi arsip per partisi (year_month, puskesmas, ukuran file) tanpa membaca data."""
+    baris = [
+        nilai | {"ukuran_mb": os.path.getsize(path) / (1024 * 1024)}
+        for nilai, path in _file_partisi(folder)
+    ]
+    return pd.DataFrame(baris, columns=KOLOM_PARTISI + ["ukuran_mb"])
+
+
+def versi_arsip(folder: str = FOLDER_ARSIP) -> str:
+    """Penanda versi isi arsip (path, ukuran, waktu ubah setiap file); berubah setiap ada partisi ditulis."""
+    h = hashlib.blake2b(digest_size=16)
+    for _, path in _file_partisi(folder):
+        info = os.stat(path)
+        h.update(f"{os.path.relpath(path, folder)}|{info.st_size}|{info.st_mtime_ns}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def fingerprint_arsip(kolom=None, puskesmas=None, bulan_awal=None, bulan_akhir=None, folder: str = FOLDER_ARSIP) -> str:
+    """Kunci cache preprocessing untuk satu pembacaan arsip (filter + proyeksi + versi isi)."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(b"arsip|")
+    h.update(repr((kolom, sorted(puskesmas or []), bulan_awal, bulan_akhir)).encode("utf-8"))
+    h.update(versi_arsip(folder).encode("utf-8"))
+    return h.hexdigest()
+
+
+def muat_arsip(kolom=None, puskesmas=None, bulan_awal=None, bulan_akhir=None, folder: str = FOLDER_ARSIP) -> pd.DataFrame:
+    """
+    Membaca data kasus dari arsip.
+    kolom      : proyeksi kolom (mis. ["puskesmas", "pasien"]); None = semua kolom fields_order.
+                 "year_month" boleh diminta (diambil dari nama folder partisi).
+    puskesmas  : daftar puskesmas; None = semua.
+    bulan_awal/bulan_akhir: "YYYY-MM" inklusif; hanya folder partisi yang cocok yang dibuka.
+    """
+    if kolom is None:
+        kolom = list(fields_order)
+    nama_file = skema_arsip().names
+    kolom_file = [c for c in kolom if c in nama_file]
+    kolom_partisi = [c for c in kolom if c in KOLOM_PARTISI]
+    puskesmas = {str(p) for p in puskesmas} if puskesmas else None
+
+    tabel = []
+    for nilai, path in _file_partisi(folder):
+        # Filter pada nama folder; partisi tanpa nilai tidak lolos filter apa pun
+        if puskesmas is not None and nilai["puskesmas"] not in puskesmas:
+            continue
+        if bulan_awal and (nilai["year_month"] is None or nilai["year_month"] < str(bulan_awal)):
+            continue
+        if bulan_akhir and (nilai["year_month"] is None or nilai["year_month"] > str(bulan_akhir)):
+            continue
+        bagian = _baca_tabel(path).select(kolom_file)
+        for col in kolom_partisi:
+            # Kolom partisi sebagai dictionary satu nilai (jadi Categorical di pandas)
+            indeks = pa.array(np.zeros(len(bagian), dtype=np.int32), mask=np.full(len(bagian), nilai[col] is None))
+            kamus = pa.array([] if nilai[col] is None else [nilai[col]], type=pa.string())
+            bagian = bagian.append_column(col, pa.DictionaryArray.from_arrays(indeks, kamus))
+        tabel.append(bagian)
+    if not tabel:
+        return kompakkan(pd.DataFrame(columns=kolom))
+
+    df = pa.concat_tables(tabel).to_pandas()
+    for col, tipe in kolom_bulat.items():
+        if col in df.columns:
+            df[col] = df[col].astype(tipe)
+    # Kamus tiap file digabung menurut urutan kemunculan; samakan dengan urutan option_dict
+    return urutkan_kategori(df).reindex(columns=kolom)
@@ -0,0 +1,103 @@
+"""
+Cek kesamaan hasil dan benchmark penghitung Detail Kategori (Rumah/Sanitasi/Perilaku):
+str.contains / apply(lambda) per kolom (cara lama) vs tabel aturan detail_kategori.py.
+
+Jalankan dari folder dashboard:
+    python bench_detail.py
+    python bench_detail.py --ukuran 1000 100000 1000000
+"""
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from detail_kategori import ATURAN_DETAIL, hitung_detail
+from ingest import baca_csv_bertahap
+
+CSV_CONTOH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql (17).csv")
+
+
+def detail_lama(df):
+    # Implementasi lama dari app.py, disimpan sebagai acuan
+    rumah = {
+        "Luas ventilasi ≤ 10% dari luas lantai": df['ventilasi'].str.contains('luas ventilasi < 10%', case=False, na=False).sum(),
+        "Pencahayaan kurang terang, kurang jelas untuk membaca normal": df['pencahayaan'].str.contains('kurang terang', case=False, na=False).sum(),
+        "Lubang asap dapur dengan luas ventilasi < 10% dari luas lantai dapur": df['lubang_asap_dapur'].str.contains('luas ventilasi < 10%', case=False, na=False).sum(),
+        "Tidak Ada Jendela di Rumah": df['ventilasi'].str.contains('tidak ada', case=False, na=False).sum(),
+        "Tidak Ada Langit-Langit": df['langit_langit'].str.contains('tidak ada', case=False, na=False).sum(),
+        "Lantai Papan/anyaman bambu/plester retak berdebu": df['lantai'].str.contains('papan|anyaman bambu|plester retak', case=False, na=False).sum(),
+        "Tidak ada lubang asap dapur": df['lubang_asap_dapur'].str.contains('tidak ada', case=False, na=False).sum(),
+        "Lantai Tanah": df['lantai'].str.contains('tanah', case=False, na=False).sum(),
+    }
+    sanitasi = {
+        "Jamban bukan leher angsa, tidak bertutup & dialirkan ke sungai": df['jamban'].astype(object).apply(lambda x: 'tidak bertutup' in str(x).lower() and 'sungai' in str(x).lower()).sum(),
+        "Sarana air bersih bukan milik sendiri & tidak memenuhi syarat kesehatan": df['sarana_air_bersih'].astype(object).apply(lambda x: 'bukan milik sendiri' in str(x).lower() and 'tidak memenuhi' in str(x).lower()).sum(),
+        "Tidak ada Sarana Air Bersih": df['sarana_air_bersih'].astype(object).apply(lambda x: 'tidak ada' in str(x).lower()).sum(),
+        "SPAL diresapkan tetapi mencemari sumber air (jarak <10m)": df['sarana_pembuangan_air_limbah'].astype(object).apply(lambda x: 'diresapkan' in str(x).lower() and 'mencemari' in str(x).lower()).sum(),
+        "Tidak ada jamban": df['jamban'].astype(object).apply(lambda x: 'tidak ada' in str(x).lower()).sum(),
+        "Jamban bukan leher angsa, ada tutup & dialirkan ke sungai": df['jamban'].astype(object).apply(lambda x: 'bukan leher angsa' in str(x).lower() and 'tutup' in str(x).lower() and 'sungai' in str(x).lower()).sum(),
+        "Tidak ada Sarana Pembuangan Sampah": df['sarana_pembuangan_sampah'].astype(object).apply(lambda x: 'tidak ada' in str(x).lower()).sum(),
+        "Tidak ada SPAL": df['sarana_pembuangan_air_limbah'].astype(object).apply(lambda x: 'tidak ada' in str(x).lower()).sum(),
+        "Sarana air bersih milik sendiri & tidak memenuhi syarat kesehatan": df['sarana_air_bersih'].astype(object).apply(lambda x: 'milik sendiri' in str(x).lower() and 'tidak memenuhi' in str(x).lower()).sum(),
+        "Jamban bukan leher angsa, ada tutup & septic tank": df['jamban'].astype(object).apply(lambda x: 'bukan leher angsa' in str(x).lower() and 'tutup' in str(x).lower() and 'septic tank' in str(x).lower()).sum(),
+        "Sarana Pembuangan Sampah tidak kedap air dan tidak tertutup": df['sarana_pembuangan_sampah'].astype(object).apply(lambda x: 'tidak kedap' in str(x).lower() and 'tidak tertutup' in str(x).lower()).sum(),
+        "SPAL bukan milik sendiri & memenuhi syarat kesehatan": df['sarana_pembuangan_air_limbah'].astype(object).apply(lambda x: 'bukan milik sendiri' in str(x).lower() and 'memenuhi' in str(x).lower()).sum(),
+        "SPAL diresapkan ke selokan terbuka": df['sarana_pembuangan_air_limbah'].astype(object).apply(lambda x: 'diresapkan' in str(x).lower() and 'selokan terbuka' in str(x).lower()).sum(),
+        "Sarana air bersih bukan milik sendiri & memenuhi syarat kesehatan": df['sarana_air_bersih'].astype(object).apply(lambda x: 'bukan milik sendiri' in str(x).lower() and 'memenuhi' in str(x).lower()).sum(),
+        "Sarana Pembuangan Sampah kedap air dan tidak tertutup": df['sarana_pembuangan_sampah'].astype(object).apply(lambda x: 'kedap air' in str(x).lower() and 'tidak tertutup' in str(x).lower()).sum()
+    }
+    perilaku = {
+        "BAB di sungai / kebun / kolam / sembarangan": df['membuang_tinja'].astype(object).apply(lambda x: any(word in str(x).lower() for word in ['sungai', 'kebun', 'kolam', 'sembarangan'])).sum(),
+        "Tidak CTPS": df['kebiasaan_ctps'].astype(object).apply(lambda x: 'tidak' in str(x).lower()).sum(),
+        "Tidak pernah membersihkan rumah dan halaman": df['membersihkan_rumah'].astype(object).apply(lambda x: 'tidak pernah' in str(x).lower()).sum(),
+        "Buang sampah ke sungai / kebun / kolam / sembarangan / dibakar": df['membuang_sampah'].astype(object).apply(lambda x: any(word in str(x).lower() for word in ['sungai', 'kebun', 'kolam', 'sembarangan', 'dibakar'])).sum(),
+        "Tidak pernah buka jendela ruang keluarga": df['membuka_jendela_ruang_keluarga'].astype(object).apply(lambda x: 'tidak pernah' in str(x).lower()).sum(),
+        "Tidak pernah buka jendela kamar tidur": df['membuka_jendela_kamar_tidur'].astype(object).apply(lambda x: 'tidak pernah' in str(x).lower()).sum(),
+    }
+    return {"rumah": rumah, "sanitasi": sanitasi, "perilaku": perilaku}
+
+
+def detail_baru(df):
+    return {nama: hitung_detail(df, aturan) for nama, aturan in ATURAN_DETAIL.items()}
+
+
+def cek_kesamaan(df, keterangan):
+    """Memastikan setiap penghitung (label, urutan, dan nilai) sama persis dengan cara lama."""
+    lama = detail_lama(df)
+    baru = detail_baru(df)
+    for nama in ATURAN_DETAIL:
+        acuan = {k: int(v) for k, v in lama[nama].items()}
+        if list(acuan.items()) != list(baru[nama].items()):
+            raise AssertionError(f"Detail {nama} ({keterangan}) berbeda dengan implementasi lama")
+        print(f"[OK] detail {nama} ({keterangan}): {len(acuan)} penghitung identik")
+
+
+def waktu(fungsi, df):
+    mulai = time.perf_counter()
+    fungsi(df)
+    return time.perf_counter() - mulai
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=CSV_CONTOH)
+    parser.add_argument("--ukuran", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    # Data dibandingkan dalam dua bentuk: teks biasa (read_csv) dan Categorical (ingest)
+    df_teks = pd.read_csv(args.csv, sep=';', encoding='utf-8')
+    df_ringkas = baca_csv_bertahap(args.csv).df
+    cek_kesamaan(df_teks, "teks")
+    cek_kesamaan(df_ringkas, "categorical")
+
+    print(f"\n{'baris':>10} {'lama (s)':>10} {'aturan (s)':>12} {'speedup':>10}")
+    for n in args.ukuran:
+        sampel = df_ringkas.sample(n=n, replace=True, random_state=0).reset_index(drop=True)
+        t_lama = waktu(detail_lama, sampel)
+        t_baru = waktu(detail_baru, sampel)
+        print(f"{n:>10} {t_lama:>10.3f} {t_baru:>12.4f} {t_lama / t_baru:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Cek kesamaan hasil dan benchmark skor kelayakan: loop iterrows lama vs skor.py.
+
+Jalankan dari folder dashboard:
+    python bench_skor.py
+    python bench_skor.py --ukuran 1000 100000 1000000 --loop-maks 100000
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from skor import domain_skor, hitung_skor
+
+CSV_CONTOH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql (17).csv")
+
+
+def hitung_skor_iterrows(df_sub, kategori, bobot):
+    # Implementasi lama dari app.py, disimpan sebagai acuan
+    skor = []
+    for _, row in df_sub.iterrows():
+        total_skor = 0
+        max_skor = 0
+        for kolom in kategori:
+            if kolom in bobot and row[kolom] in bobot[kolom]:
+                total_skor += bobot[kolom][row[kolom]]
+                max_skor += 5
+        skor.append((total_skor / max_skor) * 100 if max_skor else 0)
+    df_sub["Skor Kelayakan"] = skor
+    return df_sub
+
+
+def cek_kesamaan(df):
+    """Memastikan skor versi vektor sama persis dengan loop lama untuk setiap domain."""
+    for nama, (kategori, bobot) in domain_skor.items():
+        lama = hitung_skor_iterrows(df[kategori].dropna().copy(), kategori, bobot)
+        baru = hitung_skor(df[kategori].dropna().copy(), kategori, bobot)
+        if not np.array_equal(lama["Skor Kelayakan"].to_numpy(dtype=float),
+                              baru["Skor Kelayakan"].to_numpy()):
+            raise AssertionError(f"Skor domain {nama} berbeda dengan implementasi lama")
+        print(f"[OK] skor {nama}: {len(baru)} baris identik")
+
+
+def waktu(fungsi, df):
+    mulai = time.perf_counter()
+    for kategori, bobot in domain_skor.values():
+        fungsi(df[kategori].dropna().copy(), kategori, bobot)
+    return time.perf_counter() - mulai
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=CSV_CONTOH)
+    parser.add_argument("--ukuran", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--loop-maks", type=int, default=100_000,
+                        help="Di atas jumlah baris ini waktu loop lama diekstrapolasi linear")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv, sep=';', encoding='utf-8')
+    cek_kesamaan(df)
+
+    print(f"\n{'baris':>10} {'iterrows (s)':>14} {'vektor (s)':>12} {'speedup':>10}")
+    detik_per_baris = None
+    for n in args.ukuran:
+        sampel = df.sample(n=n, replace=True, random_state=0).reset_index(drop=True)
+        t_baru = waktu(hitung_skor, sampel)
+        if n <= args.loop_maks:
+            t_lama = waktu(hitung_skor_iterrows, sampel)
+            detik_per_baris = t_lama / n
+            catatan = ""
+        else:
+            t_lama = detik_per_baris * n if detik_per_baris else float("nan")
+            catatan = " (ekstrapolasi)"
+        print(f"{n:>10} {t_lama:>14.3f} {t_baru:>12.4f} {t_lama / t_baru:>9.0f}x{catatan}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+"""
+Benchmark skala dashboard: pembuat data sintetis (sintetis.py) dan suite waktu
+per tahap dengan riwayat JSON (suite.py).
+
+Jalankan dari folder dashboard:
+    python -m benchmark
+    python -m benchmark --ukuran 10000 100000 --ulang 3
+    python -m benchmark --mysql        # simpan massal ke MySQL/MariaDB sungguhan
+    python -m benchmark.sintetis --baris 100000 --keluar data_100k.csv
+"""
@@ -0,0 +1,53 @@
+import argparse
+import sys
+
+import pandas as pd
+
+from benchmark import __doc__ as KETERANGAN
+from benchmark.sintetis import CSV_CONTOH
+from benchmark.suite import (
+    AMBANG_REGRESI, FILE_RIWAYAT, UKURAN_BAWAAN, bandingkan, jalankan_suite, muat_riwayat, simpan_riwayat, tabel_hasil
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=KETERANGAN, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ukuran", type=int, nargs="+", default=UKURAN_BAWAAN)
+    parser.add_argument("--ulang", type=int, default=1, help="percobaan per ukuran (diambil yang tercepat)")
+    parser.add_argument("--mysql", action="store_true", help="simpan ke MySQL (konfigurasi_db), bukan SQLite")
+    parser.add_argument("--contoh", default=CSV_CONTOH, help="CSV contoh sumber distribusi")
+    parser.add_argument("--riwayat", default=FILE_RIWAYAT)
+    parser.add_argument("--tanpa-riwayat", action="store_true", help="jangan tambahkan hasil ke riwayat")
+    parser.add_argument("--ambang", type=float, default=AMBANG_REGRESI, help="batas regresi (0.2 = 20%% lebih lambat)")
+    parser.add_argument("--gagal-jika-regresi", action="store_true", help="exit code 1 jika ada regresi (untuk CI)")
+    args = parser.parse_args()
+
+    def tampilkan_progress(n, percobaan, waktu):
+        print(f"{n:>10,} baris, percobaan {percobaan}: {waktu['total']:.2f} detik", flush=True)
+
+    entri = jalankan_suite(args.ukuran, args.ulang, args.mysql, args.contoh, progress=tampilkan_progress)
+    with pd.option_context("display.float_format", "{:.4f}".format, "display.width", 200):
+        print(f"\nVersi {entri['versi']} ({entri['simpan']}), detik per tahap:")
+        print(tabel_hasil(entri).to_string())
+
+        # Pembanding = entri terakhir yang punya ukuran data dan jenis simpan yang sama
+        pembanding = [
+            e for e in muat_riwayat(args.riwayat)
+            if e["simpan"] == entri["simpan"] and set(e["hasil"]) & set(entri["hasil"])
+        ]
+        regresi = pd.DataFrame()
+        if pembanding:
+            banding = bandingkan(pembanding[-1], entri, args.ambang)
+            regresi = banding[banding["regresi"]]
+            print(f"\nDibanding entri {pembanding[-1]['waktu']} (versi {pembanding[-1]['versi']}):")
+            print(regresi.to_string(index=False) if len(regresi) else "tidak ada regresi")
+        else:
+            print("\nBelum ada entri riwayat dengan ukuran yang sama untuk dibandingkan")
+    if not args.tanpa_riwayat:
+        simpan_riwayat(entri, args.riwayat)
+        print(f"\nHasil ditambahkan ke {args.riwayat}")
+    return 1 if args.gagal_jika_regresi and len(regresi) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Pembuat data kasus TBC sintetis dengan skala berapa pun.
+
+Nilai diambil dari distribusi empiris data contoh (sql (17).csv), kolom mengikuti
+fields_order dan nilai enumerasi mengikuti kosakata option_dict:
+  - kolom yang saling terkait diambil bersama per blok (wilayah, keluarga, rumah,
+    sanitasi, perilaku, tanggal), sehingga korelasi dan pola kosong per bagian
+    formulir tetap seperti data asli (skor kelayakan jadi realistis);
+  - kolom lain diambil sendiri-sendiri, jadi baris hampir tidak pernah sama persis;
+  - sebagian kecil nilai enumerasi (variasi) diganti pilihan option_dict lain agar
+    kategori yang jarang/tidak muncul di contoh tetap terwakili;
+  - pasien selalu unik dan nama kepala keluarga dibuat ulang (tidak menyalin nama asli).
+
+Jalankan dari folder dashboard:
+    python -m benchmark.sintetis --baris 100000 --keluar data_100k.csv
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from skema import fields_order, kolom_enumerasi, kolom_tanggal, kosakata
+from skor import domain_skor
+
+CSV_CONTOH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sql (17).csv")
+
+# Kolom yang diambil bersama dari satu baris contoh (urutan tidak berpengaruh)
+BLOK_KOLOM = {
+    "wilayah": ["puskesmas", "faskes", "city", "regency", "kelurahan"],
+    "keluarga": [
+        "nama_kepala_keluarga", "pekerjaan_kepala_keluarga", "total_pendapatan_keluarga_per_bulan",
+        "status_pernikahan", "jumlah_anggota_keluarga", "kepemilikan_jkn", "mendapatkan_bantuan",
+    ],
+    "rumah": domain_skor["rumah"][0] + ["status_rumah", "luas_rumah", "tipe_rumah"],
+    "sanitasi": domain_skor["sanitasi"][0],
+    "perilaku": domain_skor["perilaku"][0],
+    "tanggal": list(kolom_tanggal),
+    "ternak": ["memiliki_hewan_ternak", "kandang_hewan"],
+    "anak": ["pola_asuh", "status_pernikahan_orang_tua", "status_imunisasi"],
+}
+
+
+class ModelSampel:
+    """Distribusi empiris data contoh dalam bentuk array teks per kolom (NaN = kosong)."""
+
+    def __init__(self, df_teks: pd.DataFrame):
+        self.jumlah_contoh = len(df_teks)
+        self.kolom = {
+            col: (df_teks[col].to_numpy(dtype=object) if col in df_teks.columns
+                  else np.full(len(df_teks), np.nan, dtype=object))
+            for col in fields_order
+        }
+        pasien = pd.to_numeric(df_teks.get("pasien"), errors="coerce")
+        self.pasien_awal = int(pasien.max()) + 1 if pasien is not None and pasien.notna().any() else 1
+
+    @classmethod
+    def dari_csv(cls, path=CSV_CONTOH, sep=';', encoding='utf-8'):
+        # Dibaca sebagai teks apa adanya (sama seperti ingest) agar nilai kotor ikut terwakili
+        return cls(pd.read_csv(path, sep=sep, encoding=encoding, dtype=str, keep_default_na=False, na_values=[""]))
+
+    def buat(self, jumlah_baris, seed=0, variasi=0.01, tahun=1) -> pd.DataFrame:
+        """
+        Membuat jumlah_baris kasus sintetis (kolom teks seperti CSV mentah).
+        variasi: peluang nilai enumerasi terisi diganti pilihan option_dict acak.
+        tahun  : tanggal disebar ke sekian tahun ke belakang (1 = rentang tanggal contoh).
+        """
+        rng = np.random.default_rng(seed)
+        hasil = {}
+        terpakai = set()
+        for kolom_blok in BLOK_KOLOM.values():
+            idx = rng.integers(0, self.jumlah_contoh, jumlah_baris)
+            for col in kolom_blok:
+                hasil[col] = self.kolom[col].take(idx)
+            terpakai.update(kolom_blok)
+        for col in fields_order:
+            if col not in terpakai:
+                hasil[col] = self.kolom[col].take(rng.integers(0, self.jumlah_contoh, jumlah_baris))
+
+        if variasi > 0:
+            for col in kolom_enumerasi:
+                pilihan = np.array(kosakata(col), dtype=object)
+                ganti = (rng.random(jumlah_baris) < variasi) & pd.notna(hasil[col])
+                hasil[col][ganti] = pilihan[rng.integers(0, len(pilihan), int(ganti.sum()))]
+
+        hasil["pasien"] = np.arange(self.pasien_awal, self.pasien_awal + jumlah_baris).astype(str).astype(object)
+        nama = hasil["nama_kepala_keluarga"]
+        terisi = pd.notna(nama)
+        nama[terisi] = np.char.add("Kepala Keluarga ", np.flatnonzero(terisi).astype(str)).astype(object)
+
+        if tahun > 1:
+            geser = pd.to_timedelta(rng.integers(0, tahun, jumlah_baris) * 365, unit="D")
+            for col in kolom_tanggal:
+                tanggal = pd.to_datetime(pd.Series(hasil[col]), errors="coerce") - geser
+                hasil[col] = tanggal.dt.strftime('%Y-%m-%d').to_numpy(dtype=object)
+
+        return pd.DataFrame({col: hasil[col] for col in fields_order})
+
+
+def buat_data_sintetis(jumlah_baris, seed=0, variasi=0.01, tahun=1, contoh=CSV_CONTOH) -> pd.DataFrame:
+    return ModelSampel.dari_csv(contoh).buat(jumlah_baris, seed=seed, variasi=variasi, tahun=tahun)
+
+
+def tulis_csv(df: pd.DataFrame, path):
+    """Menulis data dengan format yang sama seperti ekspor SITB (pemisah ';', tanpa index)."""
+    df.to_csv(path, sep=';', index=False, encoding='utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baris", type=int, required=True)
+    parser.add_argument("--keluar", required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--variasi", type=float, default=0.01)
+    parser.add_argument("--tahun", type=int, default=1)
+    parser.add_argument("--contoh", default=CSV_CONTOH)
+    args = parser.parse_args()
+    tulis_csv(buat_data_sintetis(args.baris, args.seed, args.variasi, args.tahun, args.contoh), args.keluar)
+    print(f"{args.baris:,} baris sintetis ditulis ke {args.keluar}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Suite benchmark pipeline dashboard pada data sintetis berbagai ukuran.
+
+Setiap ukuran mengukur: ingest CSV bertahap, imputasi/duplikasi/tanggal, skor per
+domain, kubus ringkasan, setiap agregasi pilihan Visualisasi (grafik.py), peta wilayah
+dengan batas sintetis data/geo_contoh di setiap tingkat detail, indeks dan
+penerapan filter sidebar (filter_visualisasi.py), dan simpan
+massal ke MySQL/MariaDB (--mysql, tabel tb_cases_bench) atau SQLite sebagai pengganti,
+serta tulis/baca arsip kolumnar lokal (arsip.py) sebagai pembanding ingest CSV.
+Waktu per tahap diambil dari instrumen.py, sehingga nama tahap sama dengan panel debug app.
+
+Hasil setiap jalannya ditambahkan ke riwayat JSON (TBC_BENCH_RIWAYAT, bawaan
+benchmark/riwayat.json) dan dibandingkan dengan entri sebelumnya untuk melihat regresi.
+"""
+import datetime
+import json
+import os
+import platform
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import grafik
+from arsip import muat_arsip, simpan_arsip
+from benchmark.sintetis import CSV_CONTOH, ModelSampel, tulis_csv
+from filter_visualisasi import FilterVisualisasi, indeks_filter, saring_hasil
+from ingest import baca_csv_bertahap
+from instrumen import Profil, tahap
+from preprocessing import proses_data
+from skema import kompakkan
+from wilayah import DIR_GEO_CONTOH, TOLERANSI_DETAIL, figur_peta
+
+FILE_RIWAYAT = os.environ.get(
+    "TBC_BENCH_RIWAYAT", os.path.join(os.path.dirname(os.path.abspath(__file__)), "riwayat.json")
+)
+UKURAN_BAWAAN = [10_000, 100_000, 1_000_000]
+TABEL_BENCH = "tb_cases_bench"
+# Tahap dianggap regresi jika lebih lambat dari ambang ini dibanding entri sebelumnya
+AMBANG_REGRESI = 0.20
+# Tahap yang terlalu cepat untuk dibandingkan dengan andal (detik)
+MIN_DETIK_BANDING = 0.05
+
+
+def simpan_sqlite(df, path, ukuran_batch=None):
+    """
+    Pengganti simpan_kasus untuk mesin tanpa MySQL: upsert per batch pada kunci alami
+    ke tabel SQLite dengan kolom fields_order, memakai persiapan data yang sama.
+    """
+    from simpan_massal import KUNCI_ALAMI, UKURAN_BATCH, siapkan_data
+
+    ukuran_batch = ukuran_batch or UKURAN_BATCH
+    data = siapkan_data(df)
+    data = data[data[list(KUNCI_ALAMI)].notna().all(axis=1)]
+    kolom = list(data.columns)
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {TABEL_BENCH} (id INTEGER PRIMARY KEY, {', '.join(kolom)}, "
+            f"UNIQUE ({', '.join(KUNCI_ALAMI)}))"
+        )
+        query = (
+            f"INSERT INTO {TABEL_BENCH} ({', '.join(kolom)}) VALUES ({', '.join('?' * len(kolom))}) "
+            f"ON CONFLICT ({', '.join(KUNCI_ALAMI)}) DO UPDATE SET "
+            + ", ".join(f"{col} = excluded.{col}" for col in kolom if col not in KUNCI_ALAMI)
+        )
+        for awal in range(0, len(data), ukuran_batch):
+            batch = data.iloc[awal:awal + ukuran_batch]
+            with tahap("sqlite:simpan_batch", baris=len(batch)):
+                conn.executemany(query, batch.itertuples(index=False, name=None))
+                conn.commit()
+    finally:
+        conn.close()
+
+
+def simpan_mysql(df):
+    """simpan_kasus sungguhan ke tabel TABEL_BENCH (dikosongkan dulu) di database konfigurasi_db."""
+    # koneksi_db tidak butuh Streamlit: konfigurasi dari env TBC_DB_* atau berkas TBC_DB_CONFIG
+    from koneksi_db import pinjam_koneksi
+    from migrasi_kunci_unik import query_migrasi
+    from simpan_massal import punya_kunci_unik, simpan_kasus
+
+    conn = pinjam_koneksi()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {TABEL_BENCH} LIKE tb_cases")
+        cursor.execute(f"TRUNCATE TABLE {TABEL_BENCH}")
+        # Tabel bench milik benchmark sendiri: indeks kunci alami dibuat di sini jika belum ada
+        if not punya_kunci_unik(cursor, TABEL_BENCH):
+            cursor.execute(query_migrasi(TABEL_BENCH))
+        cursor.close()
+        conn.commit()
+        return simpan_kasus(conn, df, tabel=TABEL_BENCH)
+    finally:
+        conn.close()
+
+
+def memori_puncak_mb():
+    # ru_maxrss dalam KB di Linux, byte di macOS
+    puncak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return puncak / (1024 * 1024) if sys.platform == "darwin" else puncak / 1024
+
+
+def ukur_satu(model, jumlah_baris, folder, pakai_mysql=False, seed=0):
+    """Menjalankan seluruh pipeline sekali untuk satu ukuran; mengembalikan {tahap: detik}."""
+    mulai = time.perf_counter()
+    df_teks = model.buat(jumlah_baris, seed=seed)
+    detik_buat = time.perf_counter() - mulai
+    path_csv = os.path.join(folder, f"sintetis_{jumlah_baris}.csv")
+    tulis_csv(df_teks, path_csv)
+    del df_teks
+
+    with Profil("benchmark") as profil:
+        with tahap("ingest:csv"):
+            df = baca_csv_bertahap(path_csv).df
+        hasil = proses_data(df)
+        for vis in grafik.DAFTAR_VISUALISASI.values():
+            for bagian in vis.bagian:
+                bagian.fungsi(hasil)
+        # Jalur choropleth tetap terukur walaupun data/geo (batas resmi) tidak ada
+        for detail in TOLERANSI_DETAIL:
+            with tahap("grafik:peta_contoh", detail=detail):
+                figur_peta(grafik.data_turunan(hasil, "wilayah"), "kelurahan", detail=detail, folder=DIR_GEO_CONTOH)
+        # Filter sidebar: indeks sekali per versi data, lalu beberapa kombinasi filter
+        indeks = indeks_filter(hasil)
+        awal, akhir = indeks.rentang_tanggal()
+        for filter_vis in [
+            FilterVisualisasi(puskesmas=indeks.nilai_tersedia("puskesmas")[:1]),
+            FilterVisualisasi(gender=["L"], status_gizi=indeks.nilai_tersedia("status_gizi")[:2]),
+            FilterVisualisasi(tanggal_awal=awal + (akhir - awal) / 2),
+        ]:
+            saring_hasil(hasil, filter_vis)
+        with tahap("simpan:mysql" if pakai_mysql else "simpan:sqlite", baris=len(df)):
+            if pakai_mysql:
+                simpan_mysql(df)
+            else:
+                simpan_sqlite(df, os.path.join(folder, f"bench_{jumlah_baris}.sqlite"))
+        folder_arsip = os.path.join(folder, f"arsip_{jumlah_baris}")
+        with tahap("arsip:simpan", baris=len(df)):
+            simpan_arsip(df, folder_arsip)
+        del df, hasil
+        # Cold start dari arsip (pembanding ingest:csv): seluruh kolom, lalu proyeksi 2 kolom
+        with tahap("arsip:baca"):
+            muat_arsip(folder=folder_arsip)
+        with tahap("arsip:baca_proyeksi"):
+            muat_arsip(["puskesmas", "date_start"], folder=folder_arsip)
+    os.remove(path_csv)
+
+    waktu = {"sintetis:buat": detik_buat}
+    for _, baris in profil.ringkasan().iterrows():
+        waktu[baris["Tahap"]] = float(baris["Total detik"])
+    waktu["total"] = profil.detik
+    return waktu
+
+
+def jalankan_suite(ukuran=UKURAN_BAWAAN, ulang=1, pakai_mysql=False, contoh=CSV_CONTOH, progress=None):
+    """
+    Menjalankan suite untuk setiap ukuran; setiap tahap diambil waktu tercepat dari
+    `ulang` kali percobaan. Mengembalikan entri riwayat (dict siap disimpan ke JSON).
+    """
+    model = ModelSampel.dari_csv(contoh)
+    # Pemanasan: impor lazy plotly/pandas dan template chart tidak ikut terukur di ukuran pertama
+    grafik.semua_visualisasi(proses_data(kompakkan(model.buat(500, seed=99))))
+    hasil = {}
+    with tempfile.TemporaryDirectory(prefix="tbc_bench_") as folder:
+        for n in ukuran:
+            percobaan = []
+            for i in range(ulang):
+                percobaan.append(ukur_satu(model, n, folder, pakai_mysql, seed=i))
+                if progress is not None:
+                    progress(n, i + 1, percobaan[-1])
+            tahap_semua = list(dict.fromkeys(k for p in percobaan for k in p))
+            hasil[str(n)] = {k: min(p[k] for p in percobaan if k in p) for k in tahap_semua}
+            hasil[str(n)]["memori_puncak_mb"] = memori_puncak_mb()
+    return {
+        "waktu": datetime.datetime.now().isoformat(timespec="seconds"),
+        "versi": versi_kode(),
+        "lingkungan": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu": os.cpu_count(),
+        },
+        "simpan": "mysql" if pakai_mysql else "sqlite",
+        "ulang": ulang,
+        "hasil": hasil,
+    }
+
+
+def versi_kode():
+    """Commit git kode yang diukur (ditandai '+lokal' jika ada perubahan belum di-commit)."""
+    folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=folder,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        kotor = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=folder,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return commit + ("+lokal" if kotor else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def muat_riwayat(path=FILE_RIWAYAT):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def simpan_riwayat(entri, path=FILE_RIWAYAT):
+    """Menambahkan entri ke file riwayat (ditulis ulang secara atomik)."""
+    riwayat = muat_riwayat(path)
+    riwayat.append(entri)
+    sementara = f"{path}.tmp"
+    with open(sementara, "w", encoding="utf-8") as f:
+        json.dump(riwayat, f, indent=1)
+    os.replace(sementara, path)
+    return riwayat
+
+
+def bandingkan(lama, baru, ambang=AMBANG_REGRESI):
+    """
+    Tabel perbandingan dua entri riwayat per ukuran dan tahap.
+    Kolom "regresi" True jika tahap lebih lambat dari ambang (tahap < MIN_DETIK_BANDING diabaikan).
+    """
+    baris = []
+    for n, waktu_baru in baru["hasil"].items():
+        waktu_lama = lama["hasil"].get(n, {})
+        for nama, detik in waktu_baru.items():
+            if nama == "memori_puncak_mb" or nama not in waktu_lama:
+                continue
+            sebelum = waktu_lama[nama]
+            rasio = detik / sebelum if sebelum else np.nan
+            baris.append({
+                "baris": int(n), "tahap": nama, "sebelum": sebelum, "sesudah": detik, "rasio": rasio,
+                "regresi": bool(max(detik, sebelum) >= MIN_DETIK_BANDING and rasio > 1 + ambang),
+            })
+    return pd.DataFrame(baris, columns=["baris", "tahap", "sebelum", "sesudah", "rasio", "regresi"])
+
+
+def tabel_hasil(entri):
+    """Hasil satu entri sebagai tabel lebar: baris = tahap, kolom = ukuran data."""
+    return pd.DataFrame(entri["hasil"]).rename(columns=int)
@@ -0,0 +1,224 @@
+"""
+Data dasar yang dipakai bersama oleh semua sesi dalam satu proses Streamlit.
+
+Setiap petugas yang membuka dashboard biasanya memuat data kota yang sama (CSV yang
+sama, query MySQL yang sama, atau arsip lokal yang sama). Daripada setiap sesi
+menyimpan salinan DataFrame sendiri, data dasar didaftarkan sekali ke ManajerDataset
+berdasarkan kuncinya (fingerprint isi / query / versi arsip):
+
+  - DatasetDasar tidak boleh diubah setelah didaftarkan dan diberi nomor versi;
+  - setiap sesi memegang PeganganDataset; manajer menghitung jumlah pegangan per
+    data dasar dan membuangnya dari memori begitu pegangan terakhir dilepas
+    (sesi ganti data atau session_state sesi itu sudah dibuang Streamlit);
+  - SesiData di session_state hanya menyimpan pegangan itu + baris input manual
+    sesi tersebut (delta), jadi memori bertambah sesuai data unik, bukan jumlah sesi.
+"""
+import hashlib
+import itertools
+import threading
+import time
+import weakref
+
+import pandas as pd
+
+from skema import gabung_data
+
+
+class DatasetDasar:
+    """Satu versi data dasar. df dipakai bersama antar sesi, jadi tidak boleh diubah."""
+
+    def __init__(self, kunci, versi, df, deskripsi="", laporan=None):
+        self.kunci = kunci
+        self.versi = versi
+        self.df = df
+        self.deskripsi = deskripsi
+        # Ringkasan dari sumbernya (mis. HasilIngest tanpa df), ditampilkan ulang ke sesi lain
+        self.laporan = laporan
+        self.dibuat = time.time()
+        self.ukuran_bytes = int(df.memory_usage(deep=True).sum())
+
+
+class PeganganDataset:
+    """
+    Pegangan satu sesi atas data dasar. Dilepas lewat lepas(), atau otomatis saat
+    objek ini dibuang garbage collector (mis. session_state sesi yang sudah berakhir).
+    """
+
+    def __init__(self, manajer, dasar):
+        self.dasar = dasar
+        self._lepas = weakref.finalize(self, manajer._lepas, dasar.kunci)
+
+    @property
+    def aktif(self):
+        return self._lepas.alive
+
+    def lepas(self):
+        # finalize hanya memanggil fungsinya sekali, jadi aman dipanggil berulang
+        self._lepas()
+
+
+class ManajerDataset:
+    """Daftar data dasar per kunci dengan hitungan referensi, thread-safe."""
+
+    def __init__(self):
+        self._data = {}
+        self._referensi = {}
+        self._versi = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def pinjam(self, df: pd.DataFrame, kunci: str, deskripsi: str = "", laporan=None) -> PeganganDataset:
+        """
+        Mendaftarkan df sebagai data dasar dengan kunci tersebut, atau memakai data
+        dasar yang sudah terdaftar dengan kunci yang sama (df yang baru dibaca lalu
+        cukup dibuang pemanggil). Mengembalikan pegangan baru untuk sesi pemanggil.
+        """
+        with self._lock:
+            dasar = self._data.get(kunci)
+            if dasar is None:
+                dasar = DatasetDasar(kunci, next(self._versi), df, deskripsi, laporan)
+                self._data[kunci] = dasar
+                self._referensi[kunci] = 0
+            self._referensi[kunci] += 1
+            return PeganganDataset(self, dasar)
+
+    def pinjam_jika_ada(self, kunci: str):
+        """Pegangan atas data dasar yang sudah terdaftar, atau None (data harus dibaca dulu)."""
+        with self._lock:
+            dasar = self._data.get(kunci)
+            if dasar is None:
+                return None
+            self._referensi[kunci] += 1
+            return PeganganDataset(self, dasar)
+
+    def _lepas(self, kunci):
+        with self._lock:
+            if kunci not in self._referensi:
+                return
+            self._referensi[kunci] -= 1
+            if self._referensi[kunci] <= 0:
+                del self._referensi[kunci]
+                del self._data[kunci]
+
+    def tabel(self) -> pd.DataFrame:
+        """Isi manajer untuk panel debug: satu baris per data dasar."""
+        with self._lock:
+            baris = [
+                {
+                    "Versi": dasar.versi, "Sumber": dasar.deskripsi, "Baris": len(dasar.df),
+                    "Sesi": self._referensi[kunci], "Memori (MB)": dasar.ukuran_bytes / (1024 * 1024),
+                }
+                for kunci, dasar in self._data.items()
+            ]
+        return pd.DataFrame(baris, columns=["Versi", "Sumber", "Baris", "Sesi", "Memori (MB)"])
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(dasar.ukuran_bytes for dasar in self._data.values())
+
+    def __len__(self):
+        return len(self._data)
+
+
+_manajer = ManajerDataset()
+
+
+def kunci_file(isi: bytes) -> str:
+    """Kunci data dasar untuk file upload: hash isi file (file yang sama = data dasar yang sama)."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(b"file|")
+    h.update(isi)
+    return h.hexdigest()
+
+
+class SesiData:
+    """
+    Data milik satu sesi: pegangan atas data dasar bersama + baris input manual sesi
+    ini. Data gabungan tidak disimpan: data membentuknya saat dibaca (salinan penuh,
+    kecuali belum ada input manual), sedangkan potongan() hanya menyalin baris yang diminta.
+    """
+
+    def __init__(self, manajer=None):
+        self._manajer = manajer or _manajer
+        self.pegangan = None
+        self.manual = pd.DataFrame()
+
+    @property
+    def dasar(self) -> pd.DataFrame:
+        return self.pegangan.dasar.df if self.pegangan is not None else pd.DataFrame()
+
+    @property
+    def kunci_dasar(self):
+        return self.pegangan.dasar.kunci if self.pegangan is not None else None
+
+    @property
+    def data(self) -> pd.DataFrame:
+        """Data dasar + input manual (data gabungan yang dianalisis dan disimpan)."""
+        if self.manual.empty:
+            return self.dasar
+        if self.pegangan is None:
+            return self.manual
+        return gabung_data([self.dasar, self.manual])
+
+    def potongan(self, awal, akhir) -> pd.DataFrame:
+        """Baris awal..akhir (posisi) dari data gabungan tanpa membentuk seluruh data gabungan."""
+        jumlah_dasar = len(self.dasar)
+        bagian = []
+        if awal < jumlah_dasar:
+            bagian.append(self.dasar.iloc[awal:min(akhir, jumlah_dasar)])
+        if akhir > jumlah_dasar:
+            bagian.append(self.manual.iloc[max(awal - jumlah_dasar, 0):akhir - jumlah_dasar])
+        if len(bagian) == 1 and self.manual.empty:
+            return bagian[0]
+        hasil = gabung_data(bagian)
+        # Index sama dengan index data gabungan (gabung_data memakai ignore_index)
+        hasil.index = pd.RangeIndex(awal, awal + len(hasil))
+        return hasil
+
+    @property
+    def kosong(self):
+        return len(self.dasar) == 0 and self.manual.empty
+
+    def __len__(self):
+        return len(self.dasar) + len(self.manual)
+
+    def ganti_dasar(self, df: pd.DataFrame, kunci: str, deskripsi: str = "", laporan=None):
+        """Memakai data dasar baru (dibagi dengan sesi lain yang kuncinya sama); input manual tetap."""
+        pegangan_baru = self._manajer.pinjam(df, kunci, deskripsi, laporan)
+        self._ganti_pegangan(pegangan_baru)
+        return pegangan_baru.dasar
+
+    def pakai_dasar_jika_ada(self, kunci: str):
+        """Seperti ganti_dasar tanpa df: True jika data dasar dengan kunci itu sudah ada di memori."""
+        pegangan_baru = self._manajer.pinjam_jika_ada(kunci)
+        if pegangan_baru is None:
+            return False
+        self._ganti_pegangan(pegangan_baru)
+        return True
+
+    def _ganti_pegangan(self, pegangan_baru):
+        # Pinjam yang baru dulu, baru lepas yang lama: data yang sama tidak sempat terbuang
+        if self.pegangan is not None:
+            self.pegangan.lepas()
+        self.pegangan = pegangan_baru
+
+    def tambah_manual(self, df_baru: pd.DataFrame):
+        self.manual = gabung_data([self.manual, df_baru])
+
+    def lepas(self):
+        if self.pegangan is not None:
+            self.pegangan.lepas()
+            self.pegangan = None
+
+
+def tabel_dataset() -> pd.DataFrame:
+    return _manajer.tabel()
+
+
+def statistik_dataset():
+    """Ringkasan manajer untuk ditampilkan di UI/debug."""
+    tabel = _manajer.tabel()
+    return {
+        "entri": len(tabel),
+        "sesi": int(tabel["Sesi"].sum()),
+        "total_mb": _manajer.total_bytes() / (1024 * 1024),
+    }
@@ -1,24 +1,36 @@
 import mysql.connector
 import streamlit as st
 
+from koneksi_db import PoolKoneksi, konfigurasi_db as _konfigurasi_dasar
+
+
+def konfigurasi_db():
+    """Konfigurasi koneksi (lihat koneksi_db.konfigurasi_db) dengan bagian [mysql] dari st.secrets."""
+    try:
+        rahasia = dict(st.secrets.get("mysql", {}))
+    except Exception:
+        # Tidak ada secrets.toml
+        rahasia = {}
+    return _konfigurasi_dasar(rahasia)
+
+
+@st.cache_resource
+def get_pool():
+    """Satu pool untuk seluruh sesi Streamlit dalam proses ini."""
+    return PoolKoneksi(konfigurasi_db())
+
 
 def get_connection():
     """
-    Membuat koneksi ke MySQL menggunakan XAMPP.
+    Meminjam koneksi ke MySQL (XAMPP) dari pool bersama.
     Pastikan:
       - MySQL di XAMPP sudah berjalan
-      - Username dan password sesuai dengan pengaturan di XAMPP
-      - Database yang ingin digunakan sudah dibuat (misalnya: tb_database)
+      - Username dan password sesuai dengan pengaturan (lihat konfigurasi_db)
+      - Database yang ingin digunakan sudah dibuat (misalnya: tb_analisistbc)
+    Panggil conn.close() setelah selesai untuk mengembalikan koneksi ke pool.
     """
     try:
-        conn = mysql.connector.connect(
-            host="127.0.0.1",      # MySQL berjalan secara lokal di XAMPP
-            port=3306,# Username default XAMPP
-            user="root",   
-            password="",           # Password default (kosong) kecuali sudah diubah
-            database="tb_analisistbc" # Nama database yang sudah kamu buat
-        )
-        return conn
+        return get_pool().pinjam()
     except mysql.connector.Error as err:
         print(f"Error: {err}")
         return None
@@ -0,0 +1,191 @@
+"""
+Deteksi duplikasi kasus berdasarkan kunci (bawaan pasien + date_start).
+
+drop_duplicates() membandingkan seluruh ~52 kolom, jadi pasien yang sama yang diinput
+ulang dengan tgl_kunjungan berbeda tidak dianggap duplikat. Di sini setiap baris diberi
+hash identitas:
+  - baris dengan kunci lengkap: hash kolom kunci (pasien + date_start), sehingga versi
+    lain dari kasus yang sama dikenali sebagai duplikat (versi terakhir yang dipakai,
+    sama seperti upsert simpan_massal dan arsip);
+  - baris dengan kunci tidak lengkap: hash seluruh isi baris (perilaku lama).
+Nilai kunci dinormalkan dulu (tanggal teks/datetime, angka Int/float), jadi hash sama
+walaupun tipe kolomnya berbeda antar sumber.
+
+IndeksHash menyimpan hash identitas + hash isi setiap kasus yang pernah disimpan ke file
+.npz, sehingga upload baru cukup dicocokkan dalam O(baris baru) untuk tahu mana yang baru,
+sama persis, atau versi berubah.
+
+Kunci bisa diubah lewat env TBC_KUNCI_DEDUP (mis. "pasien,date_start"; kosong = seluruh baris).
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from skema import fields_order, kolom_numerik, kolom_tanggal
+
+KUNCI_DEDUP = tuple(c.strip() for c in os.environ.get("TBC_KUNCI_DEDUP", "pasien,date_start").split(",") if c.strip())
+# Pembeda hash isi baris (kunci tidak lengkap) dari hash kunci
+_GARAM_ISI = np.uint64(0x9E3779B97F4A7C15)
+
+# Status baris saat dicocokkan ke IndeksHash
+BARU, SAMA, BERUBAH = "baru", "sama", "berubah"
+
+
+def _normal(s: pd.Series, col):
+    """Nilai kunci dalam bentuk baku: tanggal -> datetime (hari), angka -> float64, lainnya apa adanya."""
+    if col in kolom_tanggal:
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            # Parse daftar kategori saja, lalu dipetakan lewat kode
+            tanggal = pd.to_datetime(pd.Series(s.cat.categories), errors="coerce").dt.normalize().to_numpy()
+            kode = s.cat.codes.to_numpy()
+            return pd.Series(np.where(kode >= 0, tanggal[kode], np.datetime64("NaT")), index=s.index)
+        return pd.to_datetime(s, errors="coerce").dt.normalize()
+    if col in kolom_numerik:
+        return pd.Series(pd.to_numeric(s, errors="coerce").to_numpy(dtype="float64", na_value=np.nan), index=s.index)
+    return s
+
+
+def _kunci_dipakai(df, kunci):
+    kunci = tuple(kunci or ())
+    return kunci if kunci and all(col in df.columns for col in kunci) else ()
+
+
+def hash_isi(df: pd.DataFrame) -> np.ndarray:
+    """Hash isi baris (kolom data fields_order saja, tanpa kolom turunan seperti year_month)."""
+    kolom = [col for col in fields_order if col in df.columns] or list(df.columns)
+    return pd.util.hash_pandas_object(df[kolom], index=False).to_numpy()
+
+
+def hash_kunci(df: pd.DataFrame, kunci=KUNCI_DEDUP):
+    """(hash kolom kunci, mask kunci lengkap). Mask semua False jika kunci tidak tersedia."""
+    kunci = _kunci_dipakai(df, kunci)
+    if not kunci:
+        return np.zeros(len(df), dtype=np.uint64), np.zeros(len(df), dtype=bool)
+    nilai = pd.DataFrame({col: _normal(df[col], col) for col in kunci}, index=df.index)
+    lengkap = nilai.notna().all(axis=1).to_numpy()
+    return pd.util.hash_pandas_object(nilai, index=False).to_numpy(), lengkap
+
+
+def hash_identitas(df: pd.DataFrame, kunci=KUNCI_DEDUP, isi=None) -> np.ndarray:
+    """Hash kunci untuk baris berkunci lengkap, hash isi baris untuk sisanya."""
+    h, lengkap = hash_kunci(df, kunci)
+    if lengkap.all():
+        return h
+    isi = hash_isi(df) if isi is None else isi
+    return np.where(lengkap, h, isi ^ _GARAM_ISI)
+
+
+def duplikat(df: pd.DataFrame, kunci=KUNCI_DEDUP, keep="last") -> np.ndarray:
+    """Mask baris duplikat (kasus sama); keep="last" = versi terakhir yang tidak ditandai."""
+    return pd.Series(hash_identitas(df, kunci)).duplicated(keep=keep).to_numpy()
+
+
+def buang_duplikat(df: pd.DataFrame, kunci=KUNCI_DEDUP, keep="last") -> pd.DataFrame:
+    """Data tanpa duplikasi kunci (versi terakhir per kasus) dan tanpa baris yang sama persis."""
+    mask = duplikat(df, kunci, keep)
+    return df[~mask] if mask.any() else df
+
+
+def laporan_konflik(df: pd.DataFrame, kunci=KUNCI_DEDUP) -> pd.DataFrame:
+    """
+    Kasus (kunci sama) yang punya lebih dari satu versi isi: satu baris per kasus dengan
+    nilai kunci, jumlah baris & versi, dan kolom yang nilainya berbeda antar versi.
+    """
+    kunci = _kunci_dipakai(df, kunci)
+    kolom_hasil = list(kunci) + ["Jumlah Baris", "Jumlah Versi", "Kolom Berbeda"]
+    if not kunci or not len(df):
+        return pd.DataFrame(columns=kolom_hasil)
+    h, lengkap = hash_kunci(df, kunci)
+    pasangan = pd.DataFrame({"kunci": h, "isi": hash_isi(df)})[lengkap]
+    versi = pasangan.groupby("kunci", sort=False)["isi"].nunique()
+    bentrok = pasangan["kunci"].isin(versi.index[versi > 1]).to_numpy()
+    if not bentrok.any():
+        return pd.DataFrame(columns=kolom_hasil)
+
+    baris = df[lengkap][bentrok]
+    kelompok = pasangan["kunci"].to_numpy()[bentrok]
+    kolom_data = [col for col in fields_order if col in baris.columns and col not in kunci]
+    berbeda = baris[kolom_data].astype(object).groupby(kelompok, sort=False).nunique(dropna=False) > 1
+    hasil = baris[list(kunci)].groupby(kelompok, sort=False).last()
+    hasil["Jumlah Baris"] = pd.Series(kelompok).value_counts()
+    hasil["Jumlah Versi"] = versi
+    hasil["Kolom Berbeda"] = berbeda.apply(lambda r: ", ".join(r.index[r]), axis=1)
+    return hasil.sort_values(["Jumlah Versi", "Jumlah Baris"], ascending=False).reset_index(drop=True)[kolom_hasil]
+
+
+class IndeksHash:
+    """
+    Indeks hash persisten kasus yang sudah disimpan: hash identitas (terurut) dan hash
+    isi baris pasangannya, di satu file .npz. Pencocokan memakai searchsorted, jadi
+    biayanya sebanding dengan jumlah baris baru, bukan jumlah riwayat.
+    """
+
+    def __init__(self, path, kunci=KUNCI_DEDUP):
+        self.path = path
+        self.kunci = tuple(kunci)
+        self._lock = threading.Lock()
+        self.identitas = np.empty(0, dtype=np.uint64)
+        self.isi = np.empty(0, dtype=np.uint64)
+        if os.path.exists(path):
+            with np.load(path) as berkas:
+                if tuple(str(k) for k in berkas["kunci"]) == self.kunci:
+                    self.identitas, self.isi = berkas["identitas"], berkas["isi"]
+
+    def __len__(self):
+        return len(self.identitas)
+
+    @property
+    def ada(self):
+        return os.path.exists(self.path)
+
+    def _hash(self, df):
+        isi = hash_isi(df)
+        return hash_identitas(df, self.kunci, isi), isi
+
+    def cocokkan(self, df: pd.DataFrame) -> np.ndarray:
+        """Status setiap baris df terhadap indeks: BARU, SAMA (persis), atau BERUBAH (kunci sama, isi beda)."""
+        identitas, isi = self._hash(df)
+        with self._lock:
+            posisi = np.searchsorted(self.identitas, identitas)
+            posisi_aman = np.minimum(posisi, max(len(self.identitas) - 1, 0))
+            if len(self.identitas):
+                ada = self.identitas[posisi_aman] == identitas
+                sama = ada & (self.isi[posisi_aman] == isi)
+            else:
+                ada = sama = np.zeros(len(df), dtype=bool)
+        return np.where(sama, SAMA, np.where(ada, BERUBAH, BARU))
+
+    def tambahkan(self, df: pd.DataFrame):
+        """Mendaftarkan baris df (versi terakhir per identitas menggantikan yang lama)."""
+        identitas, isi = self._hash(df)
+        # Hanya hash baru yang diurutkan: df dibalik agar np.unique (kemunculan pertama)
+        # mengambil versi terakhir per identitas
+        identitas, posisi = np.unique(identitas[::-1], return_index=True)
+        isi = isi[::-1][posisi]
+        with self._lock:
+            posisi = np.searchsorted(self.identitas, identitas)
+            if len(self.identitas):
+                ada = self.identitas[np.minimum(posisi, len(self.identitas) - 1)] == identitas
+            else:
+                ada = np.zeros(len(identitas), dtype=bool)
+            # Identitas yang sudah ada: isi diganti di tempat; sisanya disisipkan pada posisi urutnya
+            if ada.any():
+                if not self.isi.flags.writeable:
+                    self.isi = self.isi.copy()
+                self.isi[posisi[ada]] = isi[ada]
+            if not ada.all():
+                self.identitas = np.insert(self.identitas, posisi[~ada], identitas[~ada])
+                self.isi = np.insert(self.isi, posisi[~ada], isi[~ada])
+
+    def simpan(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        sementara = self.path + ".tmp"
+        with self._lock, open(sementara, "wb") as f:
+            np.savez(f, kunci=np.array(self.kunci), identitas=self.identitas, isi=self.isi)
+        os.replace(sementara, self.path)
+
+
+def ringkas_status(status: np.ndarray) -> dict:
+    return {s: int((status == s).sum()) for s in (BARU, SAMA, BERUBAH)}
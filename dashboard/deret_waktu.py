@@ -0,0 +1,238 @@
+"""
+Deret waktu kasus per date_start: resampling harian/mingguan/bulanan/triwulanan, rata-rata
+bergulir, perbandingan dengan periode yang sama tahun lalu, pemisahan per puskesmas /
+type_tb / gender, dan jeda date_start -> tgl_kunjungan (kinerja penemuan kasus).
+
+DeretKasus menyimpan agregat harian (seperti kubus RingkasanKasus): jumlah kasus dan
+jumlah hari jeda per (tanggal, nilai pemisah), serta histogram jeda per nilai pemisah.
+Ukurannya bergantung pada jumlah hari x nilai pemisah, bukan jumlah kasus, sehingga
+setiap resampling/rolling dihitung dari tabel kecil. Baris baru cukup ditambahkan ke
+agregat (perpanjang/tambah), tanpa menghitung ulang riwayat.
+"""
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from instrumen import tahap
+from ringkasan import nilai_kosong
+from skema import parse_tanggal
+
+# Kolom yang bisa dipakai untuk memisah deret (satu garis per nilai)
+KOLOM_PEMISAH = ["puskesmas", "type_tb", "gender"]
+# Label frekuensi -> aturan resample pandas (label = awal periode)
+FREKUENSI = {"Harian": "D", "Mingguan": "W-MON", "Bulanan": "MS", "Triwulanan": "QS"}
+# Jarak ke periode yang sama tahun lalu per frekuensi (harian/mingguan: hari yang sama dalam minggu)
+_TAHUN_LALU = {
+    "D": pd.Timedelta(days=364), "W-MON": pd.Timedelta(weeks=52),
+    "MS": pd.DateOffset(years=1), "QS": pd.DateOffset(years=1),
+}
+# Target jeda date_start -> tgl_kunjungan (hari) untuk persentase kasus tepat waktu
+BATAS_JEDA_HARI = 14
+# Label nilai pemisah yang kosong
+NILAI_KOSONG = "Tidak diketahui"
+
+
+def _kunci(nilai):
+    return None if nilai_kosong(nilai) else nilai
+
+
+def _resample(s, frekuensi):
+    if frekuensi == "W-MON":
+        return s.resample(frekuensi, label="left", closed="left").sum()
+    return s.resample(frekuensi).sum()
+
+
+class DeretKasus:
+    """
+    Agregat harian kasus per date_start. Untuk pemisah None (semua kasus) dan setiap
+    kolom KOLOM_PEMISAH disimpan Counter {(tanggal, nilai): ...}:
+      jumlah      jumlah kasus
+      jeda_total  jumlah hari jeda (kasus dengan jeda valid saja)
+      jeda_kasus  jumlah kasus dengan jeda valid (tgl_kunjungan >= date_start)
+    serta histogram {(nilai, hari jeda): jumlah} dan jumlah jeda negatif per nilai.
+    """
+
+    def __init__(self):
+        semua = [None] + KOLOM_PEMISAH
+        self.jumlah = {p: Counter() for p in semua}
+        self.jeda_total = {p: Counter() for p in semua}
+        self.jeda_kasus = {p: Counter() for p in semua}
+        self.histogram_jeda = {p: Counter() for p in semua}
+        self.jeda_negatif = {p: Counter() for p in semua}
+        # Kasus tanpa date_start valid tidak masuk deret, hanya dihitung
+        self.tanpa_tanggal = 0
+
+    @classmethod
+    def dari_data(cls, df):
+        deret = cls()
+        deret.tambah(df)
+        return deret
+
+    def tambah(self, df):
+        """Menambahkan kasus dari df (kolom tanggal boleh teks atau datetime). Mengembalikan self."""
+        with tahap("deret_waktu:tambah", baris=len(df)):
+            if "date_start" not in df.columns or not len(df):
+                return self
+            tanggal = parse_tanggal(df["date_start"]).dt.normalize()
+            ada = tanggal.notna().to_numpy()
+            self.tanpa_tanggal += int((~ada).sum())
+            if "tgl_kunjungan" in df.columns:
+                jeda = (parse_tanggal(df["tgl_kunjungan"]).dt.normalize() - tanggal).dt.days
+            else:
+                jeda = pd.Series(np.nan, index=df.index)
+            negatif = (jeda < 0).to_numpy()
+            jeda = jeda.where(jeda >= 0)
+
+            data = pd.DataFrame({"tanggal": tanggal, "jeda": jeda, "negatif": negatif})[ada]
+            for pemisah in self.jumlah:
+                if pemisah is None:
+                    data["nilai"] = 0
+                elif pemisah in df.columns:
+                    data["nilai"] = df[pemisah][ada]
+                else:
+                    continue
+                per_hari = data.groupby(["tanggal", "nilai"], observed=True, dropna=False).agg(
+                    jumlah=("tanggal", "size"), jeda_total=("jeda", "sum"), jeda_kasus=("jeda", "count"),
+                    negatif=("negatif", "sum"),
+                )
+                for (hari, v), baris in zip(per_hari.index, per_hari.itertuples(index=False)):
+                    kunci = (hari, None if pemisah is None else _kunci(v))
+                    self.jumlah[pemisah][kunci] += int(baris.jumlah)
+                    if baris.jeda_kasus:
+                        self.jeda_total[pemisah][kunci] += int(baris.jeda_total)
+                        self.jeda_kasus[pemisah][kunci] += int(baris.jeda_kasus)
+                    if baris.negatif:
+                        self.jeda_negatif[pemisah][kunci[1]] += int(baris.negatif)
+                histogram = data[data["jeda"].notna()].groupby(["nilai", "jeda"], observed=True, dropna=False).size()
+                for (v, hari), n in histogram.items():
+                    self.histogram_jeda[pemisah][(None if pemisah is None else _kunci(v), int(hari))] += int(n)
+        return self
+
+    def salin(self):
+        baru = DeretKasus()
+        for atribut in ["jumlah", "jeda_total", "jeda_kasus", "histogram_jeda", "jeda_negatif"]:
+            setattr(baru, atribut, {p: Counter(c) for p, c in getattr(self, atribut).items()})
+        baru.tanpa_tanggal = self.tanpa_tanggal
+        return baru
+
+    def gabung(self, lain):
+        """Menambahkan seluruh isi deret lain (mis. periode baru dari arsip) ke deret ini."""
+        for atribut in ["jumlah", "jeda_total", "jeda_kasus", "histogram_jeda", "jeda_negatif"]:
+            for p, counter in getattr(lain, atribut).items():
+                getattr(self, atribut).setdefault(p, Counter()).update(counter)
+        self.tanpa_tanggal += lain.tanpa_tanggal
+        return self
+
+    def perpanjang(self, df_baru, skor_baru=None):
+        """Deret baru = deret ini + df_baru (objek ini tidak diubah, lihat HasilPreprocessing.tambah_baris)."""
+        return self.salin().tambah(df_baru)
+
+    def __len__(self):
+        return sum(self.jumlah[None].values())
+
+    # ---- pembacaan ----
+
+    def _seri(self, counter, pemisah):
+        """{nilai: Series harian} dari Counter {(tanggal, nilai): angka}."""
+        per_nilai = {}
+        for (hari, nilai), angka in counter.items():
+            per_nilai.setdefault(NILAI_KOSONG if nilai is None and pemisah else nilai, {})[hari] = angka
+        return {nilai: pd.Series(isi, dtype="float64").sort_index() for nilai, isi in per_nilai.items()}
+
+    def _periode(self, frekuensi):
+        harian = self._seri(self.jumlah[None], None).get(None)
+        if harian is None or harian.empty:
+            return None
+        return _resample(harian, frekuensi).index
+
+    def _tabel(self, per_nilai, kolom, pemisah):
+        bagian = [
+            pd.DataFrame({"periode": s.index, pemisah or "semua": nilai, kolom: s.to_numpy()})
+            for nilai, s in per_nilai.items()
+        ]
+        tabel = pd.concat(bagian, ignore_index=True) if bagian else pd.DataFrame(columns=["periode", kolom])
+        return tabel.drop(columns="semua", errors="ignore")
+
+    def deret(self, frekuensi="MS", pemisah=None, jendela=None):
+        """
+        Jumlah kasus per periode (kolom periode, [pemisah], jumlah), periode tanpa kasus
+        bernilai 0. jendela: rata-rata bergulir sekian periode (kolom rata_rata_bergulir).
+        """
+        periode = self._periode(frekuensi)
+        if periode is None:
+            return pd.DataFrame(columns=["periode", "jumlah"])
+        per_nilai = {}
+        for nilai, s in self._seri(self.jumlah[pemisah], pemisah).items():
+            s = _resample(s, frekuensi).reindex(periode, fill_value=0)
+            per_nilai[nilai] = s
+        tabel = self._tabel(per_nilai, "jumlah", pemisah)
+        if jendela:
+            rata = {nilai: s.rolling(jendela, min_periods=1).mean() for nilai, s in per_nilai.items()}
+            tabel["rata_rata_bergulir"] = self._tabel(rata, "r", pemisah)["r"].to_numpy()
+        tabel["jumlah"] = tabel["jumlah"].astype(int)
+        return tabel
+
+    def banding_tahunan(self, frekuensi="MS"):
+        """
+        Jumlah kasus per periode dibanding periode yang sama tahun lalu: kolom periode,
+        jumlah, jumlah_tahun_lalu (NaN jika di luar rentang data), perubahan_persen.
+        """
+        tabel = self.deret(frekuensi)
+        if tabel.empty:
+            return tabel.assign(jumlah_tahun_lalu=[], perubahan_persen=[])
+        s = tabel.set_index("periode")["jumlah"]
+        lalu = s.reindex(s.index - _TAHUN_LALU[frekuensi]).to_numpy(dtype="float64")
+        tabel["jumlah_tahun_lalu"] = lalu
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tabel["perubahan_persen"] = np.where(lalu > 0, (tabel["jumlah"] - lalu) / lalu * 100, np.nan)
+        return tabel
+
+    def jeda(self, frekuensi="MS", pemisah=None):
+        """Rata-rata jeda date_start -> tgl_kunjungan (hari) per periode date_start: periode, [pemisah], kasus, rata_rata_hari."""
+        periode = self._periode(frekuensi)
+        if periode is None:
+            return pd.DataFrame(columns=["periode", "kasus", "rata_rata_hari"])
+        total = {n: _resample(s, frekuensi).reindex(periode, fill_value=0)
+                 for n, s in self._seri(self.jeda_total[pemisah], pemisah).items()}
+        kasus = {n: _resample(s, frekuensi).reindex(periode, fill_value=0)
+                 for n, s in self._seri(self.jeda_kasus[pemisah], pemisah).items()}
+        tabel = self._tabel(kasus, "kasus", pemisah)
+        tabel["rata_rata_hari"] = self._tabel(
+            {n: total[n] / kasus[n].where(kasus[n] > 0) for n in kasus}, "r", pemisah
+        )["r"].to_numpy()
+        tabel["kasus"] = tabel["kasus"].astype(int)
+        return tabel
+
+    def statistik_jeda(self, pemisah=None):
+        """
+        Ringkasan jeda per nilai pemisah dari histogram: jumlah kasus, rata-rata, median,
+        persentil 90, persentase kasus dengan jeda <= BATAS_JEDA_HARI, dan jeda negatif
+        (tgl_kunjungan sebelum date_start, tidak ikut dihitung).
+        """
+        per_nilai = {}
+        for (nilai, hari), n in self.histogram_jeda[pemisah].items():
+            per_nilai.setdefault(nilai, Counter())[hari] += n
+        baris = []
+        for nilai in set(per_nilai) | set(self.jeda_negatif[pemisah]):
+            histogram = per_nilai.get(nilai, Counter())
+            hari = np.array(sorted(histogram), dtype=np.int64)
+            jumlah = np.array([histogram[h] for h in hari], dtype=np.int64)
+            total = int(jumlah.sum())
+            kumulatif = np.cumsum(jumlah)
+
+            def persentil(q):
+                return int(hari[np.searchsorted(kumulatif, q * total)]) if total else np.nan
+
+            baris.append({
+                (pemisah or "Data"): (NILAI_KOSONG if nilai is None and pemisah else "Semua kasus" if nilai is None else nilai),
+                "Kasus": total,
+                "Rata-rata (hari)": float((hari * jumlah).sum() / total) if total else np.nan,
+                "Median (hari)": persentil(0.5),
+                "P90 (hari)": persentil(0.9),
+                f"≤ {BATAS_JEDA_HARI} hari (%)": float(jumlah[hari <= BATAS_JEDA_HARI].sum() / total * 100) if total else np.nan,
+                "Jeda negatif": int(self.jeda_negatif[pemisah].get(nilai, 0)),
+            })
+        kolom = [pemisah or "Data", "Kasus", "Rata-rata (hari)", "Median (hari)", "P90 (hari)",
+                 f"≤ {BATAS_JEDA_HARI} hari (%)", "Jeda negatif"]
+        return pd.DataFrame(baris, columns=kolom).sort_values("Kasus", ascending=False).reset_index(drop=True)
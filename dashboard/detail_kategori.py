@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+
+class Aturan:
+    """
+    Satu penghitung detail kategori: label di chart, kolom sumber, dan predikat.
+    semua     : semua potongan teks harus muncul di jawaban (huruf kecil)
+    salah_satu: minimal satu potongan teks muncul di jawaban
+    Jawaban kosong (NaN) tidak pernah cocok.
+    """
+
+    def __init__(self, label, kolom, semua=(), salah_satu=()):
+        self.label = label
+        self.kolom = kolom
+        self.semua = [s.lower() for s in semua]
+        self.salah_satu = [s.lower() for s in salah_satu]
+
+    def cocok(self, teks):
+        return all(s in teks for s in self.semua) and (not self.salah_satu or any(s in teks for s in self.salah_satu))
+
+
+ATURAN_RUMAH = [
+    Aturan("Luas ventilasi ≤ 10% dari luas lantai", "ventilasi", semua=["luas ventilasi < 10%"]),
+    Aturan("Pencahayaan kurang terang, kurang jelas untuk membaca normal", "pencahayaan", semua=["kurang terang"]),
+    Aturan("Lubang asap dapur dengan luas ventilasi < 10% dari luas lantai dapur", "lubang_asap_dapur", semua=["luas ventilasi < 10%"]),
+    Aturan("Tidak Ada Jendela di Rumah", "ventilasi", semua=["tidak ada"]),
+    Aturan("Tidak Ada Langit-Langit", "langit_langit", semua=["tidak ada"]),
+    Aturan("Lantai Papan/anyaman bambu/plester retak berdebu", "lantai", salah_satu=["papan", "anyaman bambu", "plester retak"]),
+    Aturan("Tidak ada lubang asap dapur", "lubang_asap_dapur", semua=["tidak ada"]),
+    Aturan("Lantai Tanah", "lantai", semua=["tanah"]),
+]
+
+ATURAN_SANITASI = [
+    Aturan("Jamban bukan leher angsa, tidak bertutup & dialirkan ke sungai", "jamban", semua=["tidak bertutup", "sungai"]),
+    Aturan("Sarana air bersih bukan milik sendiri & tidak memenuhi syarat kesehatan", "sarana_air_bersih", semua=["bukan milik sendiri", "tidak memenuhi"]),
+    Aturan("Tidak ada Sarana Air Bersih", "sarana_air_bersih", semua=["tidak ada"]),
+    Aturan("SPAL diresapkan tetapi mencemari sumber air (jarak <10m)", "sarana_pembuangan_air_limbah", semua=["diresapkan", "mencemari"]),
+    Aturan("Tidak ada jamban", "jamban", semua=["tidak ada"]),
+    Aturan("Jamban bukan leher angsa, ada tutup & dialirkan ke sungai", "jamban", semua=["bukan leher angsa", "tutup", "sungai"]),
+    Aturan("Tidak ada Sarana Pembuangan Sampah", "sarana_pembuangan_sampah", semua=["tidak ada"]),
+    Aturan("Tidak ada SPAL", "sarana_pembuangan_air_limbah", semua=["tidak ada"]),
+    Aturan("Sarana air bersih milik sendiri & tidak memenuhi syarat kesehatan", "sarana_air_bersih", semua=["milik sendiri", "tidak memenuhi"]),
+    Aturan("Jamban bukan leher angsa, ada tutup & septic tank", "jamban", semua=["bukan leher angsa", "tutup", "septic tank"]),
+    Aturan("Sarana Pembuangan Sampah tidak kedap air dan tidak tertutup", "sarana_pembuangan_sampah", semua=["tidak kedap", "tidak tertutup"]),
+    Aturan("SPAL bukan milik sendiri & memenuhi syarat kesehatan", "sarana_pembuangan_air_limbah", semua=["bukan milik sendiri", "memenuhi"]),
+    Aturan("SPAL diresapkan ke selokan terbuka", "sarana_pembuangan_air_limbah", semua=["diresapkan", "selokan terbuka"]),
+    Aturan("Sarana air bersih bukan milik sendiri & memenuhi syarat kesehatan", "sarana_air_bersih", semua=["bukan milik sendiri", "memenuhi"]),
+    Aturan("Sarana Pembuangan Sampah kedap air dan tidak tertutup", "sarana_pembuangan_sampah", semua=["kedap air", "tidak tertutup"]),
+]
+
+ATURAN_PERILAKU = [
+    Aturan("BAB di sungai / kebun / kolam / sembarangan", "membuang_tinja", salah_satu=["sungai", "kebun", "kolam", "sembarangan"]),
+    Aturan("Tidak CTPS", "kebiasaan_ctps", semua=["tidak"]),
+    Aturan("Tidak pernah membersihkan rumah dan halaman", "membersihkan_rumah", semua=["tidak pernah"]),
+    Aturan("Buang sampah ke sungai / kebun / kolam / sembarangan / dibakar", "membuang_sampah", salah_satu=["sungai", "kebun", "kolam", "sembarangan", "dibakar"]),
+    Aturan("Tidak pernah buka jendela ruang keluarga", "membuka_jendela_ruang_keluarga", semua=["tidak pernah"]),
+    Aturan("Tidak pernah buka jendela kamar tidur", "membuka_jendela_kamar_tidur", semua=["tidak pernah"]),
+]
+
+ATURAN_DETAIL = {"rumah": ATURAN_RUMAH, "sanitasi": ATURAN_SANITASI, "perilaku": ATURAN_PERILAKU}
+
+
+def jumlah_per_nilai(series: pd.Series):
+    """
+    (jawaban unik dalam huruf kecil, jumlah baris per jawaban) tanpa NaN.
+    Kolom Categorical memakai kode kategorinya langsung; kolom lain di-factorize dulu.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        kode = series.cat.codes.to_numpy()
+        unik = series.cat.categories
+    else:
+        kode, unik = pd.factorize(series)
+    jumlah = np.bincount(kode[kode >= 0], minlength=len(unik))
+    return [str(v).lower() for v in unik], jumlah
+
+
+def hitung_detail(df: pd.DataFrame, aturan) -> dict:
+    """
+    Menghitung semua penghitung dalam satu lintasan: jumlah per jawaban unik dihitung
+    sekali per kolom, lalu setiap aturan dievaluasi sekali per jawaban unik
+    (bukan per baris). Urutan hasil mengikuti urutan aturan.
+    """
+    per_kolom = {}
+    hasil = {}
+    for a in aturan:
+        if a.kolom not in per_kolom:
+            per_kolom[a.kolom] = jumlah_per_nilai(df[a.kolom]) if a.kolom in df.columns else ([], np.zeros(0, dtype=int))
+        nilai, jumlah = per_kolom[a.kolom]
+        cocok = np.fromiter((a.cocok(v) for v in nilai), dtype=bool, count=len(nilai))
+        hasil[a.label] = int(jumlah[cocok].sum())
+    return hasil
+
+
+def tabel_detail(df: pd.DataFrame, domain: str) -> pd.DataFrame:
+    """Tabel Kategori/Jumlah/Persentase untuk chart detail satu domain (kategori 0 dibuang)."""
+    detail = {k: v for k, v in hitung_detail(df, ATURAN_DETAIL[domain]).items() if v > 0}
+    tabel = pd.DataFrame(list(detail.items()), columns=['Kategori', 'Jumlah'])
+    tabel['Persentase'] = (tabel['Jumlah'] / len(df)) * 100
+    return tabel.sort_values(by='Jumlah', ascending=False)
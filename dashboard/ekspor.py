@@ -0,0 +1,169 @@
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+
+from preprocessing import CacheLRU
+
+# Format ekspor yang didukung: nama di UI -> (format kaleido, mime type)
+FORMAT_EKSPOR = {
+    "PNG": ("png", "image/png"),
+    "SVG": ("svg", "image/svg+xml"),
+    "PDF": ("pdf", "application/pdf"),
+}
+# Ukuran gambar ekspor (piksel) dan skala PNG
+LEBAR_EKSPOR = int(os.environ.get("TBC_EKSPOR_LEBAR", "1200"))
+TINGGI_EKSPOR = int(os.environ.get("TBC_EKSPOR_TINGGI", "700"))
+SKALA_PNG = float(os.environ.get("TBC_EKSPOR_SKALA", "2"))
+CACHE_EKSPOR_MB = float(os.environ.get("TBC_EKSPOR_CACHE_MB", "128"))
+
+log_ekspor = logging.getLogger("tbc.ekspor")
+
+
+class HasilRender:
+    """Bytes hasil render satu figur (dibungkus agar ukurannya terhitung oleh CacheLRU)."""
+
+    def __init__(self, data):
+        self.data = data
+        self.ukuran_bytes = len(data)
+
+
+def kunci_figur(fig, fmt, lebar=LEBAR_EKSPOR, tinggi=TINGGI_EKSPOR) -> str:
+    """Hash spesifikasi figur (data + layout) beserta opsi render."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(fig.to_json().encode("utf-8"))
+    h.update(f"|{fmt}|{lebar}|{tinggi}|{SKALA_PNG}".encode("utf-8"))
+    return h.hexdigest()
+
+
+class PenyajiGrafik:
+    """
+    Renderer kaleido yang tetap hidup selama proses berjalan.
+    Proses chromium kaleido dinyalakan sekali (dipanaskan di thread latar saat objek
+    dibuat), lalu dipakai ulang; render dijaga lock karena kaleido tidak thread-safe.
+    Hasil render di-cache berdasarkan hash spesifikasi figur, jadi figur yang sama
+    tidak dirender dua kali walaupun objek Figure-nya dibuat ulang di setiap rerun.
+    """
+
+    def __init__(self, maks_mb=CACHE_EKSPOR_MB):
+        self._lock = threading.Lock()
+        self._cache = CacheLRU(maks_entri=10_000, maks_mb=maks_mb)
+        self.jumlah_render = 0
+        # Error saat kaleido dipanaskan (None jika berhasil/belum selesai), ditampilkan UI ekspor
+        self.galat_panas = None
+        scope = pio.kaleido.scope
+        if scope is not None:
+            # Tanpa MathJax kaleido tidak memuat skrip tambahan di setiap render
+            scope.mathjax = None
+        self._siap = threading.Thread(target=self._panaskan, daemon=True)
+        self._siap.start()
+
+    def _panaskan(self):
+        try:
+            with self._lock:
+                pio.to_image(px.bar(x=[0], y=[0]), format="png", engine="kaleido", width=10, height=10)
+        except Exception as err:
+            # Kaleido/chromium tidak tersedia; error yang sama akan muncul lagi saat render
+            self.galat_panas = err
+            log_ekspor.warning("Kaleido gagal dipanaskan: %s", err)
+
+    def tunggu_siap(self, timeout=None) -> bool:
+        """Menunggu pemanasan kaleido selesai; False jika gagal atau belum selesai dalam timeout."""
+        self._siap.join(timeout)
+        return not self._siap.is_alive() and self.galat_panas is None
+
+    def render(self, fig, fmt="png", lebar=LEBAR_EKSPOR, tinggi=TINGGI_EKSPOR) -> bytes:
+        kunci = kunci_figur(fig, fmt, lebar, tinggi)
+        hasil = self._cache.get(kunci)
+        if hasil is None:
+            with self._lock:
+                data = pio.to_image(
+                    fig, format=fmt, engine="kaleido", width=lebar, height=tinggi,
+                    scale=SKALA_PNG if fmt == "png" else 1
+                )
+                self.jumlah_render += 1
+            hasil = HasilRender(data)
+            self._cache.put(kunci, hasil)
+        return hasil.data
+
+    def statistik(self):
+        return {
+            "render": self.jumlah_render,
+            "cache_hit": self._cache.hit,
+            "cache_miss": self._cache.miss,
+            "cache_mb": self._cache.total_bytes() / (1024 * 1024),
+        }
+
+
+_penyaji = None
+_penyaji_lock = threading.Lock()
+
+
+def penyaji() -> PenyajiGrafik:
+    """Renderer bersama untuk seluruh proses (dibuat dan dipanaskan saat pertama dipanggil)."""
+    global _penyaji
+    with _penyaji_lock:
+        if _penyaji is None:
+            _penyaji = PenyajiGrafik()
+        return _penyaji
+
+
+def _siapkan_worker():
+    # Setiap proses worker memanaskan kaleido-nya sendiri sekali di awal
+    if pio.kaleido.scope is not None:
+        pio.kaleido.scope.mathjax = None
+    pio.to_image(px.bar(x=[0], y=[0]), format="png", engine="kaleido", width=10, height=10)
+
+
+def _render_json(argumen):
+    fig_json, fmt, lebar, tinggi = argumen
+    return pio.to_image(
+        pio.from_json(fig_json), format=fmt, engine="kaleido", width=lebar, height=tinggi,
+        scale=SKALA_PNG if fmt == "png" else 1
+    )
+
+
+def render_paralel(daftar_fig, fmt="png", maks_proses=None, lebar=LEBAR_EKSPOR, tinggi=TINGGI_EKSPOR):
+    """
+    Merender banyak figur sekaligus di process pool (satu kaleido per proses).
+    Figur dikirim sebagai JSON; urutan hasil sama dengan urutan daftar_fig.
+    Proses worker dibuat dengan metode "spawn" agar tidak mewarisi thread/subproses kaleido induk.
+    """
+    if not daftar_fig:
+        return []
+    maks_proses = min(maks_proses or os.cpu_count() or 1, len(daftar_fig))
+    if maks_proses <= 1:
+        return [penyaji().render(fig, fmt, lebar, tinggi) for fig in daftar_fig]
+    argumen = [(fig.to_json(), fmt, lebar, tinggi) for fig in daftar_fig]
+    with ProcessPoolExecutor(max_workers=maks_proses, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_siapkan_worker) as pool:
+        return list(pool.map(_render_json, argumen))
+
+
+def zip_visualisasi(daftar, fmt="png", progress=None) -> bytes:
+    """
+    Mengemas daftar (nama file, figur/DataFrame) dari grafik.semua_visualisasi ke ZIP.
+    Figur dirender dengan format yang dipilih, tabel disimpan sebagai CSV.
+    progress: fungsi opsional progress(fraksi, nama).
+    """
+    buffer = io.BytesIO()
+    renderer = penyaji()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as berkas_zip:
+        for i, (nama, objek) in enumerate(daftar, start=1):
+            if isinstance(objek, pd.DataFrame):
+                berkas_zip.writestr(f"{nama}.csv", objek.to_csv())
+            else:
+                # Gambar PNG/PDF sudah terkompresi; tidak perlu dikompresi lagi oleh ZIP
+                kompresi = zipfile.ZIP_DEFLATED if fmt == "svg" else zipfile.ZIP_STORED
+                berkas_zip.writestr(f"{nama}.{fmt}", renderer.render(objek, fmt), compress_type=kompresi)
+            if progress is not None:
+                progress(i / len(daftar), nama)
+    return buffer.getvalue()
@@ -0,0 +1,210 @@
+"""
+Filter halaman Visualisasi (puskesmas, regency/kelurahan, rentang date_start, gender,
+kelompok usia, status gizi) di atas indeks yang dibuat sekali per versi data.
+
+IndeksFilter menyimpan, untuk setiap kolom filter, posisi baris yang diurutkan per nilai
+(seperti indeks terurut: baris bernilai sama bersebelahan, batasnya dari bincount),
+dan untuk date_start posisi baris yang diurutkan per tanggal. Satu filter = gabungan
+potongan posisi nilai yang dipilih; beberapa filter = irisan posisi tersebut, jadi
+kolom data tidak dibandingkan ulang setiap kali filter diganti.
+
+Hasil filter adalah HasilPreprocessing.potong() dengan ringkasan dari ringkasan.IndeksSel
+(bincount nomor sel, tanpa groupby ulang), disimpan di cache kecil per kombinasi filter.
+Semua chart dan KPI membaca hasil filter itu seperti membaca hasil penuh.
+"""
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from instrumen import tahap
+from preprocessing import CacheLRU
+from ringkasan import IndeksSel
+from skema import parse_tanggal
+
+# Kolom kategori yang bisa difilter; "kelompok_usia" dibentuk dari kolom age
+KOLOM_FILTER = ["puskesmas", "regency", "kelurahan", "gender", "kelompok_usia", "status_gizi"]
+# Kelompok usia (batas bawah inklusif), sama seperti pengelompokan laporan TBC
+BATAS_USIA = [0, 5, 15, 25, 35, 45, 55, 65, np.inf]
+LABEL_USIA = ["0-4", "5-14", "15-24", "25-34", "35-44", "45-54", "55-64", "65+"]
+# Label widget filter di sidebar
+LABEL_FILTER = {
+    "puskesmas": "Puskesmas", "regency": "Regency (kecamatan)", "kelurahan": "Kelurahan",
+    "gender": "Gender", "kelompok_usia": "Kelompok usia", "status_gizi": "Status gizi",
+}
+
+# Hasil per kombinasi filter dibagi semua sesi; dibatasi terpisah dari cache preprocessing
+# agar potongan data tidak menggeser hasil penuh dari cache
+_cache_filter = CacheLRU(
+    maks_entri=int(os.environ.get("TBC_CACHE_FILTER_ENTRI", "16")),
+    maks_mb=float(os.environ.get("TBC_CACHE_FILTER_MB", "256")),
+)
+
+
+def kelompok_usia(umur: pd.Series) -> pd.Series:
+    umur = pd.to_numeric(umur, errors="coerce")
+    return pd.cut(umur, bins=BATAS_USIA, labels=LABEL_USIA, right=False)
+
+
+class FilterVisualisasi:
+    """
+    Pilihan filter satu sesi. Daftar kosong / tanggal None berarti kolom itu tidak
+    difilter; tanggal_awal dan tanggal_akhir inklusif.
+    """
+
+    def __init__(self, tanggal_awal=None, tanggal_akhir=None, **pilihan):
+        for kolom in pilihan:
+            if kolom not in KOLOM_FILTER:
+                raise ValueError(f"Kolom filter tidak dikenal: {kolom!r}")
+        self.pilihan = {kolom: sorted(map(str, pilihan.get(kolom) or [])) for kolom in KOLOM_FILTER}
+        self.tanggal_awal = None if tanggal_awal is None else pd.Timestamp(tanggal_awal)
+        self.tanggal_akhir = None if tanggal_akhir is None else pd.Timestamp(tanggal_akhir)
+
+    @property
+    def aktif(self):
+        return any(self.pilihan.values()) or self.tanggal_awal is not None or self.tanggal_akhir is not None
+
+    def kunci(self):
+        """Teks unik filter ini, untuk kunci cache hasil filter."""
+        return repr((sorted((k, v) for k, v in self.pilihan.items() if v), str(self.tanggal_awal), str(self.tanggal_akhir)))
+
+    def deskripsi(self):
+        bagian = [f"{kolom}: {', '.join(nilai)}" for kolom, nilai in self.pilihan.items() if nilai]
+        if self.tanggal_awal is not None or self.tanggal_akhir is not None:
+            awal = self.tanggal_awal.date() if self.tanggal_awal is not None else "…"
+            akhir = self.tanggal_akhir.date() if self.tanggal_akhir is not None else "…"
+            bagian.append(f"date_start: {awal} s/d {akhir}")
+        return "; ".join(bagian) or "tanpa filter"
+
+
+class IndeksFilter:
+    """Indeks posisi baris per nilai setiap kolom filter dan per tanggal, untuk satu versi data."""
+
+    def __init__(self, df: pd.DataFrame, skor=None):
+        self.n = len(df)
+        self._nilai = {}
+        self._kode = {}
+        self._urutan = {}
+        self._batas = {}
+        for kolom in KOLOM_FILTER:
+            if kolom == "kelompok_usia":
+                if "age" not in df.columns:
+                    continue
+                s = kelompok_usia(df["age"])
+            elif kolom in df.columns:
+                s = df[kolom]
+            else:
+                continue
+            if isinstance(s.dtype, pd.CategoricalDtype):
+                kode, nilai = s.cat.codes.to_numpy(), s.cat.categories
+            else:
+                kode, nilai = pd.factorize(s)
+            kode = kode.astype(np.int32)
+            # Nilai kosong (-1) diletakkan di depan urutan, di luar potongan nilai mana pun
+            self._nilai[kolom] = [str(v) for v in nilai]
+            self._kode[kolom] = kode
+            self._urutan[kolom] = np.argsort(kode, kind="stable").astype(np.int32)
+            self._batas[kolom] = np.concatenate([[0], np.cumsum(np.bincount(kode + 1, minlength=len(nilai) + 1))])
+
+        self._tanggal = None
+        if "date_start" in df.columns:
+            tanggal = parse_tanggal(df["date_start"]).to_numpy()
+            ada = ~np.isnat(tanggal)
+            posisi = np.flatnonzero(ada).astype(np.int32)
+            urut = np.argsort(tanggal[ada], kind="stable")
+            self._tanggal = (tanggal[ada][urut], posisi[urut])
+        # Nomor sel kubus ringkasan per baris (lihat ringkasan.IndeksSel)
+        self.sel = IndeksSel(df, skor or {})
+
+    @classmethod
+    def dari_hasil(cls, hasil):
+        return cls(hasil.df, hasil.skor)
+
+    def kolom(self):
+        return list(self._nilai)
+
+    def rentang_tanggal(self):
+        """(tanggal pertama, tanggal terakhir) date_start, atau None jika tidak ada tanggal valid."""
+        if self._tanggal is None or not len(self._tanggal[0]):
+            return None
+        return pd.Timestamp(self._tanggal[0][0]), pd.Timestamp(self._tanggal[0][-1])
+
+    def _posisi_nilai(self, kolom, nilai):
+        kode_nilai = {v: i for i, v in enumerate(self._nilai[kolom])}
+        batas = self._batas[kolom]
+        potongan = [
+            self._urutan[kolom][batas[kode_nilai[v] + 1]:batas[kode_nilai[v] + 2]]
+            for v in nilai if v in kode_nilai
+        ]
+        return np.concatenate(potongan) if potongan else np.zeros(0, dtype=np.int32)
+
+    def _posisi_tanggal(self, awal, akhir):
+        tanggal, posisi = self._tanggal
+        kiri = 0 if awal is None else np.searchsorted(tanggal, np.datetime64(awal.normalize()), side="left")
+        # Tanggal akhir inklusif: semua waktu sebelum hari berikutnya
+        kanan = len(tanggal) if akhir is None else np.searchsorted(
+            tanggal, np.datetime64(akhir.normalize() + pd.Timedelta(days=1)), side="left"
+        )
+        return posisi[kiri:kanan]
+
+    def nilai_tersedia(self, kolom, terpilih=None):
+        """Nilai kolom yang muncul di baris terpilih (bitmap, None = semua baris), urut menurut jumlah terbanyak."""
+        if kolom not in self._kode:
+            return []
+        kode = self._kode[kolom] if terpilih is None else self._kode[kolom][terpilih]
+        jumlah = np.bincount(kode[kode >= 0], minlength=len(self._nilai[kolom]))
+        return [self._nilai[kolom][i] for i in np.argsort(-jumlah, kind="stable") if jumlah[i]]
+
+    def terpilih(self, filter_vis: FilterVisualisasi):
+        """
+        Bitmap (array bool sepanjang data) baris yang lolos semua filter, atau None jika
+        tidak ada filter aktif. Setiap filter menyumbang posisi barisnya; irisannya
+        dihitung dengan menandai posisi filter terkecil lalu menyaring posisi filter lain.
+        """
+        daftar_posisi = [
+            self._posisi_nilai(kolom, nilai)
+            for kolom, nilai in filter_vis.pilihan.items() if nilai and kolom in self._nilai
+        ]
+        if (filter_vis.tanggal_awal is not None or filter_vis.tanggal_akhir is not None) and self._tanggal is not None:
+            daftar_posisi.append(self._posisi_tanggal(filter_vis.tanggal_awal, filter_vis.tanggal_akhir))
+        if not daftar_posisi:
+            return None
+        daftar_posisi.sort(key=len)
+        posisi = daftar_posisi[0]
+        for lain in daftar_posisi[1:]:
+            if not len(posisi):
+                break
+            tanda = np.zeros(self.n, dtype=bool)
+            tanda[lain] = True
+            posisi = posisi[tanda[posisi]]
+        bitmap = np.zeros(self.n, dtype=bool)
+        bitmap[posisi] = True
+        return bitmap
+
+
+def indeks_filter(hasil) -> IndeksFilter:
+    """Indeks filter untuk hasil ini (dibuat sekali per versi data, lihat HasilPreprocessing.turunan)."""
+    return hasil.turunan("indeks_filter", IndeksFilter.dari_hasil)
+
+
+def saring_hasil(hasil, filter_vis: FilterVisualisasi):
+    """
+    HasilPreprocessing untuk baris yang lolos filter (hasil itu sendiri jika tidak ada
+    filter aktif). Hasil per kombinasi filter di-cache, jadi kembali ke filter yang sama
+    tidak memotong data lagi.
+    """
+    if filter_vis is None or not filter_vis.aktif:
+        return hasil
+    h = hashlib.blake2b(digest_size=16)
+    h.update(hasil.fingerprint.encode("utf-8"))
+    h.update(filter_vis.kunci().encode("utf-8"))
+    kunci = h.hexdigest()
+    hasil_filter = _cache_filter.get(kunci)
+    if hasil_filter is None:
+        with tahap("filter:potong", filter=filter_vis.deskripsi()):
+            indeks = indeks_filter(hasil)
+            terpilih = indeks.terpilih(filter_vis)
+            hasil_filter = hasil.potong(terpilih, fingerprint=kunci, ringkasan=indeks.sel.ringkasan(terpilih))
+        _cache_filter.put(kunci, hasil_filter)
+    return hasil_filter
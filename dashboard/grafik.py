@@ -0,0 +1,803 @@
+"""
+Pembuat figur Plotly untuk setiap pilihan di halaman Visualisasi.
+Semua fungsi hanya membaca HasilPreprocessing (tanpa Streamlit), sehingga chart
+yang sama bisa ditampilkan di app, diekspor massal ke ZIP, atau dipakai di luar app.
+
+Setiap pilihan di DAFTAR_VISUALISASI mencantumkan data turunan yang dibutuhkannya
+(DATA_TURUNAN). Data turunan dihitung saat pertama kali diminta dan disimpan di
+HasilPreprocessing (lihat HasilPreprocessing.turunan), jadi membuka satu chart hanya
+menghitung data untuk chart itu, dan rerun berikutnya tinggal memakai hasilnya.
+Pilihan yang punya parameter (mis. frekuensi deret waktu) menerima nilainya sebagai
+argumen kata kunci; tanpa argumen dipakai nilai bawaan (opsi pertama).
+"""
+import pandas as pd
+import plotly.express as px
+
+from analisis_risiko import FAKTOR_RISIKO, AnalisisRisiko
+from deret_waktu import BATAS_JEDA_HARI, DeretKasus
+from detail_kategori import tabel_detail
+from instrumen import diukur
+from wilayah import KOLOM_JUMLAH, LABEL_PERSEN, TINGKAT_WILAYAH, AgregatWilayah, figur_peta, muat_batas
+
+
+@diukur("grafik:persentase_tidak_layak")
+def grafik_persentase_tidak_layak(hasil):
+    kategori_overall = ["Rumah Tidak Layak", "Sanitasi Tidak Layak", "Perilaku Tidak Baik"]
+    persentase_overall = [hasil.persentase["rumah"], hasil.persentase["sanitasi"], hasil.persentase["perilaku"]]
+
+    # Sorting berdasarkan persentase tertinggi
+    sorted_idx = sorted(range(len(persentase_overall)), key=lambda i: persentase_overall[i], reverse=True)
+    kategori_overall = [kategori_overall[i] for i in sorted_idx]
+    persentase_overall = [persentase_overall[i] for i in sorted_idx]
+
+    # Membuat grafik dengan Plotly
+    fig = px.bar(
+        x=kategori_overall,
+        y=persentase_overall,
+        text=[f"{x:.2f}%" for x in persentase_overall],
+        labels={"x": "Kategori", "y": "Persentase (%)"},
+        title="Persentase Rumah, Sanitasi, dan Perilaku Tidak Layak",
+        color=kategori_overall
+    )
+    fig.update_traces(textposition="outside")
+    return fig
+
+
+@diukur("grafik:kebiasaan_ctps")
+def grafik_ctps(hasil):
+    # Grup data berdasarkan kebiasaan CTPS
+    data_ctps = hasil.ringkasan.jumlah_per("kebiasaan_ctps")
+    data_ctps.columns = ["kebiasaan_ctps", "jumlah_pasien"]
+    data_ctps = data_ctps.sort_values(by="jumlah_pasien", ascending=False)
+
+    # Hitung persentase
+    total_pasien_ctps = data_ctps["jumlah_pasien"].sum()
+    data_ctps["persentase"] = (data_ctps["jumlah_pasien"] / total_pasien_ctps) * 100
+
+    # Buat plot dengan Plotly
+    fig = px.bar(
+        data_ctps,
+        x="jumlah_pasien",
+        y="kebiasaan_ctps",
+        orientation="h",
+        text=data_ctps["jumlah_pasien"].astype(str) + " (" + data_ctps["persentase"].round(1).astype(str) + "%)",
+        labels={"jumlah_pasien": "Jumlah Pasien", "kebiasaan_ctps": "Kebiasaan CTPS"},
+        title="📈 Kebiasaan CTPS vs Jumlah Pasien",
+        color="jumlah_pasien",
+        color_continuous_scale="Blues"
+    )
+
+    # Sesuaikan tampilan teks label
+    fig.update_traces(textposition="outside")
+    fig.update_layout(yaxis=dict(categoryorder="total ascending"))
+    return fig
+
+
+@diukur("grafik:hewan_ternak")
+def grafik_ternak(hasil):
+    # Grup data berdasarkan kepemilikan hewan ternak
+    data_ternak = hasil.ringkasan.jumlah_per("memiliki_hewan_ternak")
+    data_ternak.columns = ["memiliki_hewan_ternak", "jumlah_pasien"]
+    data_ternak = data_ternak.sort_values(by="jumlah_pasien", ascending=False)
+
+    # Hitung persentase
+    total_pasien_ternak = data_ternak["jumlah_pasien"].sum()
+    data_ternak["persentase"] = (data_ternak["jumlah_pasien"] / total_pasien_ternak) * 100
+
+    # Buat plot dengan Plotly
+    fig = px.bar(
+        data_ternak,
+        x="jumlah_pasien",
+        y="memiliki_hewan_ternak",
+        orientation="h",
+        text=data_ternak["jumlah_pasien"].astype(str) + " (" + data_ternak["persentase"].round(1).astype(str) + "%)",
+        labels={"jumlah_pasien": "Jumlah Pasien", "memiliki_hewan_ternak": "Memiliki Hewan Ternak"},
+        title="🐑 Memiliki Hewan Ternak vs Jumlah Pasien",
+        color="jumlah_pasien",
+        color_continuous_scale="magma_r"
+    )
+
+    # Sesuaikan tampilan teks label
+    fig.update_traces(textposition="outside")
+    fig.update_layout(yaxis=dict(categoryorder="total ascending"))
+    return fig
+
+
+def _crosstab_pekerjaan(hasil):
+    # Diambil dari tabel kontingensi analisis risiko: label rumah dipetakan ke baris df lewat
+    # posisi index, bukan df.loc[df_rumah.index] yang mengandaikan index df dan skor selaras
+    risiko = data_turunan(hasil, "risiko")
+    if "rumah" not in risiko.domain or "pekerjaan" not in risiko.tabel:
+        return None
+    return risiko.kontingensi("rumah", "pekerjaan")
+
+
+@diukur("grafik:crosstab_rumah_pekerjaan")
+def tabel_crosstab_pekerjaan(hasil):
+    return data_turunan(hasil, "crosstab_pekerjaan")
+
+
+def _pie_kelayakan(persentase_tidak, labels, color_map, title):
+    sizes = [100 - persentase_tidak, persentase_tidak]
+    fig_pie = px.pie(
+        names=labels,
+        values=sizes,
+        color=labels,
+        color_discrete_map=color_map,
+        title=title
+    )
+    # Untuk memberikan efek 'explode' pada slice kedua (Tidak Layak / Tidak Baik)
+    fig_pie.update_traces(textinfo="percent+label", pull=[0, 0.1])
+    return fig_pie
+
+
+@diukur("grafik:rumah_layak")
+def grafik_rumah_pie(hasil):
+    return _pie_kelayakan(
+        hasil.persentase["rumah"], ["Layak", "Tidak Layak"],
+        {"Layak": "#4CAF50", "Tidak Layak": "#E74C3C"}, "Persentase Rumah Layak dan Tidak Layak"
+    )
+
+
+@diukur("grafik:rumah_detail")
+def grafik_rumah_detail(hasil):
+    # Hitung jumlah rumah per sub kategori dari tabel aturan (lihat detail_kategori.py)
+    df_detail = data_turunan(hasil, "detail:rumah")
+
+    # Buat bar chart dengan Plotly
+    fig_bar = px.bar(
+        df_detail,
+        x="Jumlah",
+        y="Kategori",
+        orientation="h",
+        text=df_detail.apply(lambda row: f"{row['Jumlah']} rumah ({row['Persentase']:.1f}%)", axis=1),
+        title="Kategori Rumah Tidak Layak",
+        labels={"Jumlah": "Jumlah Rumah", "Kategori": "Kategori Rumah Tidak Layak"},
+        color="Jumlah",
+        color_continuous_scale="Viridis"
+    )
+
+    # Sesuaikan tampilan teks dan margin agar tidak terpotong
+    fig_bar.update_traces(textposition="outside", textfont=dict(size=10))
+    fig_bar.update_layout(
+        xaxis_range=[0, df_detail["Jumlah"].max() + 5],
+        margin=dict(l=150, r=50, t=50, b=50)
+    )
+    return fig_bar
+
+
+@diukur("grafik:sanitasi_layak")
+def grafik_sanitasi_pie(hasil):
+    return _pie_kelayakan(
+        hasil.persentase["sanitasi"], ["Layak", "Tidak Layak"],
+        {"Layak": "#3498DB", "Tidak Layak": "#E74C3C"}, "Persentase Sanitasi Layak dan Tidak Layak"
+    )
+
+
+@diukur("grafik:sanitasi_detail")
+def grafik_sanitasi_detail(hasil):
+    # Hitung jumlah rumah per kategori dari tabel aturan (lihat detail_kategori.py)
+    df_sanitasi_detail = data_turunan(hasil, "detail:sanitasi")
+
+    # Buat bar chart dengan Plotly Express (horizontal)
+    fig_bar = px.bar(
+        df_sanitasi_detail,
+        x="Jumlah",
+        y="Kategori",
+        orientation="h",
+        text=df_sanitasi_detail.apply(lambda row: f"{row['Jumlah']} rumah ({row['Persentase']:.1f}%)", axis=1),
+        title="Kategori Sanitasi Tidak Layak",
+        labels={"Jumlah": "Jumlah Rumah", "Kategori": "Kategori Sanitasi Tidak Layak"},
+        color="Jumlah",
+        color_continuous_scale="Cividis"
+    )
+    fig_bar.update_traces(textposition="outside", textfont=dict(size=12))
+    fig_bar.update_layout(
+        xaxis_title="Jumlah Rumah",
+        yaxis_title="Kategori Sanitasi Tidak Layak",
+        margin=dict(l=150, r=50, t=50, b=50)
+    )
+    return fig_bar
+
+
+@diukur("grafik:perilaku_baik")
+def grafik_perilaku_pie(hasil):
+    return _pie_kelayakan(
+        hasil.persentase["perilaku"], ["Baik", "Tidak Baik"],
+        {'Baik': '#1F77B4', 'Tidak Baik': '#FF7F0E'}, "Persentase Perilaku Baik dan Tidak Baik"
+    )
+
+
+@diukur("grafik:perilaku_detail")
+def grafik_perilaku_detail(hasil):
+    # Hitung jumlah rumah untuk setiap kategori perilaku tidak sehat dari tabel aturan
+    df_perilaku_detail = data_turunan(hasil, "detail:perilaku")
+
+    # Buat kolom label untuk teks pada batang (di salinan: tabel turunan dipakai bersama)
+    df_perilaku_detail = df_perilaku_detail.assign(Label=df_perilaku_detail.apply(
+        lambda row: f"{row['Jumlah']} ({row['Persentase']:.1f}%)", axis=1
+    ))
+
+    fig_bar = px.bar(
+        df_perilaku_detail,
+        x="Jumlah",
+        y="Kategori",
+        orientation="h",
+        text="Label",
+        title="Kategori Perilaku Tidak Sehat",
+        labels={"Jumlah": "Jumlah Rumah", "Kategori": "Kategori Perilaku Tidak Sehat"},
+        color="Jumlah",
+        color_continuous_scale="Blues"
+    )
+    fig_bar.update_traces(textposition="outside", textfont=dict(size=11))
+    fig_bar.update_layout(
+        xaxis_title="Jumlah Rumah",
+        yaxis_title="Kategori Perilaku Tidak Sehat",
+        margin=dict(l=150, r=50, t=50, b=50)
+    )
+    return fig_bar
+
+
+@diukur("grafik:pasien_per_puskesmas")
+def grafik_puskesmas(hasil):
+    # Hitung jumlah pasien berdasarkan puskesmas
+    puskesmas_counts = hasil.ringkasan.jumlah_per("puskesmas")
+    puskesmas_counts.columns = ["puskesmas", "jumlah_pasien"]
+
+    # Hitung persentase
+    total_pasien = puskesmas_counts["jumlah_pasien"].sum()
+    puskesmas_counts["persentase"] = (puskesmas_counts["jumlah_pasien"] / total_pasien) * 100
+
+    # Urutkan dari terbanyak
+    puskesmas_counts = puskesmas_counts.sort_values(by="jumlah_pasien", ascending=False)
+
+    # Buat plot horizontal dengan Plotly Express
+    fig = px.bar(
+        puskesmas_counts,
+        x="jumlah_pasien",
+        y="puskesmas",
+        orientation="h",
+        text=puskesmas_counts.apply(
+            lambda row: f"{row['jumlah_pasien']} ({row['persentase']:.1f}%)", axis=1
+        ),
+        labels={"jumlah_pasien": "Jumlah Pasien", "puskesmas": "Puskesmas"},
+        title="Jumlah Pasien per Puskesmas",
+        color="jumlah_pasien",
+        color_continuous_scale="magma"
+    )
+    fig.update_traces(textposition="outside")
+    fig.update_layout(yaxis=dict(categoryorder="total ascending"))
+    return fig
+
+
+# Label periode di sumbu x per frekuensi resample
+LABEL_PERIODE = {"D": "Tanggal", "W-MON": "Minggu (mulai Senin)", "MS": "Bulan", "QS": "Triwulan"}
+
+
+def _tren_bulanan(hasil):
+    """Jumlah pasien per bulan (periode, jumlah) dari kubus ringkasan; bulan tanpa kasus bernilai 0."""
+    per_bulan = hasil.ringkasan.jumlah_per("year_month")
+    if per_bulan.empty:
+        return pd.DataFrame(columns=["periode", "jumlah"])
+    jumlah = per_bulan.set_index(pd.to_datetime(per_bulan["year_month"], format="%Y-%m"))["pasien"].sort_index()
+    jumlah = jumlah.reindex(pd.date_range(jumlah.index[0], jumlah.index[-1], freq="MS"), fill_value=0)
+    return pd.DataFrame({"periode": jumlah.index, "jumlah": jumlah.to_numpy()})
+
+
+@diukur("grafik:tren_date_start")
+def grafik_tren(hasil, frekuensi="MS", pemisah=None, jendela=None):
+    if frekuensi == "MS" and pemisah is None and not jendela:
+        # Tren bulanan biasa (pilihan bawaan) cukup dari kubus ringkasan yang sudah ada,
+        # tanpa membangun deret waktu harian
+        deret = _tren_bulanan(hasil)
+    else:
+        # Jumlah pasien per periode date_start dari deret waktu (tanggal sudah di-parse saat preprocessing)
+        deret = data_turunan(hasil, "deret_waktu").deret(frekuensi, pemisah, jendela)
+    if deret.empty:
+        return None
+
+    # Membuat grafik dengan Plotly
+    fig = px.line(
+        deret,
+        x="periode",
+        y="jumlah",
+        color=pemisah,
+        markers=frekuensi != "D",
+        labels={"periode": LABEL_PERIODE[frekuensi], "jumlah": "Jumlah Pasien"},
+        title="Tren Date Start Pasien"
+    )
+    fig.update_traces(line=dict(width=3 if pemisah is None else 2))
+    if jendela:
+        # Rata-rata bergulir digambar putus-putus di atas garis jumlah
+        for nama, bagian in (deret.groupby(pemisah, sort=False) if pemisah else [("Semua", deret)]):
+            fig.add_scatter(
+                x=bagian["periode"], y=bagian["rata_rata_bergulir"], mode="lines",
+                name=f"Rata-rata {jendela} periode" + (f" ({nama})" if pemisah else ""),
+                line=dict(dash="dash", width=2),
+            )
+    return fig
+
+
+@diukur("grafik:banding_tahunan")
+def grafik_banding_tahunan(hasil, frekuensi="MS"):
+    # Jumlah pasien per periode dibanding periode yang sama tahun lalu
+    banding = data_turunan(hasil, "deret_waktu").banding_tahunan(frekuensi)
+    if banding.empty:
+        return None
+    data_plot = banding.melt(
+        id_vars="periode", value_vars=["jumlah", "jumlah_tahun_lalu"], var_name="deret", value_name="pasien"
+    ).replace({"deret": {"jumlah": "Periode ini", "jumlah_tahun_lalu": "Tahun lalu"}})
+
+    fig = px.line(
+        data_plot,
+        x="periode",
+        y="pasien",
+        color="deret",
+        markers=frekuensi != "D",
+        labels={"periode": LABEL_PERIODE[frekuensi], "pasien": "Jumlah Pasien", "deret": ""},
+        title="Jumlah Pasien vs Periode yang Sama Tahun Lalu"
+    )
+    return fig
+
+
+@diukur("grafik:tabel_banding_tahunan")
+def tabel_banding_tahunan(hasil, frekuensi="MS"):
+    banding = data_turunan(hasil, "deret_waktu").banding_tahunan(frekuensi)
+    if banding.empty:
+        return None
+    return banding.rename(columns={
+        "periode": LABEL_PERIODE[frekuensi], "jumlah": "Jumlah Pasien",
+        "jumlah_tahun_lalu": "Tahun Lalu", "perubahan_persen": "Perubahan (%)",
+    })
+
+
+@diukur("grafik:jeda_kunjungan")
+def grafik_jeda(hasil, frekuensi="MS", pemisah=None):
+    # Rata-rata jeda date_start -> tgl_kunjungan per periode (kinerja penemuan kasus)
+    jeda = data_turunan(hasil, "deret_waktu").jeda(frekuensi, pemisah)
+    if jeda.empty or not jeda["kasus"].any():
+        return None
+    fig = px.line(
+        jeda,
+        x="periode",
+        y="rata_rata_hari",
+        color=pemisah,
+        markers=frekuensi != "D",
+        hover_data=["kasus"],
+        labels={"periode": LABEL_PERIODE[frekuensi], "rata_rata_hari": "Rata-rata Jeda (hari)", "kasus": "Kasus"},
+        title="Rata-rata Jeda Date Start → Tanggal Kunjungan"
+    )
+    fig.add_hline(y=BATAS_JEDA_HARI, line_dash="dot", annotation_text=f"Target {BATAS_JEDA_HARI} hari")
+    return fig
+
+
+@diukur("grafik:statistik_jeda")
+def tabel_statistik_jeda(hasil, frekuensi="MS", pemisah=None):
+    statistik = data_turunan(hasil, "deret_waktu").statistik_jeda(pemisah)
+    return statistik if len(statistik) else None
+
+
+# Jumlah wilayah teratas yang digambar pada grafik batang wilayah
+WILAYAH_TERATAS = 20
+
+
+def _tabel_wilayah_urut(hasil, tingkat, ukuran):
+    # Wilayah diurutkan menurut ukuran yang dipilih, agar hotspot ada di atas
+    tabel = data_turunan(hasil, "wilayah").tabel(tingkat)
+    if ukuran in tabel.columns:
+        tabel = tabel.sort_values(ukuran, ascending=False, na_position="last", kind="stable")
+    return tabel.reset_index(drop=True)
+
+
+@diukur("grafik:peta_wilayah")
+def grafik_peta(hasil, tingkat="kelurahan", ukuran=KOLOM_JUMLAH, detail="Sedang"):
+    # Choropleth dari agregat wilayah; tanpa berkas GeoJSON tingkat ini dipakai grafik batang
+    fig = figur_peta(data_turunan(hasil, "wilayah"), tingkat, ukuran, detail)
+    return fig if fig is not None else grafik_wilayah(hasil, tingkat, ukuran)
+
+
+@diukur("grafik:wilayah_teratas")
+def grafik_wilayah(hasil, tingkat="kelurahan", ukuran=KOLOM_JUMLAH, detail=None):
+    tabel = _tabel_wilayah_urut(hasil, tingkat, ukuran)
+    if tabel.empty or ukuran not in tabel.columns:
+        return None
+    tabel = tabel.head(WILAYAH_TERATAS).iloc[::-1]
+    fig = px.bar(
+        tabel, x=ukuran, y=tingkat, orientation="h",
+        hover_data={kol: ":.1f" for kol in LABEL_PERSEN.values() if kol in tabel.columns},
+        title=f"{WILAYAH_TERATAS} {TINGKAT_WILAYAH[tingkat]} Teratas menurut {ukuran}",
+        labels={tingkat: TINGKAT_WILAYAH[tingkat]},
+    )
+    fig.update_layout(height=max(400, 25 * len(tabel) + 150))
+    if muat_batas(tingkat) is None:
+        fig.update_layout(title=fig.layout.title.text + " (peta: berkas batas wilayah tidak ditemukan)")
+    return fig
+
+
+@diukur("grafik:tabel_wilayah")
+def tabel_wilayah(hasil, tingkat="kelurahan", ukuran=KOLOM_JUMLAH, detail=None):
+    tabel = _tabel_wilayah_urut(hasil, tingkat, ukuran)
+    if tabel.empty:
+        return None
+    return tabel.rename(columns={tingkat: TINGKAT_WILAYAH[tingkat]})
+
+
+# Label domain skor untuk pilihan dan judul analisis faktor risiko
+LABEL_DOMAIN = {"rumah": "Rumah Tidak Layak", "sanitasi": "Sanitasi Tidak Layak", "perilaku": "Perilaku Tidak Baik"}
+
+
+@diukur("grafik:peringkat_faktor_risiko")
+def grafik_peringkat_risiko(hasil, jumlah=15):
+    # Pasangan domain x faktor yang signifikan dengan asosiasi terkuat (Cramér's V)
+    peringkat = data_turunan(hasil, "risiko").peringkat()
+    teratas = peringkat[peringkat["Signifikan"]].head(jumlah)
+    if teratas.empty:
+        return None
+    teratas = teratas.assign(Pasangan=teratas["Faktor"] + " → " + teratas["Domain"].map(LABEL_DOMAIN))
+    fig = px.bar(
+        teratas,
+        x="Cramér's V",
+        y="Pasangan",
+        orientation="h",
+        color="Domain",
+        hover_data=["n", "Chi-kuadrat", "db", "p", "Nilai Berisiko", "Rasio Odds", "CI 95%"],
+        title=f"{len(teratas)} Asosiasi Faktor Risiko Terkuat (uji chi-kuadrat, p < 0,05)",
+    )
+    fig.update_layout(yaxis=dict(categoryorder="total ascending"))
+    return fig
+
+
+@diukur("grafik:tabel_peringkat_faktor_risiko")
+def tabel_peringkat_risiko(hasil):
+    peringkat = data_turunan(hasil, "risiko").peringkat()
+    return peringkat.assign(Domain=peringkat["Domain"].map(LABEL_DOMAIN)) if len(peringkat) else None
+
+
+@diukur("grafik:rasio_odds")
+def grafik_rasio_odds(hasil, domain="rumah", faktor=FAKTOR_RISIKO[0]):
+    # Rasio odds tiap nilai faktor (vs nilai lain) dengan selang kepercayaan 95%
+    risiko = data_turunan(hasil, "risiko")
+    if domain not in risiko.domain or faktor not in risiko.faktor(domain):
+        return None
+    odds = risiko.rasio_odds(domain, faktor).reset_index()
+    if len(odds) < 2:
+        return None
+    uji = risiko.peringkat().set_index(["Domain", "Faktor"])
+    judul = f"Rasio Odds {LABEL_DOMAIN[domain]} per {faktor}"
+    if (domain, faktor) in uji.index:
+        baris = uji.loc[(domain, faktor)]
+        judul += f" (χ² = {baris['Chi-kuadrat']:.1f}, db = {baris['db']}, p = {baris['p']:.3g})"
+    fig = px.scatter(
+        odds,
+        x="Rasio Odds",
+        y=faktor,
+        error_x=odds["CI 95% Atas"] - odds["Rasio Odds"],
+        error_x_minus=odds["Rasio Odds"] - odds["CI 95% Bawah"],
+        color="Signifikan",
+        hover_data=["Total", "% Tidak Layak", "CI 95% Bawah", "CI 95% Atas"],
+        log_x=True,
+        title=judul,
+    )
+    fig.add_vline(x=1, line_dash="dot")
+    fig.update_layout(yaxis=dict(categoryorder="array", categoryarray=odds[faktor].tolist()[::-1]))
+    return fig
+
+
+@diukur("grafik:tabel_kontingensi_risiko")
+def tabel_kontingensi_risiko(hasil, domain="rumah", faktor=FAKTOR_RISIKO[0]):
+    risiko = data_turunan(hasil, "risiko")
+    if domain not in risiko.domain or faktor not in risiko.faktor(domain):
+        return None
+    odds = risiko.rasio_odds(domain, faktor)
+    return risiko.kontingensi(domain, faktor).join(odds.drop(columns=["Total", "% Tidak Layak"]))
+
+
+def _usia_gender(hasil):
+    """Jumlah kasus per rentang usia x gender, atau None jika kolom age tidak ada atau kosong."""
+    df = hasil.df
+    if "age" not in df.columns:
+        return None
+    # df berasal dari cache bersama, jadi kolom turunan dibuat sebagai Series terpisah
+    umur = pd.to_numeric(df["age"], errors="coerce")
+    if umur.dropna().empty:
+        return None
+
+    # Definisikan rentang usia (bins) dan labelnya
+    bins = [0, 5, 10, 15, 20, 25, 30, 35, 40, 45, 50, 55, 60, 65, 70, 75, 80, 100]
+    labels = [f"{bins[i]}-{bins[i+1]}" for i in range(len(bins)-1)]
+    age_group = pd.cut(umur, bins=bins, labels=labels, right=False).rename("age_group")
+
+    # Grouping berdasarkan age_group dan gender
+    return df.groupby([age_group, df["gender"]], observed=False).size().reset_index(name="count")
+
+
+@diukur("grafik:distribusi_usia")
+def grafik_usia(hasil):
+    """None jika kolom age tidak ada atau kosong."""
+    age_gender = data_turunan(hasil, "usia_gender")
+    if age_gender is None:
+        return None
+
+    # Plot menggunakan Plotly
+    fig = px.bar(
+        age_gender,
+        x="age_group",
+        y="count",
+        color="gender",
+        barmode="group",
+        labels={"age_group": "Rentang Usia", "count": "Jumlah", "gender": "Jenis Kelamin"},
+        title="Distribusi Usia per Gender"
+    )
+    return fig
+
+
+def _gizi_imunisasi(hasil):
+    df = hasil.df
+    if "status_imunisasi" not in df.columns or "status_gizi" not in df.columns:
+        return None
+    # Grouping data dengan size(), bukan sum()
+    return df.groupby(["status_gizi", "status_imunisasi"], observed=True).size().reset_index(name="count")
+
+
+@diukur("grafik:gizi_imunisasi")
+def grafik_gizi_imunisasi(hasil):
+    """None jika kolom status_gizi / status_imunisasi tidak ada atau datanya kosong."""
+    imunisasi_gizi = data_turunan(hasil, "gizi_imunisasi")
+    if imunisasi_gizi is None or imunisasi_gizi.empty:
+        return None
+
+    # Membuat grafik dengan Plotly
+    fig = px.bar(
+        imunisasi_gizi,
+        x="status_gizi",
+        y="count",
+        color="status_imunisasi",
+        barmode="group",
+        labels={"count": "Jumlah", "status_gizi": "Status Gizi", "status_imunisasi": "Status Imunisasi"},
+        title="Distribusi Status Gizi berdasarkan Status Imunisasi"
+    )
+    return fig
+
+
+@diukur("grafik:distribusi_pekerjaan")
+def grafik_pekerjaan(hasil):
+    # Jumlah pasien per pekerjaan dibaca dari kubus ringkasan (puskesmas x bulan x pekerjaan)
+    data = hasil.ringkasan.jumlah_per("pekerjaan")
+    data.columns = ["pekerjaan", "jumlah_pasien"]
+
+    # Hitung persentase
+    total_pasien = data["jumlah_pasien"].sum()
+    data["persentase"] = (data["jumlah_pasien"] / total_pasien) * 100
+
+    # Urutkan berdasarkan jumlah pasien terbanyak
+    data = data.sort_values(by="jumlah_pasien", ascending=False)
+
+    # Buat label untuk setiap bar
+    data["label"] = data.apply(lambda row: f"{row['jumlah_pasien']} ({row['persentase']:.1f}%)", axis=1)
+
+    # Buat grafik bar horizontal dengan Plotly Express
+    fig = px.bar(
+        data,
+        x="jumlah_pasien",
+        y="pekerjaan",
+        orientation="h",
+        text="label",
+        color="jumlah_pasien",
+        color_continuous_scale="viridis",
+        title="🎯 Distribusi Pekerjaan"
+    )
+    fig.update_traces(textposition="outside")
+    fig.update_layout(
+        xaxis_title="Jumlah Pasien",
+        yaxis_title="Pekerjaan",
+        template="plotly_white"
+    )
+    return fig
+
+
+# Data turunan yang bisa diminta chart: nama -> fungsi(hasil). Dihitung sekali per
+# versi data (HasilPreprocessing), hanya jika ada chart yang memintanya
+DATA_TURUNAN = {
+    "ringkasan": lambda hasil: hasil.ringkasan,
+    "skor": lambda hasil: hasil.skor,
+    "detail:rumah": lambda hasil: tabel_detail(hasil.df, "rumah"),
+    "detail:sanitasi": lambda hasil: tabel_detail(hasil.df, "sanitasi"),
+    "detail:perilaku": lambda hasil: tabel_detail(hasil.df, "perilaku"),
+    "usia_gender": _usia_gender,
+    "gizi_imunisasi": _gizi_imunisasi,
+    "crosstab_pekerjaan": _crosstab_pekerjaan,
+    "deret_waktu": lambda hasil: DeretKasus.dari_data(hasil.df),
+    "wilayah": lambda hasil: AgregatWilayah.dari_data(hasil.df, hasil.skor),
+    "risiko": AnalisisRisiko.dari_hasil,
+}
+
+
+def data_turunan(hasil, nama):
+    """Data turunan `nama` untuk hasil ini (dihitung saat pertama kali diminta)."""
+    return hasil.turunan(nama, DATA_TURUNAN[nama])
+
+
+class Bagian:
+    """
+    Satu figur/tabel dalam satu pilihan visualisasi: nama file ekspor, fungsi pembuatnya,
+    judul kecil di atasnya (opsional), dan apakah chart dibuat selebar kontainer.
+    """
+
+    def __init__(self, nama, fungsi, judul=None, lebar_penuh=True):
+        self.nama = nama
+        self.fungsi = fungsi
+        self.judul = judul
+        self.lebar_penuh = lebar_penuh
+
+
+class Parameter:
+    """
+    Pilihan yang bisa diatur pengguna untuk satu visualisasi: label widget dan
+    {label opsi: nilai argumen}. Opsi pertama adalah nilai bawaan (dipakai ekspor ZIP).
+    """
+
+    def __init__(self, label, opsi):
+        self.label = label
+        self.opsi = dict(opsi)
+
+    @property
+    def bawaan(self):
+        return next(iter(self.opsi.values()))
+
+
+# Parameter bersama chart deret waktu
+PARAMETER_FREKUENSI = Parameter("Frekuensi", {"Bulanan": "MS", "Mingguan": "W-MON", "Harian": "D", "Triwulanan": "QS"})
+PARAMETER_PEMISAH = Parameter("Pisahkan per", {
+    "Tidak dipisah": None, "Puskesmas": "puskesmas", "Type TB": "type_tb", "Gender": "gender",
+})
+
+
+class Visualisasi:
+    """
+    Satu pilihan di halaman Visualisasi: bagian yang ditampilkan berurutan, data
+    turunan yang dibutuhkan (nama di DATA_TURUNAN), kolom data yang wajib ada,
+    subjudul halaman, pesan jika fungsi bagian mengembalikan None, dan parameter
+    (nama argumen -> Parameter) yang diteruskan ke setiap fungsi bagian.
+    """
+
+    def __init__(self, bagian, butuh=(), kolom=(), subjudul=None, pesan_kosong="Data tidak tersedia.", parameter=None):
+        for nama in butuh:
+            if nama not in DATA_TURUNAN:
+                raise ValueError(f"Data turunan tidak dikenal: {nama!r}")
+        self.bagian = list(bagian)
+        self.butuh = tuple(butuh)
+        self.kolom = tuple(kolom)
+        self.subjudul = subjudul
+        self.pesan_kosong = pesan_kosong
+        self.parameter = dict(parameter or {})
+
+    def kolom_kurang(self, df):
+        return [col for col in self.kolom if col not in df.columns]
+
+    def nilai_bawaan(self):
+        return {nama: param.bawaan for nama, param in self.parameter.items()}
+
+    def siapkan(self, hasil):
+        """Menghitung (atau mengambil dari memo) semua data turunan yang dibutuhkan pilihan ini."""
+        for nama in self.butuh:
+            data_turunan(hasil, nama)
+
+
+# Isi setiap pilihan visualisasi (urutan = urutan di selectbox)
+DAFTAR_VISUALISASI = {
+    "📊 Persentase Rumah, Sanitasi, dan Perilaku Tidak Layak": Visualisasi(
+        [Bagian("persentase_tidak_layak", grafik_persentase_tidak_layak, lebar_penuh=False)],
+        butuh=["ringkasan"],
+    ),
+    "📈 Kebiasaan CTPS": Visualisasi(
+        [Bagian("kebiasaan_ctps", grafik_ctps)],
+        butuh=["ringkasan"], subjudul="📈 Kebiasaan CTPS vs Jumlah Pasien",
+    ),
+    "🐑 Memiliki Hewan Ternak": Visualisasi(
+        [Bagian("hewan_ternak", grafik_ternak)],
+        butuh=["ringkasan"], subjudul="🐑 Memiliki Hewan Ternak vs Jumlah Pasien",
+    ),
+    "🏠 Rumah Layak & Tidak Layak (Chart + Detail)": Visualisasi(
+        [Bagian("rumah_layak", grafik_rumah_pie),
+         Bagian("rumah_detail", grafik_rumah_detail, judul="Detail Kategori Rumah Tidak Layak")],
+        butuh=["ringkasan", "detail:rumah"], subjudul="🏠 Rumah Layak & Tidak Layak",
+    ),
+    "🚰 Sanitasi Layak & Tidak Layak (Chart + Detail)": Visualisasi(
+        [Bagian("sanitasi_layak", grafik_sanitasi_pie),
+         Bagian("sanitasi_detail", grafik_sanitasi_detail, judul="Detail Kategori Sanitasi Tidak Layak")],
+        butuh=["ringkasan", "detail:sanitasi"], subjudul="🚰 Sanitasi Layak & Tidak Layak",
+    ),
+    "🚩 Perilaku Baik & Tidak Sehat (Chart + Detail)": Visualisasi(
+        [Bagian("perilaku_baik", grafik_perilaku_pie),
+         Bagian("perilaku_detail", grafik_perilaku_detail, judul="Detail Kategori Perilaku Tidak Sehat")],
+        butuh=["ringkasan", "detail:perilaku"], subjudul="🚩 Perilaku Baik & Tidak Sehat",
+    ),
+    "🩺 Jumlah Pasien per Puskesmas": Visualisasi(
+        [Bagian("pasien_per_puskesmas", grafik_puskesmas)], butuh=["ringkasan"],
+    ),
+    "📅 Tren Date Start Pasien": Visualisasi(
+        # Deret waktu hanya dibangun jika frekuensi/pemisah/rata-rata selain bawaan dipilih
+        [Bagian("tren_date_start", grafik_tren)],
+        butuh=["ringkasan"], kolom=["date_start"], pesan_kosong="Tidak ada date_start yang valid.",
+        parameter={
+            "frekuensi": PARAMETER_FREKUENSI,
+            "pemisah": PARAMETER_PEMISAH,
+            "jendela": Parameter("Rata-rata bergulir", {"Tidak ada": None, "3 periode": 3, "6 periode": 6, "12 periode": 12}),
+        },
+    ),
+    "📆 Perbandingan dengan Tahun Lalu": Visualisasi(
+        [Bagian("banding_tahunan", grafik_banding_tahunan),
+         Bagian("tabel_banding_tahunan", tabel_banding_tahunan, judul="Jumlah per Periode")],
+        butuh=["deret_waktu"], kolom=["date_start"], pesan_kosong="Tidak ada date_start yang valid.",
+        parameter={"frekuensi": PARAMETER_FREKUENSI},
+    ),
+    "⏱️ Jeda Date Start → Tanggal Kunjungan": Visualisasi(
+        [Bagian("jeda_kunjungan", grafik_jeda),
+         Bagian("statistik_jeda", tabel_statistik_jeda, judul="Ringkasan Jeda (hari)")],
+        butuh=["deret_waktu"], kolom=["date_start", "tgl_kunjungan"],
+        pesan_kosong="Tidak ada pasangan date_start dan tgl_kunjungan yang valid.",
+        parameter={"frekuensi": PARAMETER_FREKUENSI, "pemisah": PARAMETER_PEMISAH},
+    ),
+    # Tanpa GeoJSON (lihat wilayah.DIR_GEO) bagian peta menjadi grafik batang wilayah teratas
+    "🗺️ Peta Kasus per Wilayah": Visualisasi(
+        [Bagian("peta_wilayah", grafik_peta),
+         Bagian("tabel_wilayah", tabel_wilayah, judul="Agregat per Wilayah")],
+        butuh=["wilayah"], kolom=["kelurahan", "regency"],
+        pesan_kosong="Tidak ada kasus dengan wilayah terisi.",
+        parameter={
+            "tingkat": Parameter("Tingkat wilayah", {label: kolom for kolom, label in TINGKAT_WILAYAH.items()}),
+            "ukuran": Parameter("Warna/urutan menurut", {
+                kolom: kolom for kolom in [KOLOM_JUMLAH, *LABEL_PERSEN.values()]
+            }),
+            "detail": Parameter("Detail batas", {"Sedang": "Sedang", "Ringkas": "Ringkas", "Penuh": "Penuh"}),
+        },
+    ),
+    "📊 Distribusi Usia": Visualisasi(
+        [Bagian("distribusi_usia", grafik_usia, lebar_penuh=False)],
+        butuh=["usia_gender"], kolom=["age"], pesan_kosong="Data usia kosong.",
+    ),
+    "🟢 Status Gizi dan Imunisasi": Visualisasi(
+        [Bagian("gizi_imunisasi", grafik_gizi_imunisasi, lebar_penuh=False)],
+        butuh=["gizi_imunisasi"], kolom=["status_imunisasi", "status_gizi"],
+        subjudul="🟢 Distribusi Status Gizi dan Imunisasi (Gabungan)",
+        pesan_kosong="Data tidak tersedia untuk status gizi dan imunisasi.",
+    ),
+    "🎯 Distribusi Pekerjaan": Visualisasi(
+        [Bagian("distribusi_pekerjaan", grafik_pekerjaan)], butuh=["ringkasan"],
+    ),
+    "🏠 Tabel Crosstab Rumah Tidak Layak vs Pekerjaan": Visualisasi(
+        [Bagian("crosstab_rumah_pekerjaan", tabel_crosstab_pekerjaan)],
+        butuh=["risiko", "crosstab_pekerjaan"],
+    ),
+    "🧮 Peringkat Faktor Risiko": Visualisasi(
+        [Bagian("peringkat_faktor_risiko", grafik_peringkat_risiko),
+         Bagian("tabel_peringkat_faktor_risiko", tabel_peringkat_risiko, judul="Semua Pasangan Domain x Faktor")],
+        butuh=["risiko"], pesan_kosong="Tidak ada asosiasi yang signifikan atau data skor tidak tersedia.",
+    ),
+    "🔬 Detail Faktor Risiko (Rasio Odds)": Visualisasi(
+        [Bagian("rasio_odds", grafik_rasio_odds),
+         Bagian("tabel_kontingensi_risiko", tabel_kontingensi_risiko, judul="Tabel Kontingensi dan Rasio Odds")],
+        butuh=["risiko"],
+        pesan_kosong="Faktor tidak ada di data, hanya punya satu nilai, atau termasuk kolom skor domain ini.",
+        parameter={
+            "domain": Parameter("Domain", {label: dom for dom, label in LABEL_DOMAIN.items()}),
+            "faktor": Parameter("Faktor", {faktor: faktor for faktor in FAKTOR_RISIKO}),
+        },
+    ),
+}
+
+
+def semua_visualisasi(hasil, pilihan=None):
+    """
+    Membuat semua figur/tabel (atau hanya judul di `pilihan`) sebagai daftar
+    (nama file, objek). Objek None (data tidak tersedia) dilewati.
+    """
+    hasil_grafik = []
+    for nomor, (judul, vis) in enumerate(DAFTAR_VISUALISASI.items(), start=1):
+        if pilihan is not None and judul not in pilihan:
+            continue
+        for bagian in vis.bagian:
+            objek = bagian.fungsi(hasil, **vis.nilai_bawaan())
+            if objek is not None:
+                hasil_grafik.append((f"{nomor:02d}_{bagian.nama}", objek))
+    return hasil_grafik
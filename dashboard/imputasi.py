@@ -0,0 +1,191 @@
+"""
+Mesin imputasi nilai kosong yang dipakai app.py, laporan, dan notebook.
+
+Strategi dipilih per kolom lewat AturanImputasi:
+  modus      nilai yang paling sering muncul (bawaan, sama seperti sebelumnya)
+  median     median, hanya untuk kolom angka (kolom lain memakai modus)
+  rata_rata  rata-rata, hanya untuk kolom angka; kolom bilangan bulat dibulatkan
+  konstanta  nilai tetap dari AturanImputasi.konstanta
+  biarkan    tidak diisi, tetap kosong
+
+Nilai pengisi dihitung sekali per versi data (disimpan di HasilPreprocessing bersama
+jumlah nilai kosong per kolom) dan dipakai ulang untuk baris tambahan. Kolom yang
+kosong semua tidak punya nilai pengisi dan dibiarkan apa adanya.
+
+Aturan bawaan bisa diubah lewat env TBC_IMPUTASI, mis.
+    TBC_IMPUTASI="numerik=median,luas_rumah=rata_rata,pola_asuh=konstanta:Tidak diketahui"
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+STRATEGI = ["modus", "median", "rata_rata", "konstanta", "biarkan"]
+# Strategi yang hanya berlaku untuk kolom angka
+STRATEGI_ANGKA = ["median", "rata_rata"]
+# Kolom angka yang sebenarnya kode/ID: rata-rata atau mediannya tidak bermakna
+KOLOM_KODE = {"pasien": "modus"}
+
+
+def _kolom_diisi(dtype):
+    # Sama seperti sebelumnya: kolom tanggal (datetime) dan boolean tidak diimputasi
+    return (
+        isinstance(dtype, pd.CategoricalDtype)
+        or pd.api.types.is_object_dtype(dtype)
+        or (pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype))
+    )
+
+
+def _kolom_angka(dtype):
+    return not isinstance(dtype, pd.CategoricalDtype) and pd.api.types.is_numeric_dtype(dtype)
+
+
+class AturanImputasi:
+    """
+    Strategi imputasi: numerik/kategori = strategi bawaan kelompok kolom, per_kolom =
+    pengecualian untuk kolom tertentu, konstanta = nilai untuk strategi "konstanta".
+    """
+
+    def __init__(self, numerik="modus", kategori="modus", per_kolom=None, konstanta=None):
+        self.numerik = numerik
+        self.kategori = kategori
+        self.per_kolom = dict(KOLOM_KODE) | dict(per_kolom or {})
+        self.konstanta = dict(konstanta or {})
+        for strategi in [numerik, kategori, *self.per_kolom.values()]:
+            if strategi not in STRATEGI:
+                raise ValueError(f"Strategi imputasi tidak dikenal: {strategi!r} (pilihan: {', '.join(STRATEGI)})")
+
+    @classmethod
+    def dari_teks(cls, teks):
+        """Aturan dari teks "kolom=strategi[:konstanta],..."; kolom "numerik"/"kategori" = bawaan kelompok."""
+        kelompok, per_kolom, konstanta = {}, {}, {}
+        for bagian in filter(None, (s.strip() for s in (teks or "").split(","))):
+            kolom, _, strategi = bagian.partition("=")
+            strategi, _, nilai = strategi.strip().partition(":")
+            kolom = kolom.strip()
+            if kolom in ("numerik", "kategori"):
+                kelompok[kolom] = strategi
+            else:
+                per_kolom[kolom] = strategi
+                if strategi == "konstanta":
+                    konstanta[kolom] = nilai
+        return cls(per_kolom=per_kolom, konstanta=konstanta, **kelompok)
+
+    def strategi(self, col, dtype):
+        strategi = self.per_kolom.get(col, self.numerik if _kolom_angka(dtype) else self.kategori)
+        if strategi in STRATEGI_ANGKA and not _kolom_angka(dtype):
+            return "modus"
+        if strategi == "konstanta" and col not in self.konstanta:
+            return "biarkan"
+        return strategi
+
+    def ganti(self, **ubah):
+        """Salinan aturan dengan sebagian pengaturan diganti (objek ini tidak diubah)."""
+        isi = {"numerik": self.numerik, "kategori": self.kategori,
+               "per_kolom": self.per_kolom, "konstanta": self.konstanta}
+        return AturanImputasi(**(isi | ubah))
+
+    def kunci(self):
+        """Teks unik aturan ini, untuk kunci cache hasil preprocessing."""
+        return repr((self.numerik, self.kategori, sorted(self.per_kolom.items()),
+                     sorted((k, str(v)) for k, v in self.konstanta.items())))
+
+    def __eq__(self, lain):
+        return isinstance(lain, AturanImputasi) and self.kunci() == lain.kunci()
+
+    def __hash__(self):
+        return hash(self.kunci())
+
+
+ATURAN_BAWAAN = AturanImputasi.dari_teks(os.environ.get("TBC_IMPUTASI", ""))
+
+
+def modus(s: pd.Series):
+    """Modus satu kolom, atau None jika kolom kosong semua. Jika ada nilai seri, pilihannya sama dengan Series.mode()."""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        # Hitungan per kode kategori (bincount), tanpa value_counts atas nilai teks
+        kode = s.cat.codes.to_numpy()
+        kode = kode[kode >= 0]
+        if not len(kode):
+            return None
+        return s.cat.categories[np.bincount(kode, minlength=len(s.cat.categories)).argmax()]
+    if _kolom_angka(s.dtype):
+        nilai = s.dropna().to_numpy()
+        if not len(nilai):
+            return None
+        unik, jumlah = np.unique(nilai, return_counts=True)
+        return unik[jumlah.argmax()].item()
+    hasil = s.mode()
+    return hasil.iloc[0] if len(hasil) else None
+
+
+def _statistik_angka(s, strategi):
+    nilai = s.to_numpy(dtype="float64", na_value=np.nan)
+    nilai = nilai[~np.isnan(nilai)]
+    if not len(nilai):
+        return None
+    hasil = float(np.median(nilai) if strategi == "median" else nilai.mean())
+    # Kolom bilangan bulat (mis. Int16 age) tidak bisa diisi pecahan
+    return int(round(hasil)) if pd.api.types.is_integer_dtype(s.dtype) else hasil
+
+
+def hitung_nilai_isi(df: pd.DataFrame, aturan: AturanImputasi = None) -> dict:
+    """Nilai pengisi NaN per kolom sesuai aturan; kolom "biarkan" / kosong semua tidak ada di hasil."""
+    aturan = aturan or ATURAN_BAWAAN
+    nilai_isi = {}
+    for col in df.columns:
+        s = df[col]
+        if not _kolom_diisi(s.dtype):
+            continue
+        strategi = aturan.strategi(col, s.dtype)
+        if strategi == "biarkan":
+            continue
+        if strategi == "konstanta":
+            nilai = aturan.konstanta[col]
+        elif strategi in STRATEGI_ANGKA:
+            nilai = _statistik_angka(s, strategi)
+        else:
+            nilai = modus(s)
+        if nilai is not None:
+            nilai_isi[col] = nilai
+    return nilai_isi
+
+
+def terapkan_imputasi(df: pd.DataFrame, nilai_isi: dict) -> pd.DataFrame:
+    """Mengisi NaN dengan nilai_isi (satu fillna untuk semua kolom). Data asli tidak diubah."""
+    # Hanya kolom yang memang punya nilai kosong
+    ada_kosong = df.isna().any()
+    nilai_isi = {k: v for k, v in nilai_isi.items() if k in df.columns and ada_kosong[k]}
+    if not nilai_isi:
+        return df.copy()
+    # Nilai di luar daftar kategori kolom (konstanta, atau baris tambahan dengan kategori
+    # lebih sedikit) harus didaftarkan dulu agar bisa diisikan
+    kategori_baru = {
+        col: df[col].cat.add_categories([nilai])
+        for col, nilai in nilai_isi.items()
+        if isinstance(df[col].dtype, pd.CategoricalDtype) and nilai not in df[col].cat.categories
+    }
+    if kategori_baru:
+        df = df.assign(**kategori_baru)
+    return df.fillna(nilai_isi)
+
+
+def hitung_kosong(df: pd.DataFrame) -> pd.Series:
+    """Jumlah nilai kosong per kolom (sebelum imputasi)."""
+    return df.isna().sum()
+
+
+def laporan_kosong(kosong: pd.Series, jumlah_baris: int, nilai_isi: dict = None) -> pd.DataFrame:
+    """
+    Tabel nilai kosong seperti missing_data di notebook: hanya kolom yang punya nilai
+    kosong, urut persentase terbesar. Jika nilai_isi diberikan, ditambah kolom
+    "Nilai Isi" (kosong = kolom dibiarkan tanpa imputasi).
+    """
+    kosong = kosong[kosong > 0].sort_values(ascending=False)
+    laporan = pd.DataFrame({
+        "Jumlah Kosong": kosong.astype(int),
+        "Persentase": kosong / max(jumlah_baris, 1) * 100,
+    }, index=kosong.index)
+    if nilai_isi is not None:
+        laporan["Nilai Isi"] = [str(nilai_isi[col]) if col in nilai_isi else None for col in kosong.index]
+    return laporan
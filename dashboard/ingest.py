@@ -0,0 +1,170 @@
+import os
+from collections import Counter
+
+import pandas as pd
+from pandas.api.types import CategoricalDtype
+
+from instrumen import tahap
+from skema import (
+    fields_order, kolom_numerik, kolom_bulat, kolom_tanggal, kolom_wajib, kolom_enumerasi,
+    kosakata, dtype_kolom
+)
+
+UKURAN_CHUNK = int(os.environ.get("TBC_UKURAN_CHUNK", "50000"))
+# Jumlah contoh baris ditolak yang disimpan untuk laporan (total tetap dihitung semua)
+MAKS_CONTOH_DITOLAK = 1000
+
+
+class HasilIngest:
+    """Hasil pembacaan CSV bertahap: data valid + laporan baris yang ditolak."""
+
+    def __init__(self, df, ditolak, jumlah_ditolak, nilai_asing, jumlah_baris):
+        self.df = df
+        self.ditolak = ditolak
+        self.jumlah_ditolak = jumlah_ditolak
+        self.nilai_asing = nilai_asing
+        self.jumlah_baris = jumlah_baris
+
+
+def _ukuran_file(sumber):
+    if isinstance(sumber, (str, os.PathLike)):
+        return os.path.getsize(sumber)
+    # UploadedFile Streamlit punya atribut size
+    return getattr(sumber, "size", None)
+
+
+def validasi_chunk(chunk: pd.DataFrame):
+    """
+    Mengubah satu chunk (semua kolom masih teks) ke tipe eksplisit dari skema.
+    Mengembalikan (chunk_valid, chunk_ditolak, nilai_asing) dengan:
+      - baris ditolak jika kolom wajib kosong, atau isian angka/tanggal tidak bisa dibaca;
+      - nilai enumerasi di luar option_dict tidak ditolak, tetapi dicatat di nilai_asing.
+    """
+    alasan = pd.Series("", index=chunk.index)
+
+    for col in kolom_wajib:
+        if col in chunk.columns:
+            alasan[chunk[col].isna()] += f"{col} kosong; "
+
+    for col in kolom_numerik:
+        if col not in chunk.columns:
+            continue
+        angka = pd.to_numeric(chunk[col], errors="coerce")
+        alasan[angka.isna() & chunk[col].notna()] += f"{col} bukan angka; "
+        if col in kolom_bulat:
+            pecahan = angka.notna() & (angka % 1 != 0)
+            alasan[pecahan] += f"{col} bukan bilangan bulat; "
+            angka = angka.where(~pecahan)
+        chunk[col] = angka
+
+    for col in kolom_tanggal:
+        if col not in chunk.columns:
+            continue
+        tanggal = pd.to_datetime(chunk[col], errors="coerce", format="%Y-%m-%d")
+        alasan[tanggal.isna() & chunk[col].notna()] += f"{col} bukan tanggal YYYY-MM-DD; "
+
+    ditolak_mask = alasan != ""
+    ditolak = chunk[ditolak_mask].assign(alasan_ditolak=alasan[ditolak_mask].str.rstrip("; "))
+    valid = chunk[~ditolak_mask].copy()
+
+    nilai_asing = {}
+    for col in kolom_enumerasi:
+        if col not in valid.columns:
+            continue
+        asing = valid[col][valid[col].notna() & ~valid[col].isin(kosakata(col))]
+        if len(asing):
+            nilai_asing[col] = Counter(asing.value_counts().to_dict())
+    return valid, ditolak, nilai_asing
+
+
+def _gabung_prealokasi(bagian, kolom):
+    """
+    Menggabungkan chunk ke kolom yang sudah dialokasikan sepanjang total baris (Categorical
+    cukup array kode). Setiap chunk disalin lalu langsung dilepas dari daftar, jadi memori
+    puncak kira-kira df akhir + satu chunk, bukan dua kali df seperti pd.concat(bagian).
+    Semua chunk harus sudah bertipe sama per kolom (kategori sudah disamakan).
+    """
+    jumlah = sum(len(chunk) for chunk in bagian)
+    hasil = {col: pd.Series(index=pd.RangeIndex(jumlah), dtype=bagian[0][col].dtype) for col in kolom}
+    awal = 0
+    for i in range(len(bagian)):
+        chunk, bagian[i] = bagian[i], None
+        for col, seri in hasil.items():
+            seri.array[awal:awal + len(chunk)] = chunk[col].array
+        awal += len(chunk)
+    bagian.clear()
+    return pd.DataFrame(hasil, copy=False)
+
+
+def baca_csv_bertahap(sumber, ukuran_chunk=UKURAN_CHUNK, progress=None, sep=';', encoding='utf-8'):
+    """
+    Membaca CSV SITB per chunk dengan tipe eksplisit dari fields_order/option_dict.
+    Setiap chunk divalidasi lalu field enumerasi langsung diubah ke Categorical,
+    sehingga memori puncak mengikuti ukuran chunk, bukan ukuran file teks.
+
+    progress: fungsi opsional progress(fraksi, jumlah_baris) untuk menampilkan kemajuan.
+    """
+    dtypes = dtype_kolom()
+    ukuran_total = _ukuran_file(sumber)
+    kategori = {col: kosakata(col) for col in kolom_enumerasi}
+
+    bagian = []
+    contoh_ditolak = []
+    jumlah_ditolak = 0
+    nilai_asing = {}
+    jumlah_baris = 0
+
+    berkas = open(sumber, "rb") if isinstance(sumber, (str, os.PathLike)) else sumber
+    try:
+        pembaca = pd.read_csv(berkas, sep=sep, encoding=encoding, dtype=str,
+                              keep_default_na=False, na_values=[""], chunksize=ukuran_chunk)
+        for chunk in pembaca:
+            if not bagian and not contoh_ditolak:
+                hilang = [col for col in kolom_wajib if col not in chunk.columns]
+                if hilang:
+                    raise ValueError(f"Kolom wajib tidak ditemukan di CSV: {', '.join(hilang)}")
+
+            jumlah_baris += len(chunk)
+            with tahap("ingest:validasi", baris=len(chunk)):
+                valid, ditolak, asing = validasi_chunk(chunk)
+
+            jumlah_ditolak += len(ditolak)
+            sisa = MAKS_CONTOH_DITOLAK - sum(len(d) for d in contoh_ditolak)
+            if sisa > 0 and len(ditolak):
+                contoh_ditolak.append(ditolak.head(sisa))
+            for col, counter in asing.items():
+                nilai_asing.setdefault(col, Counter()).update(counter)
+
+            # Nilai di luar option_dict ditambahkan sebagai kategori tambahan (urut kemunculan)
+            with tahap("ingest:konversi_tipe", baris=len(valid)):
+                for col in kolom_enumerasi:
+                    if col in valid.columns:
+                        kategori[col].extend(v for v in asing.get(col, {}) if v not in kategori[col])
+                        valid[col] = valid[col].astype(CategoricalDtype(kategori[col]))
+                for col in fields_order:
+                    if col in valid.columns and col not in kolom_enumerasi:
+                        valid[col] = valid[col].astype(dtypes[col])
+            bagian.append(valid)
+
+            if progress is not None:
+                fraksi = min(berkas.tell() / ukuran_total, 1.0) if ukuran_total else None
+                progress(fraksi, jumlah_baris)
+    finally:
+        if berkas is not sumber:
+            berkas.close()
+
+    # Samakan daftar kategori semua chunk (kategori baru hanya ditambah di akhir,
+    # jadi kode chunk lama tidak berubah) agar concat tetap bertipe Categorical
+    for chunk in bagian:
+        for col in kolom_enumerasi:
+            if col in chunk.columns:
+                chunk[col] = chunk[col].cat.set_categories(kategori[col])
+
+    kolom = [c for c in fields_order if bagian and c in bagian[0].columns]
+    kolom += [c for c in (bagian[0].columns if bagian else []) if c not in kolom]
+    with tahap("ingest:gabung", chunk=len(bagian)):
+        df = _gabung_prealokasi(bagian, kolom) if bagian else pd.DataFrame(columns=fields_order)
+    ditolak = pd.concat(contoh_ditolak) if contoh_ditolak else pd.DataFrame()
+    if progress is not None:
+        progress(1.0, jumlah_baris)
+    return HasilIngest(df, ditolak, jumlah_ditolak, nilai_asing, jumlah_baris)
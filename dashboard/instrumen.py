@@ -0,0 +1,257 @@
+"""
+Pencatat waktu dan memori per tahap (parse CSV, imputasi, skor, chart, render, MySQL).
+
+Pemakaian:
+    with tahap("preprocessing:imputasi"):
+        ...
+atau sebagai dekorator:
+    @diukur("grafik:ctps")
+    def grafik_ctps(hasil): ...
+
+Tahap dicatat ke Profil yang sedang aktif di thread/konteks ini (satu Profil per
+rerun Streamlit atau per jalannya CLI). Tanpa Profil aktif, tahap tetap masuk ke
+metrik kumulatif proses dan log, jadi modul lain tidak perlu tahu siapa pemanggilnya.
+
+Keluaran:
+  - panel debug di sidebar app (Profil.tabel())
+  - log terstruktur JSON per tahap ke logger "tbc.tahap"
+    (TBC_LOG_TAHAP=1 untuk langsung menampilkannya di stderr)
+  - metrik kumulatif format teks Prometheus (teks_prometheus()), ditulis ke file
+    TBC_PROMETHEUS_FILE setiap Profil selesai (cocok untuk textfile collector node_exporter)
+"""
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import pandas as pd
+
+FILE_PROMETHEUS = os.environ.get("TBC_PROMETHEUS_FILE", "")
+# Batas atas bucket histogram durasi tahap (detik)
+BUCKET_DETIK = (0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+
+log_tahap = logging.getLogger("tbc.tahap")
+if os.environ.get("TBC_LOG_TAHAP") == "1" and not log_tahap.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    log_tahap.addHandler(_handler)
+    log_tahap.setLevel(logging.INFO)
+
+_profil_aktif = contextvars.ContextVar("profil_aktif", default=None)
+
+try:
+    _UKURAN_HALAMAN = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _UKURAN_HALAMAN = 4096
+
+
+def memori_mb():
+    """Resident set size proses saat ini (MB); None jika tidak bisa dibaca di platform ini."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _UKURAN_HALAMAN / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class CatatanTahap:
+    """Satu tahap yang sudah selesai diukur."""
+
+    def __init__(self, nama, detik, memori_delta, kedalaman, atribut):
+        self.nama = nama
+        self.detik = detik
+        self.memori_delta = memori_delta
+        self.kedalaman = kedalaman
+        self.atribut = atribut
+
+
+class _MetrikProses:
+    """Agregat kumulatif semua tahap di proses ini (dibagi semua sesi) untuk Prometheus."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.jumlah = defaultdict(int)
+        self.total_detik = defaultdict(float)
+        self.bucket = defaultdict(lambda: [0] * len(BUCKET_DETIK))
+        self.memori_terakhir = {}
+
+    def catat(self, nama, detik, memori_delta):
+        with self._lock:
+            self.jumlah[nama] += 1
+            self.total_detik[nama] += detik
+            bucket = self.bucket[nama]
+            for i, batas in enumerate(BUCKET_DETIK):
+                if detik <= batas:
+                    bucket[i] += 1
+            if memori_delta is not None:
+                self.memori_terakhir[nama] = memori_delta
+
+    def teks(self):
+        def label(nama):
+            return nama.replace("\\", "\\\\").replace('"', '\\"')
+
+        baris = [
+            "# HELP tbc_tahap_detik Durasi tahap dashboard TBC (detik).",
+            "# TYPE tbc_tahap_detik histogram",
+        ]
+        with self._lock:
+            for nama in sorted(self.jumlah):
+                for batas, jumlah in zip(BUCKET_DETIK, self.bucket[nama]):
+                    baris.append(f'tbc_tahap_detik_bucket{{tahap="{label(nama)}",le="{batas}"}} {jumlah}')
+                baris.append(f'tbc_tahap_detik_bucket{{tahap="{label(nama)}",le="+Inf"}} {self.jumlah[nama]}')
+                baris.append(f'tbc_tahap_detik_sum{{tahap="{label(nama)}"}} {self.total_detik[nama]:.6f}')
+                baris.append(f'tbc_tahap_detik_count{{tahap="{label(nama)}"}} {self.jumlah[nama]}')
+            baris.append("# HELP tbc_tahap_memori_delta_mb Perubahan RSS pada pengukuran terakhir tahap (MB).")
+            baris.append("# TYPE tbc_tahap_memori_delta_mb gauge")
+            for nama in sorted(self.memori_terakhir):
+                baris.append(f'tbc_tahap_memori_delta_mb{{tahap="{label(nama)}"}} {self.memori_terakhir[nama]:.3f}')
+        rss = memori_mb()
+        if rss is not None:
+            baris.append("# HELP tbc_proses_memori_mb Resident set size proses (MB).")
+            baris.append("# TYPE tbc_proses_memori_mb gauge")
+            baris.append(f"tbc_proses_memori_mb {rss:.3f}")
+        return "\n".join(baris) + "\n"
+
+
+metrik_proses = _MetrikProses()
+
+
+class Profil:
+    """
+    Kumpulan tahap untuk satu jalannya halaman/CLI. Aktifkan dengan mulai() lalu
+    tutup dengan selesai(), atau pakai sebagai context manager.
+    """
+
+    def __init__(self, nama="app"):
+        self.nama = nama
+        self.id = uuid.uuid4().hex[:12]
+        self.catatan = []
+        self._kedalaman = 0
+        self._token = None
+        self._mulai = None
+        self._memori_awal = None
+        self.detik = None
+
+    def mulai(self):
+        self._token = _profil_aktif.set(self)
+        self._mulai = time.perf_counter()
+        self._memori_awal = memori_mb()
+        return self
+
+    def selesai(self):
+        self.detik = time.perf_counter() - self._mulai
+        if self._token is not None:
+            _profil_aktif.reset(self._token)
+            self._token = None
+        memori_akhir = memori_mb()
+        log_tahap.info(json.dumps({
+            "profil": self.nama, "run": self.id, "tahap": "total", "detik": round(self.detik, 6),
+            "memori_mb": None if memori_akhir is None else round(memori_akhir, 3),
+            "jumlah_tahap": len(self.catatan),
+        }))
+        if FILE_PROMETHEUS:
+            tulis_prometheus(FILE_PROMETHEUS)
+        return self
+
+    def __enter__(self):
+        return self.mulai()
+
+    def __exit__(self, *exc):
+        self.selesai()
+        return False
+
+    def tabel(self):
+        """Tahap dalam urutan selesai; nama diberi indentasi sesuai tingkat nesting."""
+        return pd.DataFrame(
+            [
+                {
+                    "Tahap": "  " * c.kedalaman + c.nama,
+                    "Detik": c.detik,
+                    "Memori (MB)": c.memori_delta,
+                    **c.atribut,
+                }
+                for c in self.catatan
+            ],
+            columns=None if self.catatan else ["Tahap", "Detik", "Memori (MB)"],
+        )
+
+    def ringkasan(self):
+        """Total per nama tahap (tanpa nesting), diurutkan dari yang paling lama."""
+        if not self.catatan:
+            return pd.DataFrame(columns=["Tahap", "Jumlah", "Total detik", "Memori (MB)"])
+        df = pd.DataFrame([(c.nama, c.detik, c.memori_delta) for c in self.catatan],
+                          columns=["Tahap", "Detik", "Memori (MB)"])
+        hasil = df.groupby("Tahap", sort=False).agg(
+            **{"Jumlah": ("Detik", "size"), "Total detik": ("Detik", "sum"), "Memori (MB)": ("Memori (MB)", "sum")}
+        )
+        return hasil.sort_values("Total detik", ascending=False).reset_index()
+
+
+def profil_aktif():
+    return _profil_aktif.get()
+
+
+class tahap:
+    """Context manager pengukur satu tahap: durasi (perf_counter) dan perubahan RSS."""
+
+    def __init__(self, nama, **atribut):
+        self.nama = nama
+        self.atribut = atribut
+
+    def __enter__(self):
+        self.profil = _profil_aktif.get()
+        if self.profil is not None:
+            self.kedalaman = self.profil._kedalaman
+            self.profil._kedalaman += 1
+        self.memori_awal = memori_mb()
+        self.mulai = time.perf_counter()
+        return self
+
+    def __exit__(self, jenis_error, *exc):
+        detik = time.perf_counter() - self.mulai
+        memori_akhir = memori_mb()
+        delta = None if memori_akhir is None or self.memori_awal is None else memori_akhir - self.memori_awal
+        metrik_proses.catat(self.nama, detik, delta)
+        if self.profil is not None:
+            self.profil._kedalaman -= 1
+            self.profil.catatan.append(CatatanTahap(self.nama, detik, delta, self.kedalaman, self.atribut))
+        if log_tahap.isEnabledFor(logging.INFO):
+            log_tahap.info(json.dumps({
+                "profil": self.profil.nama if self.profil else None,
+                "run": self.profil.id if self.profil else None,
+                "tahap": self.nama, "detik": round(detik, 6),
+                "memori_delta_mb": None if delta is None else round(delta, 3),
+                "error": jenis_error.__name__ if jenis_error else None,
+                **self.atribut,
+            }, default=str))
+        return False
+
+
+def diukur(nama=None):
+    """Dekorator: seluruh pemanggilan fungsi dicatat sebagai satu tahap."""
+    def dekorator(fungsi):
+        nama_tahap = nama or fungsi.__name__
+
+        @functools.wraps(fungsi)
+        def pembungkus(*args, **kwargs):
+            with tahap(nama_tahap):
+                return fungsi(*args, **kwargs)
+        return pembungkus
+    return dekorator
+
+
+def teks_prometheus():
+    return metrik_proses.teks()
+
+
+def tulis_prometheus(path):
+    """Menulis metrik kumulatif ke file secara atomik (file sementara lalu rename)."""
+    sementara = f"{path}.{os.getpid()}.tmp"
+    with open(sementara, "w", encoding="utf-8") as f:
+        f.write(teks_prometheus())
+    os.replace(sementara, path)
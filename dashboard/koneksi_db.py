@@ -0,0 +1,223 @@
+"""
+Konfigurasi dan pool koneksi MySQL tanpa Streamlit, dipakai app (lewat db_connector.py)
+maupun skrip headless seperti laporan.py dan benchmark yang dijalankan cron.
+"""
+import os
+import queue
+import threading
+import time
+import tomllib
+
+import mysql.connector
+from mysql.connector import errors
+
+from instrumen import tahap
+
+BERKAS_KONFIGURASI = os.environ.get(
+    "TBC_DB_CONFIG", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".streamlit", "secrets.toml")
+)
+
+
+def baca_berkas_konfigurasi(path=BERKAS_KONFIGURASI):
+    """Bagian [mysql] dari berkas TOML (format secrets.toml Streamlit); {} jika tidak ada."""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, "rb") as f:
+        return dict(tomllib.load(f).get("mysql", {}))
+
+
+def konfigurasi_db(rahasia=None):
+    """
+    Pengaturan koneksi MySQL. Urutan prioritas:
+      1. environment variable TBC_DB_* (mis. TBC_DB_HOST, TBC_DB_PASSWORD)
+      2. rahasia: bagian [mysql] yang sudah dibaca pemanggil (app: st.secrets)
+      3. bagian [mysql] di berkas TBC_DB_CONFIG (bawaan .streamlit/secrets.toml di folder dashboard)
+      4. default XAMPP lokal (127.0.0.1:3306, user root tanpa password, database tb_analisistbc)
+    """
+    bawaan = {
+        "host": "127.0.0.1",      # MySQL berjalan secara lokal di XAMPP
+        "port": 3306,
+        "user": "root",           # Username default XAMPP
+        "password": "",           # Password default (kosong) kecuali sudah diubah
+        "database": "tb_analisistbc",
+        "pool_size": 5,
+        "pool_timeout": 10,       # detik menunggu koneksi bebas sebelum menyerah
+        "allow_local_infile": False,
+    }
+    rahasia = {**baca_berkas_konfigurasi(), **(rahasia or {})}
+
+    konfigurasi = {}
+    for kunci, nilai in bawaan.items():
+        nilai = os.environ.get(f"TBC_DB_{kunci.upper()}", rahasia.get(kunci, nilai))
+        if isinstance(bawaan[kunci], bool) and isinstance(nilai, str):
+            nilai = nilai.lower() in ("1", "true", "ya", "yes")
+        elif isinstance(bawaan[kunci], int) and not isinstance(bawaan[kunci], bool):
+            nilai = int(nilai)
+        konfigurasi[kunci] = nilai
+    return konfigurasi
+
+
+class KoneksiPool:
+    """
+    Pembungkus koneksi dari pool. Semua atribut diteruskan ke koneksi MySQL asli,
+    kecuali close() yang mengembalikan koneksi ke pool alih-alih menutupnya.
+    """
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def close(self):
+        if self._conn is not None:
+            self._pool.kembalikan(self._conn)
+            self._conn = None
+
+    def __getattr__(self, nama):
+        if self._conn is None:
+            raise errors.OperationalError("Koneksi sudah dikembalikan ke pool")
+        return getattr(self._conn, nama)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PoolKoneksi:
+    """
+    Pool koneksi MySQL dengan jumlah koneksi terbatas.
+    Setiap koneksi dicek (ping) saat dipinjam dan disambung ulang jika socket-nya
+    sudah basi; jika semua koneksi sedang dipakai, peminjam menunggu sampai
+    pool_timeout detik.
+    """
+
+    def __init__(self, konfigurasi):
+        konfigurasi = dict(konfigurasi)
+        self.ukuran = konfigurasi.pop("pool_size")
+        self.timeout = konfigurasi.pop("pool_timeout")
+        self._konfigurasi = konfigurasi
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._dibuat = 0
+        self.metrik = {
+            "checkout": 0,      # jumlah peminjaman berhasil
+            "tunggu": 0,        # peminjaman yang harus menunggu koneksi bebas
+            "detik_tunggu": 0.0,
+            "gagal": 0,         # koneksi gagal dibuat / gagal health check
+            "sambung_ulang": 0, # socket basi yang berhasil disambung ulang (koneksi yang sama)
+            "diganti": 0,       # socket basi yang gagal disambung ulang dan diganti koneksi baru
+            "dibuat": 0,
+        }
+
+    def _buat_koneksi(self):
+        try:
+            conn = mysql.connector.connect(**self._konfigurasi)
+        except mysql.connector.Error:
+            with self._lock:
+                self._dibuat -= 1
+                self.metrik["gagal"] += 1
+            raise
+        with self._lock:
+            self.metrik["dibuat"] += 1
+        return conn
+
+    def _cek_sehat(self, conn):
+        try:
+            conn.ping(reconnect=False)
+            return conn
+        except mysql.connector.Error:
+            pass
+        # Ping tanpa reconnect dulu agar sambung ulang yang berhasil ikut tercatat
+        try:
+            conn.reconnect(attempts=2, delay=0)
+            with self._lock:
+                self.metrik["sambung_ulang"] += 1
+            return conn
+        except mysql.connector.Error:
+            # Socket basi dan gagal disambung ulang: ganti dengan koneksi baru di slot yang sama
+            with self._lock:
+                self.metrik["gagal"] += 1
+                self.metrik["diganti"] += 1
+            try:
+                conn.close()
+            except mysql.connector.Error:
+                pass
+            return self._buat_koneksi()
+
+    def pinjam(self):
+        """Meminjam satu koneksi; kembalikan dengan close() pada objek hasilnya."""
+        with tahap("mysql:pinjam_koneksi"):
+            return self._pinjam()
+
+    def _pinjam(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                boleh_buat = self._dibuat < self.ukuran
+                if boleh_buat:
+                    self._dibuat += 1
+            if boleh_buat:
+                conn = self._buat_koneksi()
+            else:
+                mulai = time.perf_counter()
+                with self._lock:
+                    self.metrik["tunggu"] += 1
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self.metrik["gagal"] += 1
+                    raise errors.PoolError(
+                        f"Semua {self.ukuran} koneksi sedang dipakai (menunggu {self.timeout} detik)"
+                    )
+                finally:
+                    with self._lock:
+                        self.metrik["detik_tunggu"] += time.perf_counter() - mulai
+        conn = self._cek_sehat(conn)
+        with self._lock:
+            self.metrik["checkout"] += 1
+        return KoneksiPool(self, conn)
+
+    def kembalikan(self, conn):
+        try:
+            # Buang transaksi yang belum di-commit agar peminjam berikutnya mulai bersih
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+        except mysql.connector.Error:
+            with self._lock:
+                self._dibuat -= 1
+            try:
+                conn.close()
+            except mysql.connector.Error:
+                pass
+
+    def statistik(self):
+        with self._lock:
+            hasil = dict(self.metrik)
+            hasil["ukuran"] = self.ukuran
+            hasil["terbuka"] = self._dibuat
+        hasil["idle"] = self._idle.qsize()
+        hasil["dipakai"] = hasil["terbuka"] - hasil["idle"]
+        return hasil
+
+
+_pool = None
+_lock_pool = threading.Lock()
+
+
+def pool_bersama():
+    """Satu pool per proses untuk skrip headless (app memakai db_connector.get_pool)."""
+    global _pool
+    with _lock_pool:
+        if _pool is None:
+            _pool = PoolKoneksi(konfigurasi_db())
+        return _pool
+
+
+def pinjam_koneksi():
+    """Meminjam koneksi dari pool_bersama(); gagal tersambung menjadi mysql.connector.Error."""
+    return pool_bersama().pinjam()
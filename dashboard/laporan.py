@@ -0,0 +1,292 @@
+"""
+Laporan bulanan tanpa Streamlit (bisa dijalankan lewat cron di server tanpa browser).
+Data dibaca dari CSV atau MySQL, disaring per periode, semua metrik dihitung sekali,
+semua chart dirender paralel di process pool, lalu ditulis ke satu file HTML/PDF.
+
+Jalankan dari folder dashboard:
+    python laporan.py --csv "sql (17).csv" --periode 2024-09 --keluar laporan_2024-09.html
+    python laporan.py --mysql --periode 2024Q3 --puskesmas "Puskesmas A" --keluar laporan.pdf
+    python laporan.py --csv data.csv --dari 2024-01-01 --sampai 2024-06-30 --keluar laporan.html
+
+Contoh crontab (tanggal 1 setiap bulan, laporan bulan sebelumnya):
+    0 6 1 * * cd /opt/tbc/dashboard && python laporan.py --mysql --periode lalu --keluar /srv/laporan/tbc.pdf
+"""
+import argparse
+import base64
+import datetime
+import html
+import io
+import os
+import sys
+import time
+
+import pandas as pd
+
+import grafik
+from ekspor import render_paralel
+from instrumen import Profil, tahap
+from preprocessing import fingerprint_data, proses_data
+from sumber_mysql import FilterKasus
+
+# Judul laporan bawaan
+JUDUL_LAPORAN = os.environ.get("TBC_JUDUL_LAPORAN", "Laporan Analisis Kasus TBC")
+
+
+class Laporan:
+    """Semua isi satu laporan: metrik, tabel, dan gambar chart yang sudah dirender."""
+
+    def __init__(self, judul, keterangan, metrik, tabel, gambar, fmt_gambar, detik):
+        self.judul = judul
+        self.keterangan = keterangan
+        self.metrik = metrik
+        self.tabel = tabel            # daftar (nama, DataFrame)
+        self.gambar = gambar          # daftar (nama, judul chart, bytes)
+        self.fmt_gambar = fmt_gambar
+        self.detik = detik
+        self.dibuat = datetime.datetime.now()
+
+
+def rentang_periode(periode=None, dari=None, sampai=None):
+    """
+    Menerjemahkan periode menjadi (tanggal_awal, tanggal_akhir) inklusif.
+    periode: "2024-09" (bulan), "2024Q3" (triwulan), "2024" (tahun), atau "lalu" (bulan lalu).
+    dari/sampai: tanggal awal/akhir eksplisit; keduanya opsional.
+    """
+    if periode:
+        if periode == "lalu":
+            p = pd.Timestamp.today().to_period("M") - 1
+        else:
+            p = pd.Period(periode, freq="Y" if len(periode) == 4 else None)
+        return p.start_time.date(), p.end_time.date()
+    return (pd.Timestamp(dari).date() if dari else None), (pd.Timestamp(sampai).date() if sampai else None)
+
+
+def saring_periode(hasil, tanggal_awal=None, tanggal_akhir=None):
+    """Potongan hasil preprocessing untuk date_start dalam rentang (tanpa memproses ulang)."""
+    if tanggal_awal is None and tanggal_akhir is None:
+        return hasil
+    return hasil.potong(mask_periode(hasil.df, tanggal_awal, tanggal_akhir))
+
+
+def mask_periode(df, tanggal_awal=None, tanggal_akhir=None):
+    """Mask boolean baris df (sudah dibersihkan) dengan date_start dalam rentang inklusif."""
+    tanggal = df["date_start"]
+    mask = tanggal.notna()
+    if tanggal_awal is not None:
+        mask &= tanggal >= pd.Timestamp(tanggal_awal)
+    if tanggal_akhir is not None:
+        mask &= tanggal <= pd.Timestamp(tanggal_akhir)
+    return mask.to_numpy()
+
+
+def baca_csv(path):
+    """Membaca CSV lewat ingest bertahap; mengembalikan (df mentah, fingerprint)."""
+    from ingest import baca_csv_bertahap
+
+    hasil_ingest = baca_csv_bertahap(path)
+    if hasil_ingest.jumlah_ditolak:
+        print(f"{hasil_ingest.jumlah_ditolak} baris ditolak saat validasi CSV", file=sys.stderr)
+    return hasil_ingest.df, fingerprint_data(hasil_ingest.df)
+
+
+def baca_mysql(filter_kasus):
+    """Membaca MySQL dengan filter di server (termasuk periode); mengembalikan (df mentah, fingerprint)."""
+    # koneksi_db tidak butuh Streamlit: konfigurasi dari env TBC_DB_* atau berkas TBC_DB_CONFIG
+    from koneksi_db import pinjam_koneksi
+    from sumber_mysql import baca_kasus
+
+    conn = pinjam_koneksi()
+    try:
+        hasil_query = baca_kasus(conn, filter_kasus)
+    finally:
+        conn.close()
+    return hasil_query.df, hasil_query.fingerprint
+
+
+def muat_csv(path, tanggal_awal=None, tanggal_akhir=None):
+    """Membaca CSV, preprocessing + skor sekali, lalu menyaring periode."""
+    hasil = proses_data(*baca_csv(path))
+    return saring_periode(hasil, tanggal_awal, tanggal_akhir)
+
+
+def muat_mysql(filter_kasus):
+    """Membaca MySQL, lalu preprocessing + skor sekali."""
+    return proses_data(*baca_mysql(filter_kasus))
+
+
+def hitung_metrik(hasil):
+    """KPI utama laporan, dihitung sekali dari hasil preprocessing."""
+    metrik = {
+        "Jumlah kasus": len(hasil.df),
+        "Jumlah puskesmas": int(hasil.df["puskesmas"].nunique()) if "puskesmas" in hasil.df.columns else 0,
+    }
+    if hasil.ada_skor:
+        metrik["Persentase Rumah Tidak Layak"] = hasil.persentase["rumah"]
+        metrik["Persentase Sanitasi Tidak Layak"] = hasil.persentase["sanitasi"]
+        metrik["Persentase Perilaku Tidak Baik"] = hasil.persentase["perilaku"]
+    return metrik
+
+
+def buat_laporan(hasil, keterangan="", judul=JUDUL_LAPORAN, fmt_gambar="png", maks_proses=None):
+    """
+    Menghitung metrik dan semua chart dari satu HasilPreprocessing, lalu merender
+    semua figur sekaligus di process pool. Tidak ada bagian yang butuh Streamlit.
+    """
+    mulai = time.perf_counter()
+    metrik = hitung_metrik(hasil)
+    tabel = []
+    figur = []
+    if hasil.ada_skor and len(hasil.df):
+        for nama, objek in grafik.semua_visualisasi(hasil):
+            if isinstance(objek, pd.DataFrame):
+                tabel.append((nama, objek))
+            else:
+                figur.append((nama, objek))
+    with tahap("laporan:render", jumlah=len(figur)):
+        data_gambar = render_paralel([fig for _, fig in figur], fmt_gambar, maks_proses)
+    gambar = [
+        (nama, fig.layout.title.text or nama, data)
+        for (nama, fig), data in zip(figur, data_gambar)
+    ]
+    return Laporan(judul, keterangan, metrik, tabel, gambar, fmt_gambar, time.perf_counter() - mulai)
+
+
+def _format_metrik(nilai):
+    return f"{nilai:.2f}%" if isinstance(nilai, float) else f"{nilai:,}".replace(",", ".")
+
+
+def tulis_html(laporan, path):
+    """
+    Satu file HTML mandiri: gambar disisipkan (SVG inline atau PNG base64).
+    path boleh berupa nama file atau objek file biner (mis. BytesIO).
+    """
+    bagian = [
+        "<!DOCTYPE html>",
+        "<html lang='id'><head><meta charset='utf-8'>",
+        f"<title>{html.escape(laporan.judul)}</title>",
+        "<style>body{font-family:sans-serif;max-width:1200px;margin:auto;padding:1em}"
+        "table{border-collapse:collapse}td,th{border:1px solid #ccc;padding:4px 8px}"
+        "img,svg{max-width:100%;height:auto}</style>",
+        "</head><body>",
+        f"<h1>{html.escape(laporan.judul)}</h1>",
+        f"<p>{html.escape(laporan.keterangan)}<br>Dibuat: {laporan.dibuat:%Y-%m-%d %H:%M}</p>",
+        "<h2>Ringkasan</h2><table>",
+    ]
+    for nama, nilai in laporan.metrik.items():
+        bagian.append(f"<tr><th>{html.escape(nama)}</th><td>{_format_metrik(nilai)}</td></tr>")
+    bagian.append("</table>")
+    for nama, tabel in laporan.tabel:
+        bagian.append(f"<h2>{html.escape(nama)}</h2>")
+        bagian.append(tabel.round(2).to_html())
+    for nama, judul, data in laporan.gambar:
+        bagian.append(f"<h2>{html.escape(judul)}</h2>")
+        if laporan.fmt_gambar == "svg":
+            bagian.append(data.decode("utf-8"))
+        else:
+            bagian.append(f"<img alt='{html.escape(nama)}' src='data:image/png;base64,{base64.b64encode(data).decode('ascii')}'>")
+    bagian.append("</body></html>")
+    isi = "\n".join(bagian).encode("utf-8")
+    if hasattr(path, "write"):
+        path.write(isi)
+    else:
+        with open(path, "wb") as f:
+            f.write(isi)
+
+
+def tulis_pdf(laporan, path):
+    """
+    Satu file PDF: halaman ringkasan (metrik + tabel), lalu satu halaman per chart.
+    Halaman disusun dengan matplotlib (backend Agg, tanpa display) dari gambar PNG kaleido.
+    path boleh berupa nama file atau objek file biner.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.image as mpimg
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    if laporan.gambar and laporan.fmt_gambar != "png":
+        raise ValueError("Laporan PDF membutuhkan gambar PNG (fmt_gambar='png')")
+
+    ukuran_a4 = (11.69, 8.27)
+    with PdfPages(path) as pdf:
+        fig = plt.figure(figsize=ukuran_a4)
+        baris = [laporan.judul, laporan.keterangan, f"Dibuat: {laporan.dibuat:%Y-%m-%d %H:%M}", ""]
+        baris += [f"{nama}: {_format_metrik(nilai)}" for nama, nilai in laporan.metrik.items()]
+        fig.text(0.05, 0.95, "\n".join(baris), va="top", fontsize=12, family="sans-serif")
+        pdf.savefig(fig)
+        plt.close(fig)
+
+        for nama, tabel in laporan.tabel:
+            fig, ax = plt.subplots(figsize=ukuran_a4)
+            ax.axis("off")
+            ax.set_title(nama)
+            isi = tabel.round(2)
+            ax.table(cellText=isi.astype(str).values, rowLabels=[str(i) for i in isi.index],
+                     colLabels=[str(c) for c in isi.columns], loc="upper center")
+            pdf.savefig(fig)
+            plt.close(fig)
+
+        for nama, judul, data in laporan.gambar:
+            fig, ax = plt.subplots(figsize=ukuran_a4)
+            ax.axis("off")
+            ax.imshow(mpimg.imread(io.BytesIO(data), format="png"))
+            pdf.savefig(fig)
+            plt.close(fig)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sumber = parser.add_mutually_exclusive_group(required=True)
+    sumber.add_argument("--csv", help="file CSV (pemisah ';')")
+    sumber.add_argument("--mysql", action="store_true", help="baca tabel tb_cases (lihat konfigurasi_db)")
+    parser.add_argument("--periode", help='"2024-09", "2024Q3", "2024", atau "lalu" (bulan lalu)')
+    parser.add_argument("--dari", help="tanggal awal date_start (YYYY-MM-DD)")
+    parser.add_argument("--sampai", help="tanggal akhir date_start (YYYY-MM-DD)")
+    parser.add_argument("--puskesmas", nargs="+", help="hanya puskesmas tertentu")
+    parser.add_argument("--keluar", required=True, help="file laporan (.html atau .pdf)")
+    parser.add_argument("--judul", default=JUDUL_LAPORAN)
+    parser.add_argument("--proses", type=int, default=None, help="jumlah proses render (bawaan: jumlah CPU)")
+    parser.add_argument("--profil", action="store_true", help="cetak rincian waktu per tahap ke stderr")
+    args = parser.parse_args(argv)
+
+    jenis = os.path.splitext(args.keluar)[1].lower()
+    if jenis not in (".html", ".pdf"):
+        parser.error("--keluar harus berakhiran .html atau .pdf")
+
+    profil = Profil("laporan").mulai()
+    try:
+        tanggal_awal, tanggal_akhir = rentang_periode(args.periode, args.dari, args.sampai)
+        filter_kasus = FilterKasus(puskesmas=args.puskesmas, tanggal_awal=tanggal_awal, tanggal_akhir=tanggal_akhir)
+        if args.mysql:
+            keterangan = f"Sumber: MySQL ({filter_kasus.deskripsi()})"
+            hasil = muat_mysql(filter_kasus)
+        else:
+            keterangan = f"Sumber: {os.path.basename(args.csv)} ({filter_kasus.deskripsi()})"
+            hasil = muat_csv(args.csv, tanggal_awal, tanggal_akhir)
+            if args.puskesmas:
+                hasil = hasil.potong(hasil.df["puskesmas"].isin(args.puskesmas).to_numpy())
+
+        if not len(hasil.df):
+            print("Peringatan: tidak ada kasus pada periode/filter ini; laporan hanya berisi ringkasan", file=sys.stderr)
+        laporan = buat_laporan(hasil, keterangan, args.judul, "svg" if jenis == ".html" else "png", args.proses)
+        with tahap(f"laporan:tulis_{jenis[1:]}"):
+            if jenis == ".html":
+                tulis_html(laporan, args.keluar)
+            else:
+                tulis_pdf(laporan, args.keluar)
+    except Exception as err:
+        print(f"Gagal membuat laporan: {err}", file=sys.stderr)
+        return 1
+    finally:
+        profil.selesai()
+        if args.profil:
+            print(profil.ringkasan().round(4).to_string(index=False), file=sys.stderr)
+
+    print(f"Laporan ditulis ke {args.keluar}: {laporan.metrik['Jumlah kasus']} kasus, "
+          f"{len(laporan.gambar)} chart, {laporan.detik:.1f} detik")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
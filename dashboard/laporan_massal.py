@@ -0,0 +1,203 @@
+"""
+Laporan per puskesmas (atau per regency/kelurahan) secara paralel.
+Data dibaca dan dibersihkan sekali (imputasi modus, hapus duplikasi, tanggal) di proses
+utama, lalu dipecah per wilayah ke file Arrow sementara; skor, chart, dan render setiap
+wilayah dikerjakan di process pool dengan satu renderer kaleido per worker. Setiap wilayah menghasilkan satu bundel ZIP berisi laporan HTML/PDF,
+gambar chart, tabel crosstab, dan metrik. ringkasan.csv berisi metrik semua wilayah.
+
+Jalankan dari folder dashboard:
+    python laporan_massal.py --csv "sql (17).csv" --periode 2024-09 --folder laporan_2024-09
+    python laporan_massal.py --mysql --periode lalu --per regency --format pdf --folder /srv/laporan/regency
+"""
+import argparse
+import hashlib
+import io
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from ekspor import penyaji
+from laporan import JUDUL_LAPORAN, baca_csv, baca_mysql, buat_laporan, mask_periode, rentang_periode, tulis_html, tulis_pdf
+from preprocessing import HasilPreprocessing, bersihkan_data, hitung_nilai_isi, skor_jika_lengkap
+from sumber_mysql import FilterKasus
+
+# Kolom yang bisa dipakai untuk memecah laporan
+KOLOM_PECAH = ["puskesmas", "regency", "kelurahan"]
+
+
+def nama_file(nama) -> str:
+    """Nama wilayah menjadi nama file yang aman (huruf, angka, garis bawah)."""
+    return re.sub(r"[^0-9A-Za-z]+", "_", str(nama)).strip("_") or "kosong"
+
+
+def pecah_data(df_bersih, kolom="puskesmas", hanya=None):
+    """
+    Memecah df yang sudah dibersihkan per nilai `kolom` (baris tanpa nilai dibuang).
+    Mengembalikan daftar (nama, df bagian) dari bagian terbesar ke terkecil, agar
+    pekerjaan terberat dimulai lebih dulu dan worker selesai hampir bersamaan.
+    """
+    if kolom not in KOLOM_PECAH:
+        raise ValueError(f"Kolom pecah harus salah satu dari {KOLOM_PECAH}")
+    bagian = [(str(nama), df_bagian) for nama, df_bagian in df_bersih.groupby(kolom, observed=True, sort=False)]
+    if hanya:
+        bagian = [(nama, df_bagian) for nama, df_bagian in bagian if nama in set(hanya)]
+    return sorted(bagian, key=lambda b: len(b[1]), reverse=True)
+
+
+def tulis_bagian(df_bagian, path):
+    """Satu bagian ke file Arrow IPC; tipe Categorical/nullable dan index ikut tersimpan."""
+    tabel = pa.Table.from_pandas(df_bagian, preserve_index=True)
+    with pa.OSFile(path, "wb") as sink, ipc.new_file(sink, tabel.schema) as penulis:
+        penulis.write_table(tabel)
+
+
+def baca_bagian(path) -> pd.DataFrame:
+    with pa.memory_map(path, "r") as sumber:
+        return ipc.open_file(sumber).read_all().to_pandas()
+
+
+def tulis_bundel(laporan, path):
+    """ZIP satu wilayah: laporan.html/.pdf, gambar chart, tabel crosstab (CSV), dan metrik.csv."""
+    dokumen = io.BytesIO()
+    if laporan.fmt_gambar == "png":
+        tulis_pdf(laporan, dokumen)
+        nama_dokumen = "laporan.pdf"
+    else:
+        tulis_html(laporan, dokumen)
+        nama_dokumen = "laporan.html"
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as berkas_zip:
+        berkas_zip.writestr(nama_dokumen, dokumen.getvalue())
+        berkas_zip.writestr("metrik.csv", pd.Series(laporan.metrik, name="nilai").to_csv(index_label="metrik"))
+        for nama, tabel in laporan.tabel:
+            berkas_zip.writestr(f"{nama}.csv", tabel.to_csv())
+        for nama, _, data in laporan.gambar:
+            # PNG sudah terkompresi; tidak perlu dikompresi lagi oleh ZIP
+            kompresi = zipfile.ZIP_DEFLATED if laporan.fmt_gambar == "svg" else zipfile.ZIP_STORED
+            berkas_zip.writestr(f"grafik/{nama}.{laporan.fmt_gambar}", data, compress_type=kompresi)
+
+
+def _siapkan_worker():
+    # Renderer kaleido dibuat sekali per worker dan ditunggu sampai panas sebelum wilayah
+    # pertama; bagian berikutnya di worker yang sama memakai proses kaleido yang sama
+    penyaji().tunggu_siap()
+
+
+def _proses_bagian(argumen):
+    # Worker hanya menerima path file bagian, bukan DataFrame yang di-pickle lewat pipe
+    nama, path_bagian, nilai_isi, fingerprint, keterangan, judul, fmt_gambar, path = argumen
+    df_bagian = baca_bagian(path_bagian)
+    hasil = HasilPreprocessing(fingerprint, df_bagian, skor_jika_lengkap(df_bagian), nilai_isi, n_sumber=len(df_bagian))
+    laporan = buat_laporan(hasil, keterangan, judul, fmt_gambar, maks_proses=1)
+    tulis_bundel(laporan, path)
+    return nama, laporan.metrik, path, laporan.detik
+
+
+def laporan_per_wilayah(df, fingerprint, folder, kolom="puskesmas", tanggal_awal=None, tanggal_akhir=None,
+                        keterangan="", judul=JUDUL_LAPORAN, fmt_gambar="svg", hanya=None, maks_proses=None,
+                        progress=None):
+    """
+    Membuat satu bundel per nilai `kolom` dari df mentah (CSV/MySQL).
+    Pembersihan dan filter periode dijalankan sekali di sini, lalu setiap bagian ditulis
+    ke file Arrow sementara; skor, chart, dan render setiap bagian berjalan di process
+    pool ("spawn") yang membaca file itu, jadi waktu total turun sesuai jumlah core. fmt_gambar "svg" menghasilkan laporan HTML, "png" laporan PDF.
+    progress: fungsi opsional progress(fraksi, nama wilayah).
+    Mengembalikan DataFrame ringkasan (satu baris per wilayah), juga ditulis ke ringkasan.csv.
+    """
+    os.makedirs(folder, exist_ok=True)
+    nilai_isi = hitung_nilai_isi(df)
+    df_bersih = bersihkan_data(df, nilai_isi)
+    if tanggal_awal is not None or tanggal_akhir is not None:
+        df_bersih = df_bersih[mask_periode(df_bersih, tanggal_awal, tanggal_akhir)]
+    bagian = pecah_data(df_bersih, kolom, hanya)
+    del df_bersih
+
+    with tempfile.TemporaryDirectory(prefix="laporan_bagian_") as folder_bagian:
+        argumen = []
+        for i, (nama, df_bagian) in enumerate(bagian):
+            h = hashlib.blake2b(digest_size=16)
+            h.update(f"{fingerprint}|{kolom}|{nama}|{tanggal_awal}|{tanggal_akhir}".encode("utf-8"))
+            path_bagian = os.path.join(folder_bagian, f"{i:05d}.arrow")
+            tulis_bagian(df_bagian, path_bagian)
+            path = os.path.join(folder, f"{nama_file(nama)}.zip")
+            argumen.append((nama, path_bagian, nilai_isi, h.hexdigest(), f"{keterangan}; {kolom}: {nama}",
+                            f"{judul} - {nama}", fmt_gambar, path))
+        del bagian
+
+        maks_proses = min(maks_proses or os.cpu_count() or 1, max(len(argumen), 1))
+        baris = []
+        if maks_proses <= 1:
+            hasil_bagian = (_proses_bagian(a) for a in argumen)
+            for i, hasil in enumerate(hasil_bagian, start=1):
+                baris.append(hasil)
+                if progress is not None:
+                    progress(i / len(argumen), hasil[0])
+        else:
+            with ProcessPoolExecutor(max_workers=maks_proses, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_siapkan_worker) as pool:
+                tugas = [pool.submit(_proses_bagian, a) for a in argumen]
+                for i, selesai in enumerate(as_completed(tugas), start=1):
+                    baris.append(selesai.result())
+                    if progress is not None:
+                        progress(i / len(argumen), baris[-1][0])
+
+    ringkasan = pd.DataFrame(
+        [{kolom: nama, **metrik, "bundel": os.path.basename(path), "detik": detik} for nama, metrik, path, detik in baris]
+    )
+    if len(ringkasan):
+        ringkasan = ringkasan.sort_values(kolom).reset_index(drop=True)
+    ringkasan.to_csv(os.path.join(folder, "ringkasan.csv"), index=False)
+    return ringkasan
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sumber = parser.add_mutually_exclusive_group(required=True)
+    sumber.add_argument("--csv", help="file CSV (pemisah ';')")
+    sumber.add_argument("--mysql", action="store_true", help="baca tabel tb_cases (lihat konfigurasi_db)")
+    parser.add_argument("--periode", help='"2024-09", "2024Q3", "2024", atau "lalu" (bulan lalu)')
+    parser.add_argument("--dari", help="tanggal awal date_start (YYYY-MM-DD)")
+    parser.add_argument("--sampai", help="tanggal akhir date_start (YYYY-MM-DD)")
+    parser.add_argument("--per", choices=KOLOM_PECAH, default="puskesmas", help="kolom pemecah laporan")
+    parser.add_argument("--hanya", nargs="+", help="hanya wilayah tertentu")
+    parser.add_argument("--format", choices=["html", "pdf"], default="html", help="format laporan di dalam bundel")
+    parser.add_argument("--folder", required=True, help="folder tujuan bundel ZIP + ringkasan.csv")
+    parser.add_argument("--judul", default=JUDUL_LAPORAN)
+    parser.add_argument("--proses", type=int, default=None, help="jumlah proses (bawaan: jumlah CPU)")
+    args = parser.parse_args(argv)
+
+    mulai = time.perf_counter()
+    try:
+        tanggal_awal, tanggal_akhir = rentang_periode(args.periode, args.dari, args.sampai)
+        filter_kasus = FilterKasus(tanggal_awal=tanggal_awal, tanggal_akhir=tanggal_akhir)
+        if args.mysql:
+            # Filter wilayah + periode dijalankan di server; sisanya di sini
+            filter_kasus = FilterKasus(**{args.per: args.hanya}, tanggal_awal=tanggal_awal, tanggal_akhir=tanggal_akhir)
+            df, fingerprint = baca_mysql(filter_kasus)
+            keterangan = f"Sumber: MySQL ({filter_kasus.deskripsi()})"
+        else:
+            df, fingerprint = baca_csv(args.csv)
+            keterangan = f"Sumber: {os.path.basename(args.csv)} ({filter_kasus.deskripsi()})"
+        ringkasan = laporan_per_wilayah(
+            df, fingerprint, args.folder, args.per, tanggal_awal, tanggal_akhir, keterangan, args.judul,
+            "svg" if args.format == "html" else "png", args.hanya, args.proses,
+            progress=lambda fraksi, nama: print(f"[{fraksi:4.0%}] {nama}")
+        )
+    except Exception as err:
+        print(f"Gagal membuat laporan: {err}", file=sys.stderr)
+        return 1
+
+    print(f"{len(ringkasan)} bundel ditulis ke {args.folder} dalam {time.perf_counter() - mulai:.1f} detik")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Migrasi sekali jalan: menambahkan UNIQUE KEY pada kunci alami tb_cases (pasien + date_start).
+simpan_massal.simpan_kasus menolak menyimpan selama indeks ini belum ada, karena upsert
+tanpa indeks unik menduplikasi baris. Skrip ini tidak menghapus apa pun: jika tabel sudah
+berisi kunci ganda, contohnya ditampilkan dan duplikat harus dibereskan dulu secara manual.
+
+Jalankan dari folder dashboard (koneksi dari TBC_DB_* / .streamlit/secrets.toml):
+    python migrasi_kunci_unik.py --cek     # hanya memeriksa, tidak mengubah skema
+    python migrasi_kunci_unik.py
+"""
+import argparse
+import sys
+
+from koneksi_db import pinjam_koneksi
+from simpan_massal import KUNCI_ALAMI, NAMA_INDEKS_KUNCI, TABEL_KASUS, punya_kunci_unik
+
+
+def cari_kunci_ganda(cursor, tabel=TABEL_KASUS, kunci=KUNCI_ALAMI, batas=10):
+    """Contoh kombinasi kunci yang muncul lebih dari sekali: [(nilai kunci..., jumlah)]."""
+    kolom = ", ".join(kunci)
+    cursor.execute(
+        f"SELECT {kolom}, COUNT(*) FROM {tabel} GROUP BY {kolom} HAVING COUNT(*) > 1 LIMIT {int(batas)}"
+    )
+    return cursor.fetchall()
+
+
+def query_migrasi(tabel=TABEL_KASUS, kunci=KUNCI_ALAMI):
+    return f"ALTER TABLE {tabel} ADD UNIQUE KEY {NAMA_INDEKS_KUNCI} ({', '.join(kunci)})"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=f"Menambahkan UNIQUE KEY {NAMA_INDEKS_KUNCI} pada {TABEL_KASUS}")
+    parser.add_argument("--cek", action="store_true", help="hanya memeriksa indeks dan duplikat, tanpa ALTER TABLE")
+    args = parser.parse_args(argv)
+
+    try:
+        with pinjam_koneksi() as conn:
+            cursor = conn.cursor()
+            try:
+                if punya_kunci_unik(cursor):
+                    print(f"{TABEL_KASUS} sudah punya UNIQUE KEY pada ({', '.join(KUNCI_ALAMI)}); tidak ada yang diubah")
+                    return 0
+                ganda = cari_kunci_ganda(cursor)
+                if ganda:
+                    print(f"{TABEL_KASUS} berisi kunci ganda; bereskan dulu sebelum migrasi. Contoh:", file=sys.stderr)
+                    for *nilai, jumlah in ganda:
+                        print(f"  {' + '.join(map(str, nilai))}: {jumlah} baris", file=sys.stderr)
+                    return 1
+                if args.cek:
+                    print(f"Indeks belum ada dan tidak ada kunci ganda. Migrasi akan menjalankan:\n  {query_migrasi()}")
+                    return 0
+                cursor.execute(query_migrasi())
+                conn.commit()
+            finally:
+                cursor.close()
+    except Exception as err:
+        print(f"Migrasi gagal: {err}", file=sys.stderr)
+        return 1
+
+    print(f"UNIQUE KEY {NAMA_INDEKS_KUNCI} ditambahkan pada {TABEL_KASUS} ({', '.join(KUNCI_ALAMI)})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
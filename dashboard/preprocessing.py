@@ -0,0 +1,464 @@
+import hashlib
+import os
+import sys
+import threading
+import types
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from skor import (
+    kategori_rumah, kategori_sanitasi, kategori_perilaku,
+    hitung_semua_skor
+)
+from dedup import buang_duplikat, hash_identitas, hash_isi
+from imputasi import ATURAN_BAWAAN, hitung_kosong, hitung_nilai_isi, laporan_kosong, terapkan_imputasi
+from instrumen import tahap
+from ringkasan import RingkasanKasus
+from skema import bulan_tanggal, gabung_data, kolom_tanggal, parse_tanggal
+
+# Batas cache preprocessing (dibagi oleh semua sesi dalam satu proses Streamlit)
+CACHE_MAKS_ENTRI = int(os.environ.get("TBC_CACHE_ENTRI", "8"))
+CACHE_MAKS_MB = float(os.environ.get("TBC_CACHE_MB", "512"))
+
+
+class HasilPreprocessing:
+    """
+    Hasil preprocessing halaman Visualisasi untuk satu versi data.
+    Objek ini dipakai bersama antar rerun dan antar sesi, jadi DataFrame
+    di dalamnya tidak boleh diubah (buat salinan jika perlu menambah kolom).
+
+    Baris yang ditambahkan lewat tambah_baris() disimpan sebagai potongan
+    terpisah dan baru digabung saat df/skor benar-benar dibaca, sedangkan
+    KPI dan chart agregat membaca `ringkasan` yang diperbarui secara inkremental.
+    Tabel lain untuk chart tertentu dihitung saat chart itu diminta (turunan()).
+    """
+
+    def __init__(self, fingerprint, df, skor=None, nilai_isi=None, n_sumber=0, kosong=None, ukuran_bytes=None,
+                 ringkasan=None, hash_dasar=None, hash_tambahan=None, turunan=None):
+        """
+        df dan setiap nilai skor boleh berupa DataFrame atau daftar potongan (baru digabung
+        saat dibaca). ukuran_bytes: ukuran df + skor jika sudah diketahui pemanggil.
+        hash_dasar, hash_tambahan, dan turunan dipakai tambah_baris() untuk membawa hash
+        dan data turunan versi sebelumnya.
+        """
+        self.fingerprint = fingerprint
+        self._bagian_df = list(df) if isinstance(df, list) else [df]
+        self._bagian_skor = {
+            nama: list(df_skor) if isinstance(df_skor, list) else [df_skor] for nama, df_skor in (skor or {}).items()
+        }
+        self.nilai_isi = nilai_isi or {}
+        self.n_sumber = n_sumber
+        # Jumlah nilai kosong per kolom pada data sumber (sebelum imputasi), jika diketahui
+        self.kosong = kosong
+        if ringkasan is None:
+            with tahap("preprocessing:ringkasan"):
+                ringkasan = RingkasanKasus.dari_data(self.df, self.skor)
+        self.ringkasan = ringkasan
+        # Hash identitas baris (kunci dedup, terurut) + hash isi pasangannya, dan
+        # {identitas: isi} baris tambahan, untuk cek duplikasi baris yang ditambahkan.
+        # Dihitung saat pertama kali ada baris ditambahkan (lihat _hash_baris_dasar)
+        self._hash_dasar = hash_dasar
+        self.hash_tambahan = hash_tambahan or {}
+        self._turunan = {}
+        self._lock_turunan = threading.RLock()
+        if ukuran_bytes is None:
+            ukuran_bytes = sum(
+                int(bagian.memory_usage(deep=True).sum())
+                for bagian in self._bagian_df + [b for daftar in self._bagian_skor.values() for b in daftar]
+            )
+        self._ukuran_data = ukuran_bytes
+        self._ukuran_turunan = 0
+        for nama, nilai in (turunan or {}).items():
+            self._simpan_turunan(nama, nilai)
+
+    @property
+    def ukuran_bytes(self):
+        """Perkiraan memori versi ini: df + skor (semua potongan) + data turunan yang sudah dihitung."""
+        return self._ukuran_data + self._ukuran_turunan
+
+    def _simpan_turunan(self, nama, nilai):
+        # Objek yang juga bagian df/skor (mis. turunan "skor") tidak dihitung dua kali
+        terhitung = {id(self), id(self._turunan)}
+        terhitung.update(id(b) for b in self._bagian_df)
+        terhitung.update(id(b) for daftar in self._bagian_skor.values() for b in daftar)
+        self._turunan[nama] = nilai
+        self._ukuran_turunan += ukuran_objek(nilai, terhitung)
+
+    def _hash_baris_dasar(self):
+        if self._hash_dasar is None:
+            df = self._bagian_df[0]
+            with tahap("preprocessing:hash_baris"):
+                isi = hash_isi(df)
+                identitas = hash_identitas(df, isi=isi)
+                urutan = np.argsort(identitas, kind="stable")
+                self._hash_dasar = (identitas[urutan], isi[urutan])
+        return self._hash_dasar
+
+    @property
+    def hash_dasar(self):
+        return self._hash_baris_dasar()[0]
+
+    @property
+    def isi_dasar(self):
+        return self._hash_baris_dasar()[1]
+
+    @property
+    def df(self):
+        if len(self._bagian_df) > 1:
+            self._bagian_df = [gabung_data(self._bagian_df, ignore_index=False)]
+        return self._bagian_df[0]
+
+    @property
+    def skor(self):
+        for nama, bagian in self._bagian_skor.items():
+            if len(bagian) > 1:
+                self._bagian_skor[nama] = [gabung_data(bagian, ignore_index=False)]
+        return {nama: bagian[0] for nama, bagian in self._bagian_skor.items()}
+
+    @property
+    def ada_skor(self):
+        return bool(self._bagian_skor)
+
+    @property
+    def persentase(self):
+        return {nama: self.ringkasan.persentase_tidak_layak(nama) for nama in self._bagian_skor}
+
+    def turunan(self, nama, fungsi):
+        """
+        Data turunan versi ini (mis. tabel untuk satu chart): fungsi(self) dihitung saat
+        pertama kali diminta, lalu dipakai ulang antar rerun dan antar sesi. Hasilnya
+        dipakai bersama, jadi tidak boleh diubah.
+        """
+        with self._lock_turunan:
+            if nama not in self._turunan:
+                with tahap(f"turunan:{nama}"):
+                    self._simpan_turunan(nama, fungsi(self))
+            return self._turunan[nama]
+
+    def laporan_kosong(self):
+        """Tabel nilai kosong data sumber + nilai pengisinya (lihat imputasi.laporan_kosong)."""
+        if self.kosong is None:
+            return None
+        return laporan_kosong(self.kosong, self.n_sumber, self.nilai_isi)
+
+    def isi_tersimpan(self, identitas):
+        """Hash isi baris dengan hash identitas tersebut, atau None jika kasusnya belum ada."""
+        if identitas in self.hash_tambahan:
+            return self.hash_tambahan[identitas]
+        i = np.searchsorted(self.hash_dasar, identitas)
+        return self.isi_dasar[i] if i < len(self.hash_dasar) and self.hash_dasar[i] == identitas else None
+
+    def potong(self, mask, fingerprint=None, ringkasan=None):
+        """
+        Hasil untuk sebagian baris (mis. satu periode atau satu puskesmas) tanpa
+        preprocessing dan skor ulang: df dan skor diambil dari baris yang sama,
+        ringkasan dihitung dari potongan itu saja (atau memakai `ringkasan` yang sudah
+        dihitung pemanggil, lihat ringkasan.IndeksSel). Objek ini tidak diubah.
+        """
+        # take() per posisi: df[mask] menggabungkan ulang blok kolom df setiap kali dipanggil
+        mask = np.asarray(mask, dtype=bool)
+        df = self.df.take(np.flatnonzero(mask))
+        skor = {
+            nama: df_skor.take(np.flatnonzero(mask[self.df.index.get_indexer(df_skor.index)]))
+            for nama, df_skor in self.skor.items()
+        }
+        # Daftar kategori dipakai bersama dengan data asal, jadi ukuran dangkal sudah cukup
+        ukuran_bytes = int(
+            df.memory_usage().sum() + sum(df_skor.memory_usage().sum() for df_skor in skor.values())
+        )
+        if fingerprint is None:
+            h = hashlib.blake2b(digest_size=16)
+            h.update(self.fingerprint.encode("utf-8"))
+            h.update(np.ascontiguousarray(df.index.to_numpy(dtype=np.int64)).tobytes())
+            fingerprint = h.hexdigest()
+        return HasilPreprocessing(
+            fingerprint, df, skor or None, self.nilai_isi, n_sumber=self.n_sumber, ukuran_bytes=ukuran_bytes,
+            ringkasan=ringkasan
+        )
+
+    def tambah_baris(self, df_baru, fingerprint_baru):
+        """
+        Membuat versi hasil baru = hasil ini + df_baru, tanpa memproses ulang data lama.
+        Baris baru diimputasi dengan nilai isi (modus) data lama, dicek duplikasinya
+        lewat hash, diberi skor, lalu ditambahkan ke ringkasan. Objek ini tidak diubah.
+        Mengembalikan None jika df_baru berisi versi lain dari kasus yang sudah ada
+        (kunci dedup sama, isi berbeda): versi lama harus diganti, jadi perlu proses penuh.
+        """
+        index_baru = pd.RangeIndex(self.n_sumber, self.n_sumber + len(df_baru))
+        df_baru = df_baru.reindex(columns=[c for c in self._bagian_df[0].columns if c != "year_month"])
+        df_baru.index = index_baru
+        kosong_baru = hitung_kosong(df_baru)
+        df_baru = terapkan_imputasi(df_baru, self.nilai_isi)
+        df_baru = tambah_kolom_tanggal(samakan_tipe(df_baru, self._bagian_df[0].dtypes))
+
+        # Buang kasus yang sudah ada dengan isi sama persis
+        tambahan = dict(self.hash_tambahan)
+        baru = np.zeros(len(df_baru), dtype=bool)
+        for i, (identitas, isi) in enumerate(zip(hash_identitas(df_baru), hash_isi(df_baru))):
+            isi_lama = tambahan.get(identitas, self.isi_tersimpan(identitas))
+            if isi_lama is None:
+                baru[i] = True
+                tambahan[identitas] = isi
+            elif isi_lama != isi:
+                return None
+        df_baru = df_baru[baru]
+
+        skor_baru = hitung_semua_skor(df_baru) if self.ada_skor and len(df_baru) else {}
+        ringkasan = self.ringkasan.salin()
+        ringkasan.tambah(df_baru, skor_baru)
+        # Data turunan yang bisa diperpanjang (agregat inkremental, mis. deret_waktu.DeretKasus)
+        # dibawa ke versi baru cukup dengan baris baru; sisanya dihitung ulang saat diminta
+        with self._lock_turunan:
+            turunan = {
+                nama: nilai.perpanjang(df_baru, skor_baru)
+                for nama, nilai in self._turunan.items() if hasattr(nilai, "perpanjang")
+            }
+        return HasilPreprocessing(
+            fingerprint_baru,
+            self._bagian_df + [df_baru],
+            {
+                nama: bagian + ([skor_baru[nama]] if nama in skor_baru else [])
+                for nama, bagian in self._bagian_skor.items()
+            },
+            self.nilai_isi,
+            n_sumber=self.n_sumber + len(index_baru),
+            kosong=None if self.kosong is None else self.kosong.add(kosong_baru, fill_value=0).astype(int),
+            ukuran_bytes=self._ukuran_data + sum(
+                int(bagian.memory_usage(deep=True).sum()) for bagian in [df_baru, *skor_baru.values()]
+            ),
+            ringkasan=ringkasan,
+            hash_dasar=self._hash_baris_dasar(),
+            hash_tambahan=tambahan,
+            turunan=turunan,
+        )
+
+
+def ukuran_objek(objek, terhitung=None) -> int:
+    """
+    Perkiraan memori objek dalam byte: DataFrame/Series/array memakai ukuran datanya,
+    dict/list/tuple dan atribut objek ditelusuri. Objek yang id-nya ada di `terhitung`
+    (dan objek yang sudah ditemui) tidak dihitung lagi.
+    """
+    terhitung = set() if terhitung is None else terhitung
+    if id(objek) in terhitung or isinstance(objek, (type, types.ModuleType, types.FunctionType, types.MethodType)):
+        return 0
+    terhitung.add(id(objek))
+    if isinstance(objek, pd.DataFrame):
+        return int(objek.memory_usage(deep=True).sum())
+    if isinstance(objek, (pd.Series, pd.Index)):
+        return int(objek.memory_usage(deep=True))
+    if isinstance(objek, np.ndarray):
+        return int(objek.nbytes)
+    if isinstance(objek, dict):
+        return sys.getsizeof(objek) + sum(
+            ukuran_objek(k, terhitung) + ukuran_objek(v, terhitung) for k, v in objek.items()
+        )
+    if isinstance(objek, (list, tuple, set, frozenset)):
+        return sys.getsizeof(objek) + sum(ukuran_objek(v, terhitung) for v in objek)
+    if hasattr(objek, "__dict__"):
+        return sys.getsizeof(objek) + ukuran_objek(vars(objek), terhitung)
+    return sys.getsizeof(objek)
+
+
+def fingerprint_data(df: pd.DataFrame) -> str:
+    """
+    Sidik jari isi DataFrame: hash per baris (vektor, tanpa loop Python)
+    digabung dengan nama dan tipe kolom. Data yang isinya sama akan
+    menghasilkan fingerprint yang sama walaupun objeknya berbeda.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode("utf-8"))
+    h.update(str(len(df)).encode("utf-8"))
+    if len(df) and len(df.columns):
+        h.update(np.ascontiguousarray(hash_baris(df)).tobytes())
+    return h.hexdigest()
+
+
+def gabung_fingerprint(fingerprint_lama: str, df_baru: pd.DataFrame) -> str:
+    """Fingerprint versi data setelah df_baru ditambahkan, tanpa meng-hash data lama lagi."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(fingerprint_lama.encode("utf-8"))
+    h.update(fingerprint_data(df_baru).encode("utf-8"))
+    return h.hexdigest()
+
+
+def hash_baris(df: pd.DataFrame) -> np.ndarray:
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def kunci_hasil(fingerprint: str, aturan=None) -> str:
+    """Kunci cache hasil preprocessing: fingerprint data, ditambah aturan imputasi jika bukan bawaan."""
+    if aturan is None or aturan == ATURAN_BAWAAN:
+        return fingerprint
+    h = hashlib.blake2b(digest_size=16)
+    h.update(fingerprint.encode("utf-8"))
+    h.update(aturan.kunci().encode("utf-8"))
+    return h.hexdigest()
+
+
+def samakan_tipe(df: pd.DataFrame, dtypes: pd.Series) -> pd.DataFrame:
+    """Menyamakan tipe kolom df dengan data acuan jika konversinya berhasil."""
+    df = df.copy()
+    for col in df.columns:
+        if col in dtypes.index and df[col].dtype != dtypes[col]:
+            if isinstance(dtypes[col], pd.CategoricalDtype) and not df[col].dropna().isin(dtypes[col].categories).all():
+                # Nilai di luar kategori akan hilang jika dipaksa jadi Categorical
+                continue
+            try:
+                df[col] = df[col].astype(dtypes[col])
+            except (ValueError, TypeError):
+                pass
+    return df
+
+
+def tambah_kolom_tanggal(df: pd.DataFrame) -> pd.DataFrame:
+    # Kolom tanggal di-parse sekali per versi data (per nilai unik, lihat skema.parse_tanggal);
+    # chart dan deret waktu memakai kolom datetime ini tanpa parse ulang
+    for col in kolom_tanggal:
+        if col in df.columns:
+            df[col] = parse_tanggal(df[col])
+    if "date_start" in df.columns:
+        df["year_month"] = bulan_tanggal(df["date_start"])
+    return df
+
+
+def bersihkan_data(df: pd.DataFrame, nilai_isi: dict = None, aturan=None) -> pd.DataFrame:
+    """
+    Preprocessing dasar: hapus duplikasi (kunci dedup, lihat dedup.py), imputasi
+    (bawaan modus, lihat imputasi.py), konversi tanggal. Data asli tidak diubah;
+    hasilnya DataFrame baru.
+    """
+    # Kasus yang sama (pasien + date_start) cukup sekali, versi terakhir yang dipakai.
+    # Dilakukan sebelum imputasi agar kunci yang kosong tidak terisi modus lalu dianggap sama
+    with tahap("preprocessing:dedup"):
+        df = buang_duplikat(df)
+
+    with tahap("preprocessing:imputasi"):
+        if nilai_isi is None:
+            nilai_isi = hitung_nilai_isi(df, aturan)
+
+        # Isi nilai NaN dengan nilai pengisi per kolom
+        df = terapkan_imputasi(df, nilai_isi)
+
+    with tahap("preprocessing:tanggal"):
+        return tambah_kolom_tanggal(df)
+
+
+def proses_data(df: pd.DataFrame, fingerprint: str = None, aturan=None) -> HasilPreprocessing:
+    """Menjalankan seluruh preprocessing + skor kelayakan tanpa cache."""
+    with tahap("preprocessing", baris=len(df)):
+        if fingerprint is None:
+            fingerprint = kunci_hasil(fingerprint_data(df), aturan)
+        with tahap("preprocessing:modus"):
+            nilai_isi = hitung_nilai_isi(df, aturan)
+            kosong = hitung_kosong(df)
+        df_bersih = bersihkan_data(df, nilai_isi)
+        return HasilPreprocessing(
+            fingerprint, df_bersih, skor_jika_lengkap(df_bersih), nilai_isi, n_sumber=len(df), kosong=kosong
+        )
+
+
+def skor_jika_lengkap(df_bersih: pd.DataFrame):
+    """Skor kelayakan semua domain, atau None jika kolom untuk analisis skor tidak lengkap."""
+    if all(col in df_bersih.columns for col in kategori_rumah + kategori_sanitasi + kategori_perilaku):
+        return hitung_semua_skor(df_bersih)
+    return None
+
+
+class CacheLRU:
+    """
+    Cache LRU thread-safe dengan batas jumlah entri dan total ukuran (MB).
+    Entri yang paling lama tidak dipakai dibuang lebih dulu.
+    """
+
+    def __init__(self, maks_entri=CACHE_MAKS_ENTRI, maks_mb=CACHE_MAKS_MB):
+        self.maks_entri = maks_entri
+        self.maks_bytes = int(maks_mb * 1024 * 1024)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hit = 0
+        self.miss = 0
+
+    def get(self, kunci):
+        with self._lock:
+            if kunci in self._data:
+                self._data.move_to_end(kunci)
+                self.hit += 1
+                return self._data[kunci]
+            self.miss += 1
+            return None
+
+    def put(self, kunci, hasil):
+        with self._lock:
+            self._data[kunci] = hasil
+            self._data.move_to_end(kunci)
+            self._buang_lama()
+
+    def _buang_lama(self):
+        # Entri terbaru selalu dipertahankan walaupun sendirian melebihi batas ukuran
+        while len(self._data) > 1 and (
+            len(self._data) > self.maks_entri or self.total_bytes() > self.maks_bytes
+        ):
+            self._data.popitem(last=False)
+
+    def total_bytes(self):
+        return sum(getattr(h, "ukuran_bytes", 0) for h in self._data.values())
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_cache = CacheLRU()
+
+
+def ambil_hasil(df, fingerprint: str = None, aturan=None) -> HasilPreprocessing:
+    """
+    Mengambil hasil preprocessing dari cache berdasarkan fingerprint data (dan aturan
+    imputasi), atau menghitungnya sekali lalu menyimpannya jika belum ada.
+    df boleh berupa fungsi tanpa argumen yang membentuk DataFrame-nya (mis. gabungan data
+    dasar + input manual); fungsi itu hanya dipanggil jika hasil belum ada di cache.
+    """
+    if fingerprint is None:
+        df = df() if callable(df) else df
+        fingerprint = fingerprint_data(df)
+    kunci = kunci_hasil(fingerprint, aturan)
+    hasil = _cache.get(kunci)
+    if hasil is None:
+        hasil = proses_data(df() if callable(df) else df, kunci, aturan)
+        _cache.put(kunci, hasil)
+    return hasil
+
+
+def tambah_inkremental(fingerprint_lama: str, df_baru: pd.DataFrame, aturan=None):
+    """
+    Mendaftarkan versi data baru (data lama + df_baru) ke cache tanpa memproses
+    ulang data lama. Mengembalikan fingerprint versi baru, atau None jika versi
+    lama belum pernah diproses (hasil akan dihitung penuh saat dibutuhkan).
+    Versi yang mengganti kasus yang sudah ada (lihat tambah_baris) juga dihitung penuh.
+    """
+    if fingerprint_lama is None:
+        return None
+    fingerprint_baru = gabung_fingerprint(fingerprint_lama, df_baru)
+    hasil_lama = _cache.get(kunci_hasil(fingerprint_lama, aturan))
+    if hasil_lama is not None:
+        kunci_baru = kunci_hasil(fingerprint_baru, aturan)
+        hasil_baru = hasil_lama.tambah_baris(df_baru, kunci_baru)
+        if hasil_baru is not None:
+            _cache.put(kunci_baru, hasil_baru)
+    return fingerprint_baru
+
+
+def statistik_cache():
+    """Ringkasan isi cache untuk ditampilkan di UI/debug."""
+    return {
+        "entri": len(_cache),
+        "total_mb": _cache.total_bytes() / (1024 * 1024),
+        "hit": _cache.hit,
+        "miss": _cache.miss,
+    }
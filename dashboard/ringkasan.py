@@ -0,0 +1,210 @@
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from skor import domain_skor
+
+# Dimensi dasar setiap kubus: satu sel = satu puskesmas pada satu bulan date_start
+DIMENSI_DASAR = ["puskesmas", "year_month"]
+# Kolom kategori yang punya kubus sendiri (puskesmas x bulan x nilai kategori)
+DIMENSI_KATEGORI = ["kebiasaan_ctps", "memiliki_hewan_ternak", "pekerjaan"]
+# Kolom yang bisa diminta lewat jumlah_per (dipakai chart agregat)
+DIMENSI_RINGKASAN = DIMENSI_DASAR + DIMENSI_KATEGORI
+# Nama kubus jumlah pasien tanpa dimensi kategori
+KUBUS_PASIEN = "pasien"
+
+
+def nilai_kosong(nilai):
+    # Nilai kosong di kunci kubus: None, NaN/NA, atau bulan "NaT" (date_start tidak valid)
+    if isinstance(nilai, str):
+        return nilai == "NaT"
+    return nilai is None or pd.isna(nilai)
+
+
+class RingkasanKasus:
+    """
+    Kubus hitungan (rollup) untuk chart dan KPI yang hanya butuh jumlah:
+    jumlah pasien per puskesmas x bulan (x kebiasaan CTPS / hewan ternak /
+    pekerjaan), serta jumlah label Layak & Tidak Layak per domain skor.
+
+    Ukuran kubus bergantung pada banyaknya puskesmas, bulan, dan kategori,
+    bukan pada jumlah kasus, sehingga chart membacanya dalam hitungan milidetik.
+    Kubus bisa ditambah baris baru tanpa menghitung ulang seluruh data.
+    """
+
+    def __init__(self):
+        self.kubus = {nama: Counter() for nama in [KUBUS_PASIEN] + DIMENSI_KATEGORI}
+        self.label = {dom: Counter() for dom in domain_skor}
+
+    @classmethod
+    def dari_data(cls, df, skor):
+        ringkasan = cls()
+        ringkasan.tambah(df, skor)
+        return ringkasan
+
+    @staticmethod
+    def _kolom_dasar(df):
+        # Kolom dasar yang tidak ada diganti nilai kosong agar bentuk kunci tetap sama
+        return [df[col] if col in df.columns else pd.Series(None, index=df.index, dtype=object, name=col)
+                for col in DIMENSI_DASAR]
+
+    @staticmethod
+    def _hitung(kunci):
+        jumlah = pd.Series(1, index=kunci[0].index).groupby(kunci, observed=True, dropna=False).size()
+        # NaN diganti None agar kunci kosong selalu sama di Counter (nan != nan)
+        return {tuple(None if nilai_kosong(x) else x for x in k): v for k, v in jumlah.items() if v}
+
+    def tambah(self, df, skor):
+        """Menambahkan hitungan dari df (sudah dibersihkan) dan hasil skornya."""
+        # Hanya kolom dimensi yang dibaca, jadi penyaringan tidak menyalin seluruh kolom df
+        df = df[[col for col in DIMENSI_RINGKASAN + ["pasien"] if col in df.columns]]
+        df_semua = df
+        # Sama seperti groupby(...)["pasien"].count(): hanya baris dengan pasien terisi
+        if "pasien" in df.columns and df["pasien"].hasnans:
+            df = df[df["pasien"].notna()]
+        dasar = self._kolom_dasar(df)
+        self.kubus[KUBUS_PASIEN].update(self._hitung(dasar))
+        for dim in DIMENSI_KATEGORI:
+            if dim in df.columns:
+                self.kubus[dim].update(self._hitung(dasar + [df[dim]]))
+        for dom, df_skor in skor.items():
+            # Baris skor adalah potongan df (index sama), jadi dimensinya diambil lewat index
+            dasar_skor = [kol.reindex(df_skor.index) for kol in self._kolom_dasar(df_semua)]
+            self.label[dom].update(self._hitung(dasar_skor + [df_skor["Label"]]))
+
+    def salin(self):
+        baru = RingkasanKasus()
+        baru.kubus = {nama: Counter(c) for nama, c in self.kubus.items()}
+        baru.label = {dom: Counter(c) for dom, c in self.label.items()}
+        return baru
+
+    @staticmethod
+    def _cocok(kunci, puskesmas, bulan):
+        return (puskesmas is None or kunci[0] in puskesmas) and (bulan is None or kunci[1] in bulan)
+
+    def jumlah_per(self, dim, puskesmas=None, bulan=None):
+        """
+        Setara df.groupby(dim)["pasien"].count().reset_index(), dibaca dari kubus.
+        puskesmas / bulan: daftar opsional untuk membatasi sel kubus yang dijumlahkan.
+        """
+        if dim in DIMENSI_DASAR:
+            counter = self.kubus[KUBUS_PASIEN]
+            posisi = DIMENSI_DASAR.index(dim)
+        else:
+            counter = self.kubus[dim]
+            posisi = len(DIMENSI_DASAR)
+        total = Counter()
+        for kunci, jumlah in counter.items():
+            if not nilai_kosong(kunci[posisi]) and self._cocok(kunci, puskesmas, bulan):
+                total[kunci[posisi]] += jumlah
+        hasil = pd.DataFrame({dim: list(total.keys()), "pasien": list(total.values())})
+        try:
+            hasil = hasil.sort_values(dim, kind="stable")
+        except TypeError:
+            # Nilai campuran (mis. angka dan teks) tidak bisa diurutkan
+            pass
+        return hasil[hasil["pasien"] > 0].reset_index(drop=True)
+
+    def jumlah_label(self, dom, puskesmas=None, bulan=None):
+        total = Counter()
+        for kunci, jumlah in self.label[dom].items():
+            if self._cocok(kunci, puskesmas, bulan):
+                total[kunci[-1]] += jumlah
+        return total
+
+    def persentase_tidak_layak(self, dom, puskesmas=None, bulan=None):
+        counter = self.jumlah_label(dom, puskesmas, bulan)
+        total = sum(counter.values())
+        return counter.get("Tidak Layak", 0) / total * 100 if total else float("nan")
+
+    def ke_tabel(self):
+        """
+        Kubus dalam bentuk tabel panjang yang ringkas:
+        kubus, puskesmas, year_month, nilai, jumlah (kolom teks sebagai Categorical).
+        Label skor disimpan sebagai kubus "label_<domain>".
+        """
+        baris = []
+        sumber = list(self.kubus.items()) + [(f"label_{dom}", c) for dom, c in self.label.items()]
+        for nama, counter in sumber:
+            for kunci, jumlah in counter.items():
+                if jumlah:
+                    nilai = kunci[2] if len(kunci) > 2 else None
+                    baris.append((nama, *(None if nilai_kosong(k) else str(k) for k in (kunci[0], kunci[1], nilai)), int(jumlah)))
+        tabel = pd.DataFrame(baris, columns=["kubus", "puskesmas", "year_month", "nilai", "jumlah"])
+        return tabel.astype({col: "category" for col in ["kubus", "puskesmas", "year_month", "nilai"]})
+
+
+def _kode_kolom(s):
+    """(kode per baris, daftar nilai) satu kolom dimensi; nilai kosong mendapat kode -1."""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return s.cat.codes.to_numpy().astype(np.int64), list(s.cat.categories)
+    kode, unik = pd.factorize(s)
+    return kode.astype(np.int64), list(unik)
+
+
+def _sel_per_baris(kolom):
+    """
+    Nomor sel kubus per baris untuk kombinasi kolom dimensi: (nomor sel 0..k-1 per baris,
+    kunci sel dalam bentuk yang sama dengan RingkasanKasus._hitung).
+    """
+    gabungan = np.zeros(len(kolom[0]), dtype=np.int64)
+    daftar_nilai = []
+    for s in kolom:
+        kode, nilai = _kode_kolom(s)
+        # Kode -1 (kosong) digeser ke 0 supaya tetap punya tempat di nomor gabungan
+        gabungan = gabungan * (len(nilai) + 1) + (kode + 1)
+        daftar_nilai.append([None] + nilai)
+    unik, sel = np.unique(gabungan, return_inverse=True)
+    kunci = []
+    for g in unik.tolist():
+        bagian = []
+        for nilai in reversed(daftar_nilai):
+            g, sisa = divmod(g, len(nilai))
+            bagian.append(nilai[sisa])
+        kunci.append(tuple(None if nilai_kosong(x) else x for x in reversed(bagian)))
+    return sel.astype(np.int32), kunci
+
+
+class IndeksSel:
+    """
+    Nomor sel setiap kubus RingkasanKasus untuk setiap baris df, dihitung sekali per
+    versi data. Ringkasan untuk sebagian baris (filter) cukup menghitung bincount nomor
+    sel baris-baris terpilih, tanpa groupby ulang atas data.
+    """
+
+    def __init__(self, df, skor):
+        self.n = len(df)
+        dasar = RingkasanKasus._kolom_dasar(df)
+        # Baris tanpa pasien tidak dihitung di kubus pasien/kategori (sama seperti tambah())
+        ada_pasien = df["pasien"].notna().to_numpy() if "pasien" in df.columns else np.ones(len(df), dtype=bool)
+        self.posisi_pasien = np.flatnonzero(ada_pasien)
+        self.kubus = {}
+        if len(df):
+            dasar_pasien = [kol[ada_pasien] for kol in dasar]
+            self.kubus[KUBUS_PASIEN] = _sel_per_baris(dasar_pasien)
+            for dim in DIMENSI_KATEGORI:
+                if dim in df.columns:
+                    self.kubus[dim] = _sel_per_baris(dasar_pasien + [df[dim][ada_pasien]])
+        # Label per domain: posisi baris skor di df + nomor sel (puskesmas, bulan, label)
+        self.label = {}
+        for dom, df_skor in skor.items():
+            posisi = df.index.get_indexer(df_skor.index)
+            kolom = [kol.iloc[posisi] for kol in dasar] + [df_skor["Label"]]
+            self.label[dom] = (posisi, _sel_per_baris(kolom) if len(df_skor) else (np.zeros(0, np.int32), []))
+
+    @staticmethod
+    def _hitung(sel, kunci, pilih=None):
+        jumlah = np.bincount(sel if pilih is None else sel[pilih], minlength=len(kunci))
+        return Counter({kunci[i]: int(j) for i, j in enumerate(jumlah.tolist()) if j})
+
+    def ringkasan(self, terpilih=None) -> RingkasanKasus:
+        """Ringkasan untuk baris df dengan terpilih[posisi] True (None = semua baris)."""
+        ringkasan = RingkasanKasus()
+        for nama, (sel, kunci) in self.kubus.items():
+            pilih = None if terpilih is None else terpilih[self.posisi_pasien]
+            ringkasan.kubus[nama] = self._hitung(sel, kunci, pilih)
+        for dom, (posisi, (sel, kunci)) in self.label.items():
+            pilih = None if terpilih is None else terpilih[posisi]
+            ringkasan.label[dom] = self._hitung(sel, kunci, pilih)
+        return ringkasan
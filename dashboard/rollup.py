@@ -0,0 +1,122 @@
+import io
+
+import pandas as pd
+
+from ringkasan import RingkasanKasus, DIMENSI_KATEGORI, nilai_kosong
+from skor import kategori_rumah, kategori_sanitasi, kategori_perilaku, hitung_semua_skor
+from skema import kompakkan
+from preprocessing import tambah_kolom_tanggal
+
+TABEL_KASUS = "tb_cases"
+TABEL_ROLLUP = "tb_rollup_kasus"
+# Jumlah puskesmas per query saat menyegarkan rollup MySQL
+PUSKESMAS_PER_QUERY = 20
+
+# Kolom tb_cases yang dibutuhkan untuk menghitung ulang kubus (proyeksi, bukan SELECT *)
+_KOLOM_SUMBER = list(dict.fromkeys(
+    ["pasien", "puskesmas", "date_start"] + DIMENSI_KATEGORI + kategori_rumah + kategori_sanitasi + kategori_perilaku
+))
+
+
+# ================================
+# Ekspor rollup (file Parquet)
+# ================================
+def ke_parquet(ringkasan: RingkasanKasus) -> bytes:
+    """Isi file Parquet kubus ringkasan (mis. untuk tombol download)."""
+    buffer = io.BytesIO()
+    ringkasan.ke_tabel().to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+# ================================
+# Rollup MySQL (tabel ringkasan)
+# ================================
+def buat_tabel_rollup(cursor, tabel=TABEL_ROLLUP):
+    # Nilai kosong disimpan sebagai '' karena kolom primary key tidak boleh NULL
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {tabel} ("
+        "kubus VARCHAR(64) NOT NULL, "
+        "puskesmas VARCHAR(128) NOT NULL DEFAULT '', "
+        "bulan CHAR(7) NOT NULL DEFAULT '', "
+        "nilai VARCHAR(255) NOT NULL DEFAULT '', "
+        "jumlah INT NOT NULL, "
+        "PRIMARY KEY (kubus, puskesmas, bulan, nilai), "
+        "KEY idx_rollup_sel (puskesmas, bulan))"
+    )
+
+
+def _baca_sel(cursor, sel, tabel_kasus):
+    """Membaca ulang baris tb_cases untuk sel-sel puskesmas x bulan yang disentuh."""
+    bagian = []
+    semua_puskesmas = sorted({p for p, _ in sel})
+    bulan = [b for _, b in sel if b]
+    for awal in range(0, len(semua_puskesmas), PUSKESMAS_PER_QUERY):
+        puskesmas = semua_puskesmas[awal:awal + PUSKESMAS_PER_QUERY]
+        kondisi = []
+        parameter = []
+        bernilai = [p for p in puskesmas if p]
+        if bernilai:
+            kondisi.append(f"puskesmas IN ({', '.join(['%s'] * len(bernilai))})")
+            parameter.extend(bernilai)
+        if "" in puskesmas:
+            kondisi.append("puskesmas IS NULL OR puskesmas = ''")
+        query = f"SELECT {', '.join(_KOLOM_SUMBER)} FROM {tabel_kasus} WHERE ({' OR '.join(kondisi)})"
+        if bulan:
+            # Rentang tanggal menyempitkan scan; sel yang tepat disaring lagi di bawah
+            query += " AND (date_start IS NULL OR (date_start >= %s AND date_start < %s))"
+            parameter += [f"{min(bulan)}-01", (pd.Period(max(bulan), "M") + 1).strftime("%Y-%m-01")]
+        cursor.execute(query, parameter)
+        bagian.append(pd.DataFrame.from_records(cursor.fetchall(), columns=_KOLOM_SUMBER))
+    df = pd.concat(bagian, ignore_index=True) if bagian else pd.DataFrame(columns=_KOLOM_SUMBER)
+    df["date_start"] = pd.to_datetime(df["date_start"], errors="coerce").dt.strftime("%Y-%m-%d")
+    df = kompakkan(df)
+    kunci = pd.Series(list(zip(
+        df["puskesmas"].astype(object).map(lambda p: "" if nilai_kosong(p) else str(p)),
+        pd.to_datetime(df["date_start"], errors="coerce").dt.strftime("%Y-%m").fillna(""),
+    )), index=df.index)
+    return df[kunci.isin(sel)]
+
+
+def segarkan_mysql(conn, sel_berubah, tabel=TABEL_ROLLUP, tabel_kasus=TABEL_KASUS) -> int:
+    """
+    Menyegarkan tabel rollup MySQL secara inkremental: hanya sel (puskesmas, bulan)
+    di sel_berubah (mis. LaporanSimpan.sel_berubah, '' untuk nilai kosong) yang dihitung
+    ulang dari tb_cases, lalu sel lama diganti dalam satu transaksi. Karena isi sel diganti
+    (bukan ditambah), menyegarkan sel yang sama berulang kali tidak menggandakan hitungan.
+    Mengembalikan jumlah sel.
+
+    Rollup MySQL menghitung data sebagaimana tersimpan (tanpa imputasi); baris dengan
+    jawaban skor yang tidak lengkap tidak diberi label Layak/Tidak Layak.
+    """
+    sel = set(sel_berubah)
+    if not sel:
+        return 0
+    cursor = conn.cursor()
+    try:
+        buat_tabel_rollup(cursor, tabel)
+        df = tambah_kolom_tanggal(_baca_sel(cursor, sel, tabel_kasus))
+        ringkasan = RingkasanKasus.dari_data(df, hitung_semua_skor(df) if len(df) else {})
+        baris = [
+            (nama, *("" if nilai_kosong(k) else k for k in (puskesmas, bulan, nilai)), int(jumlah))
+            for nama, puskesmas, bulan, nilai, jumlah in ringkasan.ke_tabel().astype(object).itertuples(index=False, name=None)
+        ]
+        daftar_sel = sorted(sel)
+        for awal in range(0, len(daftar_sel), 500):
+            potongan = daftar_sel[awal:awal + 500]
+            cursor.execute(
+                f"DELETE FROM {tabel} WHERE (puskesmas, bulan) IN ({', '.join(['(%s, %s)'] * len(potongan))})",
+                [v for pasangan in potongan for v in pasangan]
+            )
+        if baris:
+            cursor.executemany(
+                f"INSERT INTO {tabel} (kubus, puskesmas, bulan, nilai, jumlah) VALUES (%s, %s, %s, %s, %s)",
+                baris
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return len(sel)
+
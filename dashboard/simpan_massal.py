@@ -0,0 +1,213 @@
+import os
+import tempfile
+import time
+
+import mysql.connector
+import pandas as pd
+
+from instrumen import tahap
+from skema import fields_order, kolom_tanggal
+
+TABEL_KASUS = "tb_cases"
+# Kunci alami satu kasus: pasien yang sama dengan tanggal mulai yang sama
+KUNCI_ALAMI = ("pasien", "date_start")
+NAMA_INDEKS_KUNCI = "uq_tb_cases_pasien_date"
+UKURAN_BATCH = int(os.environ.get("TBC_UKURAN_BATCH", "5000"))
+
+
+class LaporanSimpan:
+    """Ringkasan hasil simpan massal: jumlah baris baru/diperbarui/dilewati + waktu per batch."""
+
+    def __init__(self):
+        self.ditambah = 0
+        self.diperbarui = 0
+        self.dilewati = 0
+        self.batch = []
+        self.catatan = []
+        # Sel (puskesmas, bulan date_start) dari batch yang benar-benar menulis baris, untuk rollup
+        self.sel_berubah = set()
+        self.detik = 0.0
+
+    def tambah_batch(self, nomor, jumlah, ditambah, diperbarui, dilewati, detik, metode):
+        self.ditambah += ditambah
+        self.diperbarui += diperbarui
+        self.dilewati += dilewati
+        self.batch.append({
+            "batch": nomor, "baris": jumlah, "ditambah": ditambah, "diperbarui": diperbarui,
+            "dilewati": dilewati, "detik": round(detik, 3), "metode": metode,
+        })
+
+    def tandai_berubah(self, batch):
+        # batch sudah melalui siapkan_data: date_start berupa teks YYYY-MM-DD, nilai kosong None
+        puskesmas = batch["puskesmas"] if "puskesmas" in batch.columns else [None] * len(batch)
+        self.sel_berubah.update(
+            ("" if p is None or p == "" else str(p), "" if t is None else t[:7])
+            for p, t in zip(puskesmas, batch["date_start"])
+        )
+
+    def tabel_batch(self):
+        return pd.DataFrame(self.batch, columns=["batch", "baris", "ditambah", "diperbarui", "dilewati", "detik", "metode"])
+
+
+def siapkan_data(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Menyiapkan data gabungan untuk tb_cases: hanya kolom fields_order, tanggal
+    berformat YYYY-MM-DD, dan nilai kosong/NA menjadi None (NULL di MySQL).
+    """
+    columns = [col for col in fields_order if col in df.columns]
+    df = df[columns].copy()
+    for col in kolom_tanggal:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors="coerce").dt.strftime('%Y-%m-%d')
+    return df.astype(object).where(df.notna(), None)
+
+
+def punya_kunci_unik(cursor, tabel=TABEL_KASUS, kunci=KUNCI_ALAMI) -> bool:
+    """True jika tabel sudah punya UNIQUE KEY tepat pada kolom kunci (urutan sama)."""
+    cursor.execute(
+        "SELECT index_name, GROUP_CONCAT(column_name ORDER BY seq_in_index) "
+        "FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND non_unique = 0 "
+        "GROUP BY index_name",
+        (tabel,)
+    )
+    return any(kolom == ",".join(kunci) for _, kolom in cursor.fetchall())
+
+
+def pastikan_kunci_unik(cursor, tabel=TABEL_KASUS, kunci=KUNCI_ALAMI):
+    """
+    Menolak menyimpan jika tabel belum punya UNIQUE KEY pada kunci alami: tanpa indeks itu
+    upsert diam-diam menduplikasi baris. Skema tidak diubah di sini; indeks dibuat sekali
+    lewat migrasi_kunci_unik.py.
+    """
+    if not punya_kunci_unik(cursor, tabel, kunci):
+        raise RuntimeError(
+            f"Tabel {tabel} belum punya UNIQUE KEY pada ({', '.join(kunci)}), jadi penyimpanan "
+            f"dibatalkan agar tidak menduplikasi data. Jalankan migrasi sekali dari folder dashboard: "
+            f"python migrasi_kunci_unik.py"
+        )
+
+
+def _query_upsert(tabel, kolom, kunci, sumber=None):
+    update = ", ".join(f"{col} = VALUES({col})" for col in kolom if col not in kunci)
+    if sumber is None:
+        placeholders = ", ".join(["%s"] * len(kolom))
+        isi = f"VALUES ({placeholders})"
+    else:
+        isi = f"SELECT {', '.join(kolom)} FROM {sumber}"
+    return f"INSERT INTO {tabel} ({', '.join(kolom)}) {isi} ON DUPLICATE KEY UPDATE {update}"
+
+
+def _hitung_sudah_ada(cursor, tabel, kunci, baris_kunci):
+    kondisi = ", ".join(["(" + ", ".join(["%s"] * len(kunci)) + ")"] * len(baris_kunci))
+    parameter = [nilai for baris in baris_kunci for nilai in baris]
+    cursor.execute(f"SELECT COUNT(*) FROM {tabel} WHERE ({', '.join(kunci)}) IN ({kondisi})", parameter)
+    return cursor.fetchone()[0]
+
+
+def _pecah_hasil(jumlah, sudah_ada, rowcount):
+    # ON DUPLICATE KEY UPDATE: baris baru = 1, baris berubah = 2, baris sama persis = 0
+    ditambah = jumlah - sudah_ada
+    diperbarui = max((rowcount - ditambah) // 2, 0)
+    return ditambah, diperbarui, sudah_ada - diperbarui
+
+
+def _tulis_tsv(df, path):
+    # Format bawaan LOAD DATA: tab sebagai pemisah, \N untuk NULL, backslash sebagai escape
+    def sel(nilai):
+        if nilai is None:
+            return "\\N"
+        teks = str(nilai)
+        return teks.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        for baris in df.itertuples(index=False, name=None):
+            f.write("\t".join(sel(v) for v in baris) + "\n")
+
+
+def _simpan_batch_insert(cursor, tabel, kolom, kunci, batch):
+    baris_kunci = list(batch[list(kunci)].itertuples(index=False, name=None))
+    sudah_ada = _hitung_sudah_ada(cursor, tabel, kunci, baris_kunci)
+    cursor.executemany(_query_upsert(tabel, kolom, kunci), list(batch.itertuples(index=False, name=None)))
+    return _pecah_hasil(len(batch), sudah_ada, cursor.rowcount)
+
+
+def _simpan_batch_load_data(cursor, tabel, kolom, kunci, batch, staging):
+    # Batch dimuat ke tabel sementara lewat LOAD DATA LOCAL INFILE, lalu di-upsert sekaligus
+    fd, path = tempfile.mkstemp(suffix=".tsv")
+    os.close(fd)
+    try:
+        _tulis_tsv(batch, path)
+        cursor.execute(f"TRUNCATE TABLE {staging}")
+        cursor.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE {staging} CHARACTER SET utf8mb4 ({', '.join(kolom)})",
+            (path,)
+        )
+    finally:
+        os.remove(path)
+    cursor.execute(
+        f"SELECT COUNT(*) FROM {staging} s JOIN {tabel} t ON "
+        + " AND ".join(f"s.{col} = t.{col}" for col in kunci)
+    )
+    sudah_ada = cursor.fetchone()[0]
+    cursor.execute(_query_upsert(tabel, kolom, kunci, sumber=staging))
+    return _pecah_hasil(len(batch), sudah_ada, cursor.rowcount)
+
+
+def simpan_kasus(conn, df, ukuran_batch=UKURAN_BATCH, pakai_load_data=False,
+                 tabel=TABEL_KASUS, kunci=KUNCI_ALAMI, progress=None) -> LaporanSimpan:
+    """
+    Menyimpan data kasus ke MySQL secara massal dan idempoten (upsert pada kunci alami).
+    Data ditulis per batch; setiap batch di-commit sendiri dan dicatat waktunya.
+    Baris tanpa kunci lengkap atau kunci ganda di dalam data yang sama dilewati.
+
+    pakai_load_data: jalur cepat LOAD DATA LOCAL INFILE (butuh allow_local_infile di
+    koneksi dan local_infile=ON di server); jika gagal otomatis kembali ke INSERT biasa.
+    """
+    laporan = LaporanSimpan()
+    mulai = time.perf_counter()
+    data = siapkan_data(df)
+    kolom = list(data.columns)
+
+    lengkap = data[list(kunci)].notna().all(axis=1)
+    data_valid = data[lengkap].drop_duplicates(subset=list(kunci), keep="last")
+    laporan.dilewati += len(data) - len(data_valid)
+    if len(data) - len(data_valid):
+        laporan.catatan.append(f"{len(data) - len(data_valid)} baris dilewati karena kunci kosong/ganda di data")
+
+    cursor = conn.cursor()
+    try:
+        pastikan_kunci_unik(cursor, tabel, kunci)
+        staging = None
+        if pakai_load_data:
+            staging = f"tmp_{tabel}_muat"
+            cursor.execute(f"CREATE TEMPORARY TABLE IF NOT EXISTS {staging} LIKE {tabel}")
+
+        jumlah_batch = max((len(data_valid) + ukuran_batch - 1) // ukuran_batch, 1)
+        for nomor, awal in enumerate(range(0, len(data_valid), ukuran_batch), start=1):
+            batch = data_valid.iloc[awal:awal + ukuran_batch]
+            t0 = time.perf_counter()
+            metode = "load_data" if staging else "insert"
+            with tahap("mysql:simpan_batch", batch=nomor, baris=len(batch)):
+                try:
+                    if staging:
+                        hasil = _simpan_batch_load_data(cursor, tabel, kolom, kunci, batch, staging)
+                    else:
+                        hasil = _simpan_batch_insert(cursor, tabel, kolom, kunci, batch)
+                except mysql.connector.Error as err:
+                    if not staging:
+                        raise
+                    conn.rollback()
+                    laporan.catatan.append(f"LOAD DATA tidak tersedia ({err}); memakai INSERT per batch")
+                    staging = None
+                    metode = "insert"
+                    hasil = _simpan_batch_insert(cursor, tabel, kolom, kunci, batch)
+                conn.commit()
+            laporan.tambah_batch(nomor, len(batch), *hasil, time.perf_counter() - t0, metode)
+            if hasil[0] or hasil[1]:
+                laporan.tandai_berubah(batch)
+            if progress is not None:
+                progress(nomor / jumlah_batch, laporan)
+    finally:
+        cursor.close()
+    laporan.detik = time.perf_counter() - mulai
+    return laporan
@@ -0,0 +1,272 @@
+import numpy as np
+import pandas as pd
+
+
+# Urutan field yang diinginkan
+fields_order = [
+    "puskesmas", "pasien", "age", "gender", "faskes", "city", "regency",
+    "kelurahan", "type_tb", "date_start", "tgl_kunjungan", "status_hamil",
+    "penyakit", "pekerjaan", "tempat_kerja", "nama_kepala_keluarga",
+    "pekerjaan_kepala_keluarga", "total_pendapatan_keluarga_per_bulan",
+    "pola_asuh", "status_pernikahan", "status_pernikahan_orang_tua",
+    "jumlah_anggota_keluarga", "kepemilikan_jkn", "perilaku_merokok",
+    "anggota_keluarga_merokok", "mendapatkan_bantuan", "status_imunisasi",
+    "status_gizi", "status_rumah", "luas_rumah", "tipe_rumah",
+    "langit_langit", "lantai", "dinding", "jendela_kamar_tidur",
+    "jendela_ruang_keluarga", "ventilasi", "lubang_asap_dapur",
+    "pencahayaan", "sarana_air_bersih", "jamban",
+    "sarana_pembuangan_air_limbah", "sarana_pembuangan_sampah", "sampah",
+    "membuka_jendela_kamar_tidur", "membuka_jendela_ruang_keluarga",
+    "membersihkan_rumah", "membuang_tinja", "membuang_sampah",
+    "kebiasaan_ctps", "memiliki_hewan_ternak", "kandang_hewan"
+]
+
+# Option dictionary untuk field yang memiliki pilihan
+option_dict = {
+    "puskesmas": ['Puskesmas Kedungmundu', 'Puskesmas Sekaran', 'Puskesmas Karangdoro', 'Puskesmas Rowosari', 
+                  'Puskesmas Bandarharjo', 'Puskesmas Pegandan', 'Puskesmas Mangkang', 'Puskesmas Candilama', 
+                  'Puskesmas Karang Malang', 'Puskesmas Ngaliyan', 'Puskesmas Lebdosari', 'Plamongan Sari', 
+                  'Puskesmas Purwoyoso', 'Puskesmas Bangetayu', 'Puskesmas Pandanaran', 'Puskesmas Mijen', 
+                  'Puskesmas Ngesrep', 'Puskesmas Karangayu', 'Puskesmas Tambakaji', 'Puskesmas Padangsari', 
+                  'Puskesmas Halmahera', 'Puskesmas Miroto', 'Puskesmas Genuk', 'bulusan', 'Puskesmas Bugangan', 
+                  'Puskesmas Tlogosari Wetan', 'Puskesmas Poncol', 'Puskesmas Pudak Payung', 'Puskesmas Kagok', 
+                  'Puskesmas Krobokan', 'Puskesmas Manyaran', 'Puskesmas Tlogosari Kulon', 'Puskesmas Karanganyar', 
+                  'Puskesmas Gunungpati', 'Puskesmas Ngemplak Simongan', 'Puskesmas Srondol', 'Puskesmas Gayamsari', 
+                  'Puskesmas Bulu Lor'],
+    "gender": ['L', 'P'],
+    "city": ['Semarang', 'Luar Kota'],
+    "regency": ['Tembalang', 'Gunungpati', 'Semarang Timur', 'Semarang Utara', 'Gajahmungkur', 'Tugu', 'Candisari', 
+                'Mijen', 'Ngaliyan', 'Semarang Barat', 'Pedurungan', 'Genuk', 'Semarang Selatan', 'Banyumanik', 
+                'Luar Kota', 'Semarang Tengah', 'Gayamsari'],
+    "kelurahan": ['Tandang', 'Sukorejo', 'Sendangmulyo', 'Sambiroto', 'Kemijen', 'Rejomulyo', 'Sendangguwo', 
+                  'Meteseh', 'Dadapsari', 'Petompon', 'Karangrejo', 'Lempongsari', 'Bendungan', 'Mangkang Wetan', 
+                  'Karanganyar Gunung', 'Sampangan', 'Tanjungmas', 'Kalisegoro', 'Karangmalang', 'Wates', 'Sekaran', 
+                  'Jangli', 'Kalibanteng Kulon', 'Penggaron Kidul', 'Bandarharjo', 'Purwoyoso', 'Pedurungan Kidul', 
+                  'Kedungmundu', 'Patemon', 'Sembungharjo', 'Bringin', 'Randusari', 'Wonoplumbon', 'Rowosari', 
+                  'Ngesrep', 'Tinjomoyo', 'Karangayu', 'Podorejo', 'Karangroto', 'Kalipancur', 'Wonosari', 
+                  'Sumurboto', 'Plamongansari', 'Padangsari', 'Bambankerep', 'Mangkang Kulon', 'Mangunharjo', 
+                  'Pedalangan', 'Jomblang', 'Kedungpane', 'Ngadirgo', 'Cangkiran', 'Luar Kota', 'Rejosari', 
+                  'Jatingaleh', 'Tambakaji', 'Mlatibaru', 'Ngaliyan', 'Gabahan', 'Miroto', 'Genuksari', 'Salamanmloyo', 
+                  'Bulusan', 'Bugangan', 'Kebonagung', 'Bulustalan', 'Gisikdrono', 'Tambakharjo', 'Muktiharjo Lor', 
+                  'Ngijo', 'Mijen', 'Wonolopo', 'Jabungan', 'Kuningan', 'Tlogomulyo', 'Banjardowo', 'Bubakan', 
+                  'Gondoriyo', 'Bendan Duwur', 'Gajahmungkur', 'Bendan Ngisor', 'Purwodinatan', 'Kramas', 'Kudu', 
+                  'Mugassari', 'Penggaron Lor', 'Bangetayu Wesan', 'Bangunharjo', 'Kembangsari', 'Pandansari', 
+                  'Sekayu', 'Karangtempel', 'Gedawang', 'Karangkidul', 'Bojongsalaman', 'Trimulyo', 'Bangetayu Kulon', 
+                  'Gebangsari', 'Jatibarang', 'Tambangan', 'Wonodri', 'Pudakpayung', 'Pedurungan Tengah', 'Candi', 
+                  'Kranggan', 'Tlogosari Wetan', 'Tawangsari', 'Palebon', 'Mlatibaru', 'Tegalsari', 'Wonotingal', 
+                  'Manyaran', 'Kembangarum', 'Barusari', 'Krapyak', 'Gemah', 'Tugurejo', 'Mangunsari', 'Nongkosawit', 
+                  'Karangturi', 'Tlogosari Kulon', 'NgemplakSimongan', 'Krobokan', 'Srondol Wetan', 'Banyumanik', 
+                  'Gunungpati', 'Jagalan', 'Pindrikan Lor', 'Jatisari', 'Srondol Kulon', 'Randugarut', 'Kaligawe', 
+                  'Tawangmas', 'Brumbungan', 'Siwalan', 'Tambakrejo', 'Sadeng', 'Sawah Besar', 'Jatirejo', 'Plalangan', 
+                  'Pakintelan', 'Kauman', 'Pandean Lamper', 'Gayamsari', 'Sambirejo', 'Sarirejo', 'Bongsari', 
+                  'Pindrikan Kidul', 'Sumurejo', 'Terboyo Wetan', 'Muktiharjo Kidul', 'Pedurungan Lor', 'Kalicari', 
+                  'Cabean', 'Karanganyar', 'Panggung Lor', 'Purwosari', 'Panggung Kidul', 'Bulu Lor', 'Plombokan', 
+                  'Kaliwiru', 'Pangangan', 'Kalibanteng Kidul', 'Jrakah'],
+    "type_tb": [' ', 1.0, 2.0],
+    "status_hamil": ['Tidak', 'Ya'],
+    "pekerjaan": ['Tidak Bekerja', 'Ibu Rumah Tangga', 'Pegawai Swasta', 'Lainnya', 'Pelajar / Mahasiswa', 
+                  'Wiraswasta', 'Nelayan', 'Petani', 'Pensiunan', 'TNI / Polri'],
+    "pekerjaan_kepala_keluarga": ['Lainnya', 'Tidak Bekerja', 'Pegawai Swasta', 'Wiraswasta', 'Pelajar / Mahasiswa', 
+                                  'Nelayan', 'Ibu Rumah Tangga', 'Petani', 'Pensiunan', 'PNS', 'TNI / Polri'],
+    "total_pendapatan_keluarga_per_bulan": ['1.000.000 - < 2.000.000', '2.000.000 - < 3.000.000', '< 1.000.000', '0', 
+                                            '3.000.000 - < 4.000.000', '>= 4.000.000'],
+    "pola_asuh": ['Orang Tua', 'Lainnya', 'Kakek / Nenek', 'Penitipan'],
+    "status_pernikahan": ['Belum Kawin', 'Kawin', 'Cerai Mati', 'Cerai Hidup'],
+    "status_pernikahan_orang_tua": ['Kawin', 'Cerai Mati', 'Belum Kawin', 'Cerai Hidup'],
+    "kepemilikan_jkn": ['Ya', 'Tidak'],
+    "perilaku_merokok": ['Tidak', 'Ya'],
+    "anggota_keluarga_merokok": ['Ya', 'Tidak'],
+    "mendapatkan_bantuan": ['Tidak', 'Ya'],
+    "status_imunisasi": ['Tidak Lengkap', 'Lengkap'],
+    "status_gizi": ['Underweight', 'Normal', 'Wasting', 'Kurang', 'Overweight', 'Obesitas'],
+    "status_rumah": ['Lainnya', 'Pribadi', 'Orang Tua', 'Kontrak', 'Kost', 'Asrama'],
+    "langit_langit": ['Tidak ada', 'Ada'],
+    "lantai": ['Ubin/keramik/marmer', 'Tanah', 'Kurang Baik', 'Papan/anyaman bambu/plester retak berdebu', 'Baik'],
+    "dinding": ['Permanen (tembok pasangan batu bata yang diplester)', 
+                'Semi permanen bata/batu yang tidak diplester/papan kayu', 
+                'Bukan tembok (papan kayu/bambu/ilalang)'],
+    "jendela_kamar_tidur": ['Tidak ada', 'Ada'],
+    "jendela_ruang_keluarga": ['Ada', 'Tidak ada'],
+    "ventilasi": ['Kurang Baik', 'Ada,luas ventilasi < 10% dari luas lantai', 'Tidak Ada', 'Baik', 
+                  'Ada, luas ventilasi > 10% dari luas lantai'],
+    "lubang_asap_dapur": ['Ada, luas ventilasi < 10% dari luas lantai dapur', 'Tidak Ada', 
+                          'Ada, luas ventilasi > 10% luas lantai dapur/exhaust vent'],
+    "pencahayaan": ['Kurang Baik', 'Tidak terang', 'Baik', 'Terang', 'Kurang jelas untuk membaca normal', 
+                    'Kurang terang', 'Dapat digunakan untuk membaca normal'],
+    "sarana_air_bersih": ['Ada,bukan milik sendiri & memenuhi syarat kesehatan', 
+                          'Ada,milik sendiri & tidak memenuhi syarat kesehatan', 
+                          'Ada, bukan milik sendiri & tidak memenuhi syarat kesehatan', 
+                          'Ada,milik sendiri & memenuhi syarat kesehatan', 'Tidak Ada'],
+    "jamban": ['Ada tutup & septic tank', 'Ada, leher angsa', 'Ada,bukan leher angsa ada tutup & septic tank', 
+               'Ada,bukan leher angsa ada tutup & dialirkan ke sungai', 'Tidak Ada'],
+    "sarana_pembuangan_air_limbah": ['Ada, diresapkan ke selokan terbuka', 
+                                     'Tidak ada, sehingga tergenang dan tidak teratur di halaman/belakang rumah', 
+                                     'Ada, bukan milik sendiri & memenuhi syarat kesehatan', 
+                                     'Ada, diresapkan tetapi mencemari sumber air (jarak <10m)', 
+                                     'Ada, dialirkan ke selokan tertutup ("&"saluran kota) utk diolah lebih lanjut'],
+    "sarana_pembuangan_sampah": ['Ada, tetapi tidak kedap air dan tidak tertutup', 'Tidak Ada', 
+                                 'Ada, kedap air dan tidak tertutup', 'Ada, kedap air dan tertutup'],
+    "sampah": ['Lainnya (Sungai)', 'Dikelola Sendiri (Pilah Sampah)', 'Bakar', 'Petugas', 'dll'],
+    "membuka_jendela_kamar_tidur": ['Tidak pernah dibuka', 'Kadang-kadang dibuka', 'Setiap hari dibuka'],
+    "membuka_jendela_ruang_keluarga": ['Tidak pernah dibuka', 'Kadang-kadang dibuka', 'Setiap hari dibuka'],
+    "membersihkan_rumah": ['Tidak pernah dibersihkan', 'Kadang-kadang', 'Setiap hari dibersihkan'],
+    "membuang_tinja": ['Setiap hari ke jamban', 'Dibuang ke sungai/kebun/kolam/sembarangan'],
+    "membuang_sampah": ['Dibuang ke sungai/kebun/kolam/sembarangan / dibakar', 
+                        'Kadang-kadang dibuang ke tempat sampah', 
+                        'Dibuang ke tempat sampah/ada petugas sampah', 
+                        'Dilakukan pilah sampah/dikelola dengan baik'],
+    "kebiasaan_ctps": ['Tidak pernah CTPS', 'Kadang-kadang CTPS', 'CTPS setiap aktivitas'],
+    "memiliki_hewan_ternak": ['Tidak', 'Ya'],
+    "kandang_hewan": []  # Kosong, gunakan text_input
+}
+
+
+# Field berisi bilangan; selain pasien boleh kosong sehingga dibaca sebagai float
+kolom_numerik = ["pasien", "age", "type_tb", "jumlah_anggota_keluarga", "luas_rumah"]
+# Field bilangan bulat disimpan sebagai integer nullable yang ringkas
+kolom_bulat = {"pasien": "Int32", "age": "Int16", "jumlah_anggota_keluarga": "Int16"}
+kolom_tanggal = ["date_start", "tgl_kunjungan"]
+# Field wajib terisi; baris tanpa nilai ini ditolak saat ingest
+kolom_wajib = ["pasien"]
+
+
+def parse_tanggal(s: pd.Series) -> pd.Series:
+    """
+    Kolom tanggal (teks YYYY-MM-DD, Categorical, atau sudah datetime) menjadi datetime64.
+    Data kasus hanya punya beberapa ratus tanggal berbeda, jadi setiap nilai unik di-parse
+    sekali lalu disebar ke semua baris lewat kodenya. Isian yang tidak valid menjadi NaT.
+    """
+    if pd.api.types.is_datetime64_any_dtype(s.dtype):
+        return s
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        kode, unik = s.cat.codes.to_numpy(), s.cat.categories
+    else:
+        kode, unik = pd.factorize(s)
+    tanggal = pd.to_datetime(pd.Series(unik, dtype=object), errors="coerce").to_numpy(dtype="datetime64[ns]")
+    # Elemen terakhir NaT untuk kode -1 (nilai kosong)
+    tanggal = np.append(tanggal, np.datetime64("NaT", "ns"))
+    return pd.Series(tanggal[kode], index=s.index, name=s.name)
+
+
+def bulan_tanggal(tanggal: pd.Series) -> pd.Series:
+    """Bulan "YYYY-MM" (Categorical, tanggal tidak valid = "NaT") dari kolom datetime, diformat per nilai unik."""
+    kode, unik = pd.factorize(tanggal.dt.to_period("M"), use_na_sentinel=False)
+    teks = np.array([str(p) for p in unik], dtype=object)
+    kategori = sorted(set(teks))
+    posisi = {t: i for i, t in enumerate(kategori)}
+    kode_bulan = np.array([posisi[t] for t in teks], dtype=np.int32)[kode] if len(teks) else kode
+    return pd.Series(pd.Categorical.from_codes(kode_bulan, kategori), index=tanggal.index)
+
+
+def kosakata(col):
+    """Daftar pilihan unik sebuah field enumerasi (urutan option_dict dipertahankan)."""
+    return list(dict.fromkeys(str(v) for v in option_dict.get(col, [])))
+
+
+# Field enumerasi = punya daftar pilihan di option_dict dan bukan angka
+kolom_enumerasi = [col for col in fields_order if kosakata(col) and col not in kolom_numerik]
+
+
+def dtype_kolom():
+    """
+    Tipe data eksplisit per field untuk data kasus.
+    Field enumerasi memakai Categorical dengan kosakata option_dict.
+    """
+    dtypes = {}
+    for col in fields_order:
+        if col in kolom_bulat:
+            dtypes[col] = kolom_bulat[col]
+        elif col in kolom_numerik:
+            dtypes[col] = "float64"
+        elif col in kolom_enumerasi:
+            dtypes[col] = pd.CategoricalDtype(kosakata(col))
+        else:
+            dtypes[col] = "object"
+    return dtypes
+
+
+def kompakkan(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Mengubah data kasus ke representasi ringkas: field enumerasi menjadi Categorical
+    (kosakata option_dict + nilai lain yang muncul), field bulat menjadi integer
+    nullable, dan angka lain menjadi float. Isian angka yang tidak valid menjadi kosong.
+    """
+    df = df.copy()
+    dtypes = dtype_kolom()
+    for col in df.columns:
+        if col not in dtypes:
+            continue
+        if col in kolom_enumerasi:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                continue
+            nilai = df[col].where(df[col].isna(), df[col].astype(str))
+            lain = [v for v in pd.unique(nilai.dropna()) if v not in set(kosakata(col))]
+            df[col] = nilai.astype(pd.CategoricalDtype(kosakata(col) + lain))
+        elif col in kolom_numerik:
+            angka = pd.to_numeric(df[col], errors="coerce")
+            if col in kolom_bulat:
+                angka = angka.where(angka % 1 == 0)
+            df[col] = angka.astype(dtypes[col])
+    return df
+
+
+def urutkan_kategori(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Menyusun ulang kategori field enumerasi yang sudah Categorical menjadi kosakata
+    option_dict + nilai lain (urutan semula), sama seperti hasil ingest CSV dan kompakkan.
+    """
+    for col in kolom_enumerasi:
+        if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+            kosakata_col = kosakata(col)
+            lain = [v for v in df[col].cat.categories if v not in set(kosakata_col)]
+            df[col] = df[col].cat.set_categories(kosakata_col + lain)
+    return df
+
+
+def gabung_data(bagian, ignore_index=True) -> pd.DataFrame:
+    """
+    pd.concat untuk data kasus yang menjaga kolom Categorical tetap Categorical:
+    daftar kategori tiap bagian disamakan (gabungan, urutan kemunculan) lebih dulu.
+    """
+    bagian = [b for b in bagian if len(b.columns)]
+    if not bagian:
+        return pd.DataFrame()
+    kategori = {}
+    for b in bagian:
+        for col in b.columns:
+            if isinstance(b[col].dtype, pd.CategoricalDtype):
+                daftar = kategori.setdefault(col, [])
+                daftar.extend(v for v in b[col].cat.categories if v not in daftar)
+    hasil = []
+    for b in bagian:
+        ubah = {
+            col: pd.CategoricalDtype(daftar)
+            for col, daftar in kategori.items()
+            if col in b.columns and list(getattr(b[col].dtype, "categories", [])) != daftar
+        }
+        if ubah:
+            b = b.astype(ubah)
+        hasil.append(b)
+    return pd.concat(hasil, ignore_index=ignore_index)
+
+
+def laporan_memori(frames: dict) -> pd.DataFrame:
+    """
+    Ukuran memori (MB) tiap DataFrame dalam representasi ringkas dibanding
+    representasi lama (teks object dan float64 per sel).
+    """
+    baris = []
+    for nama, df in frames.items():
+        if not isinstance(df, pd.DataFrame):
+            continue
+        sekarang = df.memory_usage(deep=True).sum()
+        lama = df.astype({
+            col: ("object" if isinstance(t, pd.CategoricalDtype) else "float64")
+            for col, t in df.dtypes.items()
+            if isinstance(t, pd.CategoricalDtype) or pd.api.types.is_extension_array_dtype(t)
+        }).memory_usage(deep=True).sum()
+        baris.append({"Data": nama, "Baris": len(df), "Sebelum (MB)": lama / 1e6, "Sesudah (MB)": sekarang / 1e6})
+    laporan = pd.DataFrame(baris, columns=["Data", "Baris", "Sebelum (MB)", "Sesudah (MB)"])
+    if len(laporan):
+        laporan.loc[len(laporan)] = ["Total", laporan["Baris"].sum(), laporan["Sebelum (MB)"].sum(), laporan["Sesudah (MB)"].sum()]
+    return laporan
@@ -0,0 +1,265 @@
+"""
+Skor kelayakan rumah, sanitasi, dan perilaku.
+
+Kolom tiap domain, bobot jawaban, dan threshold dibaca dari berkas aturan berversi
+data/aturan_skor/<versi>.json (bukan dict di kode), dipilih lewat env TBC_ATURAN_SKOR:
+  v1  aturan lama, sama dengan app/notebook sebelumnya (beberapa kunci tidak cocok
+      dengan pilihan jawaban di data, sehingga jawaban itu tidak ikut dinilai)
+  v2  kunci lantai, ventilasi, dan pencahayaan disamakan dengan skema.option_dict (bawaan)
+Nilai env boleh juga path berkas .json lain dengan format yang sama.
+
+Saat dimuat, bobot setiap kolom disusun menjadi array yang sejajar dengan kosakata
+kategori kolom itu (skema.kosakata), jadi penilaian cukup mengindeks array dengan kode
+kategori. laporan_cakupan() menunjukkan jawaban di data yang tidak punya bobot, dan
+bandingkan_aturan() membandingkan label dua versi aturan pada data yang sama.
+"""
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from instrumen import tahap
+from skema import kosakata
+
+DIR_ATURAN_SKOR = os.environ.get(
+    "TBC_ATURAN_SKOR_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "aturan_skor")
+)
+VERSI_ATURAN_SKOR = os.environ.get("TBC_ATURAN_SKOR", "v2")
+# Domain yang dibaca modul lain (ringkasan, chart, rollup)
+DOMAIN_WAJIB = ["rumah", "sanitasi", "perilaku"]
+
+
+class AturanSkor:
+    """
+    Satu versi aturan skor: {domain: {kolom: {jawaban: bobot}}} (urutan kolom = urutan
+    di berkas), threshold label Layak, dan bobot maksimum satu jawaban.
+    """
+
+    def __init__(self, versi, domain, threshold=70, skor_maks_jawaban=5, deskripsi=""):
+        hilang = [nama for nama in DOMAIN_WAJIB if nama not in domain]
+        if hilang:
+            raise ValueError(f"Aturan skor {versi!r} tidak punya domain: {', '.join(hilang)}")
+        self.versi = versi
+        self.deskripsi = deskripsi
+        self.threshold = threshold
+        self.skor_maks_jawaban = skor_maks_jawaban
+        self.domain = {nama: {kolom: dict(bobot) for kolom, bobot in isi.items()} for nama, isi in domain.items()}
+        # (kosakata, bobot per posisi kosakata) setiap kolom, disusun sekali saat aturan dimuat
+        self._lookup = {
+            (nama, kolom): (pd.Index(kosakata(kolom)), np.array([bobot.get(v, np.nan) for v in kosakata(kolom)], dtype=float))
+            for nama, isi in self.domain.items() for kolom, bobot in isi.items()
+        }
+
+    @classmethod
+    def dari_berkas(cls, path):
+        with open(path, encoding="utf-8") as f:
+            isi = json.load(f)
+        return cls(
+            isi.get("versi") or os.path.splitext(os.path.basename(path))[0],
+            {nama: d["kolom"] for nama, d in isi["domain"].items()},
+            threshold=isi.get("threshold", 70),
+            skor_maks_jawaban=isi.get("skor_maks_jawaban", 5),
+            deskripsi=isi.get("deskripsi", ""),
+        )
+
+    def kategori(self, domain):
+        return list(self.domain[domain])
+
+    def bobot(self, domain):
+        return self.domain[domain]
+
+    def lookup(self, domain, kolom, kategori: pd.Index) -> np.ndarray:
+        """
+        Bobot per kode kategori (panjang len(kategori) + 1, elemen terakhir NaN untuk
+        kode -1). Kategori dari skema.kompakkan diawali kosakata kolom, jadi bagian itu
+        memakai array yang sudah disusun; hanya jawaban di luar kosakata dicari di dict.
+        """
+        dasar_kosakata, dasar = self._lookup[(domain, kolom)]
+        bobot = self.domain[domain][kolom]
+        n = len(dasar_kosakata)
+        if len(kategori) >= n and kategori[:n].equals(dasar_kosakata):
+            tambahan = [bobot.get(v, np.nan) for v in kategori[n:]]
+            return np.concatenate([dasar, np.array(tambahan, dtype=float), [np.nan]])
+        return np.array([bobot.get(v, np.nan) for v in kategori] + [np.nan], dtype=float)
+
+    def nilai_bobot(self, series: pd.Series, domain, kolom) -> np.ndarray:
+        """Bobot setiap baris satu kolom jawaban; jawaban yang tidak dikenali menjadi NaN."""
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return self.lookup(domain, kolom, series.cat.categories)[series.cat.codes.to_numpy()]
+        return bobot_kolom(series, self.domain[domain][kolom])
+
+
+def daftar_versi_aturan():
+    """Versi aturan yang tersedia di DIR_ATURAN_SKOR (nama berkas tanpa .json)."""
+    if not os.path.isdir(DIR_ATURAN_SKOR):
+        return []
+    return sorted(os.path.splitext(nama)[0] for nama in os.listdir(DIR_ATURAN_SKOR) if nama.endswith(".json"))
+
+
+_cache_aturan = {}
+_lock_aturan = threading.Lock()
+
+
+def muat_aturan_skor(versi) -> AturanSkor:
+    """Aturan skor versi tertentu (nama di DIR_ATURAN_SKOR atau path .json), dimuat sekali per proses."""
+    path = versi if versi.endswith(".json") else os.path.join(DIR_ATURAN_SKOR, f"{versi}.json")
+    with _lock_aturan:
+        if path not in _cache_aturan:
+            if not os.path.exists(path):
+                raise ValueError(
+                    f"Berkas aturan skor tidak ditemukan: {path} (tersedia: {', '.join(daftar_versi_aturan()) or '-'})"
+                )
+            _cache_aturan[path] = AturanSkor.dari_berkas(path)
+        return _cache_aturan[path]
+
+
+# Aturan yang dipakai app, laporan, dan rollup
+ATURAN_SKOR = muat_aturan_skor(VERSI_ATURAN_SKOR)
+
+# Nama lama tetap tersedia untuk modul lain dan notebook
+kategori_rumah = ATURAN_SKOR.kategori("rumah")
+kategori_sanitasi = ATURAN_SKOR.kategori("sanitasi")
+kategori_perilaku = ATURAN_SKOR.kategori("perilaku")
+bobot_rumah = ATURAN_SKOR.bobot("rumah")
+bobot_sanitasi = ATURAN_SKOR.bobot("sanitasi")
+bobot_perilaku = ATURAN_SKOR.bobot("perilaku")
+
+# Nama domain -> (daftar kolom, bobot jawaban)
+domain_skor = {nama: (ATURAN_SKOR.kategori(nama), ATURAN_SKOR.bobot(nama)) for nama in ATURAN_SKOR.domain}
+
+threshold = ATURAN_SKOR.threshold
+SKOR_MAKS_JAWABAN = ATURAN_SKOR.skor_maks_jawaban
+
+
+def bobot_kolom(series: pd.Series, bobot: dict) -> np.ndarray:
+    """
+    Memetakan satu kolom jawaban ke bobotnya secara massal.
+    Setiap jawaban unik hanya dicari sekali di dict bobot (lewat kode kategori),
+    lalu hasilnya disebar ke semua baris dengan indexing array.
+    Jawaban yang tidak dikenali menghasilkan NaN.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        uniques = series.cat.categories
+    else:
+        codes, uniques = pd.factorize(series)
+    # Elemen terakhir NaN supaya kode -1 (nilai kosong) otomatis tidak dikenali
+    lookup = np.full(len(uniques) + 1, np.nan)
+    for i, jawaban in enumerate(uniques):
+        nilai = bobot.get(jawaban)
+        if nilai is not None:
+            lookup[i] = nilai
+    return lookup[codes]
+
+
+def _skor_dari_bobot(daftar_nilai, n, skor_maks_jawaban):
+    # Skor = total bobot / (bobot maksimum x jumlah jawaban yang dikenali) x 100, 0 jika tidak ada yang dikenali
+    total_skor = np.zeros(n)
+    max_skor = np.zeros(n)
+    for nilai in daftar_nilai:
+        dikenali = ~np.isnan(nilai)
+        total_skor += np.where(dikenali, nilai, 0)
+        max_skor += dikenali * skor_maks_jawaban
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(max_skor > 0, (total_skor / max_skor) * 100, 0)
+
+
+def hitung_skor(df_sub, kategori, bobot):
+    """
+    Versi vektor dari hitung_skor lama (iterrows).
+    Skor = total bobot / (5 x jumlah jawaban yang dikenali) x 100,
+    dan 0 jika tidak ada satupun jawaban yang dikenali.
+    """
+    nilai = (bobot_kolom(df_sub[kolom], bobot[kolom]) for kolom in kategori if kolom in bobot)
+    df_sub["Skor Kelayakan"] = _skor_dari_bobot(nilai, len(df_sub), SKOR_MAKS_JAWABAN)
+    return df_sub
+
+
+def label_kelayakan(skor, batas=None):
+    """Memberi label Layak/Tidak Layak untuk satu nilai atau array skor (batas bawaan = threshold aturan aktif)."""
+    return np.where(np.asarray(skor) >= (threshold if batas is None else batas), "Layak", "Tidak Layak")
+
+
+def hitung_semua_skor(df, aturan: AturanSkor = None):
+    """
+    Menghitung skor dan label untuk domain rumah, sanitasi, dan perilaku sekaligus.
+    Mengembalikan dict {"rumah": df_rumah, "sanitasi": df_sanitasi, "perilaku": df_perilaku};
+    masing-masing hanya berisi baris tanpa nilai kosong pada kolom domainnya.
+    aturan: versi aturan skor (bawaan ATURAN_SKOR).
+    """
+    aturan = aturan or ATURAN_SKOR
+    hasil = {}
+    for nama in aturan.domain:
+        with tahap(f"skor:{nama}"):
+            kategori = aturan.kategori(nama)
+            df_sub = df[kategori].dropna().copy()
+            nilai = (aturan.nilai_bobot(df_sub[kolom], nama, kolom) for kolom in kategori)
+            df_sub["Skor Kelayakan"] = _skor_dari_bobot(nilai, len(df_sub), aturan.skor_maks_jawaban)
+            df_sub["Label"] = label_kelayakan(df_sub["Skor Kelayakan"].to_numpy(), aturan.threshold)
+        hasil[nama] = df_sub
+    return hasil
+
+
+def persentase_tidak_layak(df_skor):
+    """Persentase baris berlabel "Tidak Layak" pada hasil hitung_skor."""
+    return (df_skor["Label"] == "Tidak Layak").sum() / df_skor.shape[0] * 100
+
+
+def laporan_cakupan(df, aturan: AturanSkor = None) -> pd.DataFrame:
+    """
+    Cakupan aturan terhadap jawaban di data: per kolom skor, jumlah jawaban terisi,
+    jumlah yang tidak punya bobot (tidak ikut dinilai), dan daftar jawaban tersebut.
+    Urut jumlah jawaban tidak dikenali terbanyak.
+    """
+    aturan = aturan or ATURAN_SKOR
+    baris = []
+    for nama in aturan.domain:
+        for kolom in aturan.kategori(nama):
+            if kolom not in df.columns:
+                baris.append({"Domain": nama, "Kolom": kolom, "Terisi": 0, "Tidak Dikenali": 0,
+                              "% Dikenali": np.nan, "Jawaban Tidak Dikenali": "(kolom tidak ada di data)"})
+                continue
+            s = df[kolom]
+            if isinstance(s.dtype, pd.CategoricalDtype):
+                kode, kategori = s.cat.codes.to_numpy(), s.cat.categories
+            else:
+                kode, kategori = pd.factorize(s)
+            # Jumlah per jawaban lewat kode kategori; bobot NaN = jawaban tidak dikenali
+            jumlah = np.bincount(kode[kode >= 0], minlength=len(kategori))
+            tidak_dikenali = np.isnan(aturan.lookup(nama, kolom, pd.Index(kategori))[:-1]) & (jumlah > 0)
+            urutan = np.flatnonzero(tidak_dikenali)[np.argsort(-jumlah[tidak_dikenali], kind="stable")]
+            terisi = int(jumlah.sum())
+            n_tidak = int(jumlah[tidak_dikenali].sum())
+            baris.append({
+                "Domain": nama, "Kolom": kolom, "Terisi": terisi, "Tidak Dikenali": n_tidak,
+                "% Dikenali": (terisi - n_tidak) / terisi * 100 if terisi else np.nan,
+                "Jawaban Tidak Dikenali": "; ".join(f"{kategori[i]} ({jumlah[i]})" for i in urutan),
+            })
+    return pd.DataFrame(baris).sort_values("Tidak Dikenali", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def bandingkan_aturan(df, aturan_a: AturanSkor, aturan_b: AturanSkor) -> pd.DataFrame:
+    """
+    Label dua versi aturan pada data yang sama (df yang sudah dibersihkan, tanpa parse
+    ulang): per domain, persentase Tidak Layak masing-masing versi, jumlah baris yang
+    labelnya berpindah, dan rata-rata selisih skor (b - a) pada baris yang dinilai keduanya.
+    """
+    skor_a, skor_b = hitung_semua_skor(df, aturan_a), hitung_semua_skor(df, aturan_b)
+    baris = []
+    for nama in DOMAIN_WAJIB:
+        a, b = skor_a[nama], skor_b[nama]
+        sama = a.index.intersection(b.index)
+        label_a, label_b = a["Label"].reindex(sama), b["Label"].reindex(sama)
+        baris.append({
+            "Domain": nama,
+            "Baris Dinilai": len(sama),
+            f"% Tidak Layak ({aturan_a.versi})": persentase_tidak_layak(a) if len(a) else np.nan,
+            f"% Tidak Layak ({aturan_b.versi})": persentase_tidak_layak(b) if len(b) else np.nan,
+            "Layak → Tidak Layak": int(((label_a == "Layak") & (label_b == "Tidak Layak")).sum()),
+            "Tidak Layak → Layak": int(((label_a == "Tidak Layak") & (label_b == "Layak")).sum()),
+            "Rata-rata Selisih Skor": float((b["Skor Kelayakan"].reindex(sama) - a["Skor Kelayakan"].reindex(sama)).mean())
+            if len(sama) else np.nan,
+        })
+    return pd.DataFrame(baris)
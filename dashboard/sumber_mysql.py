@@ -0,0 +1,160 @@
+import hashlib
+import os
+
+import pandas as pd
+
+from instrumen import tahap
+from skema import fields_order, kolom_tanggal, kompakkan, gabung_data
+
+TABEL_KASUS = "tb_cases"
+# Jumlah baris per halaman saat membaca dari MySQL
+UKURAN_HALAMAN = int(os.environ.get("TBC_UKURAN_HALAMAN", "20000"))
+
+
+class HasilQuery:
+    """Data kasus hasil satu query MySQL beserta fingerprint-nya (kunci data dasar bersama)."""
+
+    def __init__(self, df, fingerprint, filter_kasus):
+        self.df = df
+        self.fingerprint = fingerprint
+        self.filter_kasus = filter_kasus
+
+
+class FilterKasus:
+    """
+    Filter data kasus yang diterjemahkan menjadi predikat SQL, sehingga
+    penyaringan dilakukan di server MySQL dan hanya baris yang dibutuhkan dikirim.
+    Daftar kosong berarti tidak difilter.
+    """
+
+    def __init__(self, puskesmas=None, regency=None, kelurahan=None, tanggal_awal=None, tanggal_akhir=None):
+        self.puskesmas = sorted(puskesmas or [])
+        self.regency = sorted(regency or [])
+        self.kelurahan = sorted(kelurahan or [])
+        self.tanggal_awal = tanggal_awal
+        self.tanggal_akhir = tanggal_akhir
+
+    def where(self):
+        """Mengembalikan (klausa WHERE tanpa kata WHERE, parameter)."""
+        kondisi = []
+        parameter = []
+        for col in ["puskesmas", "regency", "kelurahan"]:
+            nilai = getattr(self, col)
+            if nilai:
+                kondisi.append(f"{col} IN ({', '.join(['%s'] * len(nilai))})")
+                parameter.extend(nilai)
+        if self.tanggal_awal is not None:
+            kondisi.append("date_start >= %s")
+            parameter.append(pd.Timestamp(self.tanggal_awal).strftime('%Y-%m-%d'))
+        if self.tanggal_akhir is not None:
+            kondisi.append("date_start <= %s")
+            parameter.append(pd.Timestamp(self.tanggal_akhir).strftime('%Y-%m-%d'))
+        return (" AND ".join(kondisi) or "1 = 1"), parameter
+
+    def kunci(self):
+        klausa, parameter = self.where()
+        return repr((klausa, [str(p) for p in parameter]))
+
+    def deskripsi(self):
+        bagian = []
+        for col in ["puskesmas", "regency", "kelurahan"]:
+            nilai = getattr(self, col)
+            if nilai:
+                bagian.append(f"{col}: {', '.join(nilai)}")
+        if self.tanggal_awal is not None or self.tanggal_akhir is not None:
+            bagian.append(f"date_start: {self.tanggal_awal or '...'} s/d {self.tanggal_akhir or '...'}")
+        return "; ".join(bagian) or "semua data"
+
+
+def versi_data(cursor, filter_kasus, tabel=TABEL_KASUS):
+    """
+    Penanda versi isi tabel untuk filter ini (jumlah baris, id terbesar, waktu update
+    tabel). Jika ada baris ditambah/diubah, penanda berubah dan query dibaca ulang.
+    """
+    klausa, parameter = filter_kasus.where()
+    cursor.execute(f"SELECT COUNT(*), MAX(id) FROM {tabel} WHERE {klausa}", parameter)
+    jumlah, id_maks = cursor.fetchone()
+    cursor.execute(
+        "SELECT UPDATE_TIME FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+        (tabel,)
+    )
+    baris = cursor.fetchone()
+    return f"{jumlah}|{id_maks}|{baris[0] if baris else None}"
+
+
+def fingerprint_query(filter_kasus, versi):
+    """Kunci cache data dan hasil preprocessing untuk satu query + versi tabel."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(b"mysql|")
+    h.update(filter_kasus.kunci().encode("utf-8"))
+    h.update(versi.encode("utf-8"))
+    return h.hexdigest()
+
+
+def fingerprint_kasus(conn, filter_kasus, tabel=TABEL_KASUS):
+    """
+    (fingerprint, versi) query ini tanpa membaca datanya. App memakai fingerprint sebagai
+    kunci ManajerDataset: jika sesi lain sudah memuat query + versi yang sama, datanya
+    dipinjam dari sana dan baca_kasus tidak perlu dijalankan.
+    """
+    cursor = conn.cursor()
+    try:
+        versi = versi_data(cursor, filter_kasus, tabel)
+    finally:
+        cursor.close()
+    return fingerprint_query(filter_kasus, versi), versi
+
+
+def _halaman_ke_frame(baris, kolom):
+    halaman = pd.DataFrame.from_records(baris, columns=kolom)
+    # MySQL mengembalikan DATE sebagai datetime.date; samakan dengan format CSV (teks YYYY-MM-DD)
+    for col in kolom_tanggal:
+        if col in halaman.columns:
+            halaman[col] = pd.to_datetime(halaman[col], errors="coerce").dt.strftime('%Y-%m-%d')
+    return kompakkan(halaman)
+
+
+def baca_kasus(conn, filter_kasus, ukuran_halaman=UKURAN_HALAMAN, progress=None, tabel=TABEL_KASUS, versi=None):
+    """
+    Membaca data kasus dari MySQL sesuai filter, per halaman (keyset pagination pada id)
+    sehingga setiap query pendek dan setiap halaman langsung diubah ke representasi ringkas.
+
+    Mengembalikan HasilQuery; fingerprint-nya dipakai sebagai kunci data dasar bersama
+    (dataset_bersama.py) dan cache preprocessing. Modul ini tidak menyimpan data: yang
+    menahan data di memori hanya pegangan sesi di ManajerDataset.
+    versi: hasil fingerprint_kasus jika sudah dihitung (tidak di-query ulang).
+    progress: fungsi opsional progress(fraksi, jumlah_baris).
+    """
+    cursor = conn.cursor()
+    try:
+        if versi is None:
+            versi = versi_data(cursor, filter_kasus, tabel)
+        fingerprint = fingerprint_query(filter_kasus, versi)
+
+        total = int(versi.split("|")[0])
+        klausa, parameter = filter_kasus.where()
+        kolom = ", ".join(fields_order)
+        query = f"SELECT id, {kolom} FROM {tabel} WHERE {klausa} AND id > %s ORDER BY id LIMIT %s"
+
+        bagian = []
+        jumlah_baris = 0
+        id_terakhir = 0
+        while True:
+            with tahap("mysql:baca_halaman"):
+                cursor.execute(query, parameter + [id_terakhir, ukuran_halaman])
+                baris = cursor.fetchall()
+            if not baris:
+                break
+            id_terakhir = baris[-1][0]
+            with tahap("mysql:halaman_ke_frame", baris=len(baris)):
+                bagian.append(_halaman_ke_frame([b[1:] for b in baris], fields_order))
+            jumlah_baris += len(baris)
+            if progress is not None:
+                progress(min(jumlah_baris / total, 1.0) if total else 1.0, jumlah_baris)
+            if len(baris) < ukuran_halaman:
+                break
+    finally:
+        cursor.close()
+
+    df = gabung_data(bagian) if bagian else kompakkan(pd.DataFrame(columns=fields_order))
+    return HasilQuery(df, fingerprint, filter_kasus)
@@ -0,0 +1,302 @@
+"""
+Agregat kasus per wilayah (kelurahan dan regency/kecamatan) dan peta choropleth-nya.
+
+AgregatWilayah menyimpan jumlah kasus dan jumlah label skor (Layak/Tidak Layak) per
+wilayah sebagai Counter, seperti RingkasanKasus: dihitung sekali per versi data
+(HasilPreprocessing.turunan) dan diperpanjang dengan baris tambahan saja.
+
+Batas wilayah dibaca dari berkas GeoJSON lokal (tanpa jaringan):
+    data/geo/kelurahan.geojson   satu fitur per kelurahan
+    data/geo/regency.geojson     satu fitur per regency (kecamatan)
+Folder bisa diganti lewat env TBC_GEO_DIR (atau argumen folder). Nama wilayah diambil dari
+properti fitur pertama yang ada di PROPERTI_NAMA, lalu dicocokkan dengan nilai kolom data
+tanpa membedakan huruf besar/kecil dan awalan "Kelurahan"/"Kecamatan". Jika berkas tidak
+ada, peta tidak dibuat dan halaman memakai grafik batang wilayah teratas + tabel agregat.
+data/geo_contoh berisi batas sintetis (bukan batas resmi) untuk menguji jalur peta.
+
+Geometri disederhanakan (Douglas-Peucker) per tingkat detail dan disimpan di memori,
+jadi berganti tingkat detail atau ukuran tidak membaca dan menyederhanakan ulang berkas.
+"""
+import json
+import os
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from instrumen import tahap
+from ringkasan import nilai_kosong
+from skor import domain_skor
+
+# Kolom wilayah yang diagregasi -> label tampilan
+TINGKAT_WILAYAH = {"kelurahan": "Kelurahan", "regency": "Regency (kecamatan)"}
+DIR_GEO_CONTOH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "geo_contoh")
+DIR_GEO = os.environ.get("TBC_GEO_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "geo"))
+# Properti fitur GeoJSON yang dicoba (berurutan) sebagai nama wilayah; WADMKD/WADMKC = batas wilayah BIG
+PROPERTI_NAMA = {
+    "kelurahan": ["kelurahan", "desa", "WADMKD", "NAMOBJ", "nama", "name"],
+    "regency": ["regency", "kecamatan", "WADMKC", "NAMOBJ", "nama", "name"],
+}
+# Toleransi penyederhanaan (derajat; 0.0001 ~ 11 m) per tingkat detail, kasar -> penuh
+TOLERANSI_DETAIL = {"Ringkas": 0.001, "Sedang": 0.0003, "Penuh": 0.0}
+# Label kolom persentase per domain skor
+LABEL_PERSEN = {
+    "rumah": "% Rumah Tidak Layak", "sanitasi": "% Sanitasi Tidak Layak", "perilaku": "% Perilaku Tidak Baik",
+}
+KOLOM_JUMLAH = "Jumlah Kasus"
+
+_AWALAN_WILAYAH = re.compile(r"^(kelurahan|kel|desa|kecamatan|kec)\.?\s+")
+
+
+def normal_nama(nama) -> str:
+    """Nama wilayah baku untuk pencocokan data <-> GeoJSON."""
+    nama = " ".join(str(nama).casefold().split())
+    return _AWALAN_WILAYAH.sub("", nama)
+
+
+class AgregatWilayah:
+    """
+    Jumlah kasus per wilayah (kasus[tingkat][nama]) dan jumlah label skor per wilayah
+    (label[tingkat][domain][(nama, label)]). Wilayah kosong disimpan dengan kunci None.
+    """
+
+    def __init__(self):
+        self.kasus = {tingkat: Counter() for tingkat in TINGKAT_WILAYAH}
+        self.label = {tingkat: {dom: Counter() for dom in domain_skor} for tingkat in TINGKAT_WILAYAH}
+
+    @classmethod
+    def dari_data(cls, df, skor=None):
+        agregat = cls()
+        agregat.tambah(df, skor)
+        return agregat
+
+    def tambah(self, df, skor=None):
+        """Menambahkan kasus df (sudah dibersihkan) dan hasil skornya. Mengembalikan self."""
+        with tahap("wilayah:agregat", baris=len(df)):
+            for tingkat in TINGKAT_WILAYAH:
+                if tingkat not in df.columns:
+                    continue
+                wilayah = df[tingkat]
+                jumlah = wilayah.value_counts(dropna=False, sort=False)
+                for nama, n in jumlah.items():
+                    if n:
+                        self.kasus[tingkat][None if nilai_kosong(nama) else nama] += int(n)
+                for dom, df_skor in (skor or {}).items():
+                    # Baris skor adalah potongan df (index sama), jadi wilayahnya diambil lewat index
+                    per_label = df_skor["Label"].groupby(
+                        wilayah.reindex(df_skor.index), observed=True, dropna=False
+                    ).value_counts()
+                    for (nama, label), n in per_label.items():
+                        if n:
+                            self.label[tingkat].setdefault(dom, Counter())[(None if nilai_kosong(nama) else nama, label)] += int(n)
+        return self
+
+    def salin(self):
+        baru = AgregatWilayah()
+        baru.kasus = {t: Counter(c) for t, c in self.kasus.items()}
+        baru.label = {t: {dom: Counter(c) for dom, c in per_dom.items()} for t, per_dom in self.label.items()}
+        return baru
+
+    def perpanjang(self, df_baru, skor_baru=None):
+        """Agregat baru = agregat ini + df_baru (objek ini tidak diubah, lihat HasilPreprocessing.tambah_baris)."""
+        return self.salin().tambah(df_baru, skor_baru)
+
+    def tabel(self, tingkat):
+        """
+        Satu baris per wilayah: nama, Jumlah Kasus, dan persentase label Tidak Layak per
+        domain skor (dari kasus wilayah itu yang punya skor). Urut jumlah kasus terbanyak.
+        """
+        kasus = {nama: n for nama, n in self.kasus[tingkat].items() if nama is not None}
+        tabel = pd.DataFrame({tingkat: list(kasus), KOLOM_JUMLAH: list(kasus.values())}, columns=[tingkat, KOLOM_JUMLAH])
+        for dom, counter in self.label[tingkat].items():
+            total, tidak_layak = Counter(), Counter()
+            for (nama, label), n in counter.items():
+                total[nama] += n
+                if label == "Tidak Layak":
+                    tidak_layak[nama] += n
+            tabel[LABEL_PERSEN.get(dom, dom)] = [
+                tidak_layak[nama] / total[nama] * 100 if total[nama] else np.nan for nama in tabel[tingkat]
+            ]
+        return tabel.sort_values(KOLOM_JUMLAH, ascending=False, kind="stable").reset_index(drop=True)
+
+    def tanpa_wilayah(self, tingkat):
+        return self.kasus[tingkat].get(None, 0)
+
+
+def _sederhanakan_ring(titik, toleransi):
+    """Douglas-Peucker untuk satu ring (array n x 2); ring tetap tertutup dan minimal 4 titik."""
+    if toleransi <= 0 or len(titik) <= 4:
+        return titik
+    simpan = np.zeros(len(titik), dtype=bool)
+    simpan[0] = simpan[-1] = True
+    tumpukan = [(0, len(titik) - 1)]
+    while tumpukan:
+        a, b = tumpukan.pop()
+        if b - a < 2:
+            continue
+        arah = titik[b] - titik[a]
+        relatif = titik[a + 1:b] - titik[a]
+        panjang = np.hypot(arah[0], arah[1])
+        if panjang:
+            jarak = np.abs(arah[0] * relatif[:, 1] - arah[1] * relatif[:, 0]) / panjang
+        else:
+            # Ring tertutup: titik awal = titik akhir, jadi pakai jarak ke titik itu
+            jarak = np.hypot(relatif[:, 0], relatif[:, 1])
+        i = int(jarak.argmax())
+        if jarak[i] > toleransi:
+            simpan[a + 1 + i] = True
+            tumpukan += [(a, a + 1 + i), (a + 1 + i, b)]
+    hasil = titik[simpan]
+    return hasil if len(hasil) >= 4 else titik
+
+
+def _sederhanakan_geometri(geometri, toleransi):
+    def poligon(ring_ring):
+        return [np.round(_sederhanakan_ring(np.asarray(ring, dtype=float), toleransi), 5).tolist() for ring in ring_ring]
+
+    if geometri["type"] == "Polygon":
+        return {"type": "Polygon", "coordinates": poligon(geometri["coordinates"])}
+    if geometri["type"] == "MultiPolygon":
+        return {"type": "MultiPolygon", "coordinates": [poligon(p) for p in geometri["coordinates"]]}
+    return geometri
+
+
+class BatasWilayah:
+    """
+    Fitur batas satu tingkat wilayah dari GeoJSON, dengan id fitur = nama baku
+    (normal_nama). Versi sederhana per tingkat detail dibuat sekali lalu disimpan.
+    """
+
+    def __init__(self, tingkat, geojson):
+        self.tingkat = tingkat
+        self.fitur = {}
+        self.nama = {}
+        for fitur in geojson.get("features", []):
+            properti = fitur.get("properties") or {}
+            nama = next((properti[k] for k in PROPERTI_NAMA[tingkat] if properti.get(k)), None)
+            if nama is None or not fitur.get("geometry"):
+                continue
+            kunci = normal_nama(nama)
+            # Wilayah yang terpecah ke beberapa fitur cukup memakai fitur pertama
+            if kunci not in self.fitur:
+                self.fitur[kunci] = fitur["geometry"]
+                self.nama[kunci] = str(nama)
+        self._per_detail = {}
+        self._lock = threading.Lock()
+        self.batas_koordinat = self._hitung_batas_koordinat()
+
+    def _hitung_batas_koordinat(self):
+        """(lon_min, lat_min, lon_max, lat_max) semua fitur, untuk titik tengah dan zoom peta."""
+        bagian = []
+        for geometri in self.fitur.values():
+            poligon = [geometri["coordinates"]] if geometri["type"] == "Polygon" else geometri.get("coordinates", [])
+            for ring_ring in poligon:
+                for ring in ring_ring:
+                    titik = np.asarray(ring, dtype=float)[:, :2]
+                    bagian.append(np.r_[titik.min(axis=0), titik.max(axis=0)])
+        if not bagian:
+            return None
+        bagian = np.array(bagian)
+        return (*bagian[:, :2].min(axis=0), *bagian[:, 2:].max(axis=0))
+
+    def tengah_dan_zoom(self):
+        """Titik tengah dan tingkat zoom peta agar semua fitur terlihat."""
+        if self.batas_koordinat is None:
+            return {"lat": 0, "lon": 0}, 1
+        lon_min, lat_min, lon_max, lat_max = self.batas_koordinat
+        rentang = max(lon_max - lon_min, (lat_max - lat_min) * 1.5, 1e-4)
+        zoom = float(np.clip(np.log2(360 / rentang), 0, 16))
+        return {"lat": (lat_min + lat_max) / 2, "lon": (lon_min + lon_max) / 2}, zoom
+
+    def geojson(self, detail="Sedang"):
+        """FeatureCollection dengan geometri yang disederhanakan sesuai tingkat detail."""
+        with self._lock:
+            if detail not in self._per_detail:
+                with tahap(f"peta:sederhanakan:{self.tingkat}", detail=detail):
+                    toleransi = TOLERANSI_DETAIL[detail]
+                    self._per_detail[detail] = {
+                        "type": "FeatureCollection",
+                        "features": [
+                            {"type": "Feature", "id": kunci, "properties": {"nama": self.nama[kunci]},
+                             "geometry": _sederhanakan_geometri(geometri, toleransi)}
+                            for kunci, geometri in self.fitur.items()
+                        ],
+                    }
+            return self._per_detail[detail]
+
+
+# Batas per tingkat dibaca sekali per proses (dibagi semua sesi); kunci ikut waktu ubah
+# berkas agar GeoJSON yang diganti terbaca tanpa restart
+_cache_batas = {}
+_lock_batas = threading.Lock()
+
+
+def path_geojson(tingkat, folder=None):
+    return os.path.join(folder or DIR_GEO, f"{tingkat}.geojson")
+
+
+def muat_batas(tingkat, folder=None):
+    """BatasWilayah untuk tingkat ini, atau None jika berkas GeoJSON tidak ada."""
+    path = path_geojson(tingkat, folder)
+    if not os.path.exists(path):
+        return None
+    kunci = (tingkat, path, os.path.getmtime(path))
+    with _lock_batas:
+        if kunci not in _cache_batas:
+            with tahap(f"peta:baca:{tingkat}"), open(path, encoding="utf-8") as f:
+                _cache_batas[kunci] = BatasWilayah(tingkat, json.load(f))
+        return _cache_batas[kunci]
+
+
+def tabel_peta(agregat: AgregatWilayah, batas: BatasWilayah, tingkat):
+    """
+    Tabel agregat ditambah kolom id (nama baku) dan "Ada di Peta"; wilayah di GeoJSON
+    yang tidak punya kasus ikut dengan jumlah 0 agar tetap tergambar di peta.
+    """
+    tabel = agregat.tabel(tingkat)
+    tabel["id"] = tabel[tingkat].map(normal_nama)
+    if batas is None:
+        tabel["Ada di Peta"] = False
+        return tabel
+    tabel["Ada di Peta"] = tabel["id"].isin(batas.fitur)
+    kosong = [kunci for kunci in batas.fitur if kunci not in set(tabel["id"])]
+    if kosong:
+        tabel = pd.concat([tabel, pd.DataFrame({
+            tingkat: [batas.nama[k] for k in kosong], KOLOM_JUMLAH: 0, "id": kosong, "Ada di Peta": True,
+        })], ignore_index=True)
+    return tabel
+
+
+def figur_peta(agregat: AgregatWilayah, tingkat="kelurahan", ukuran=KOLOM_JUMLAH, detail="Sedang", folder=None):
+    """Choropleth wilayah diwarnai `ukuran` (kolom AgregatWilayah.tabel), atau None jika GeoJSON tidak ada."""
+    batas = muat_batas(tingkat, folder)
+    if batas is None or not batas.fitur:
+        return None
+    tabel = tabel_peta(agregat, batas, tingkat)
+    if ukuran not in tabel.columns:
+        return None
+    tabel = tabel[tabel["Ada di Peta"]]
+    tengah, zoom = batas.tengah_dan_zoom()
+    # Peta MapLibre tanpa ubin latar ("white-bg"): hanya batas wilayah, tidak perlu jaringan
+    # (px.choropleth/geo selalu mengunduh topojson dunia, termasuk saat ekspor gambar)
+    fig = px.choropleth_map(
+        tabel,
+        geojson=batas.geojson(detail),
+        locations="id",
+        featureidkey="id",
+        color=ukuran,
+        hover_name=tingkat,
+        hover_data={"id": False, **{kol: ":.1f" for kol in LABEL_PERSEN.values() if kol in tabel.columns},
+                    KOLOM_JUMLAH: True},
+        color_continuous_scale="Reds",
+        map_style="white-bg",
+        center=tengah,
+        zoom=zoom,
+        opacity=0.85,
+        title=f"{ukuran} per {TINGKAT_WILAYAH[tingkat]}",
+    )
+    fig.update_layout(margin=dict(l=0, r=0, t=50, b=0), height=600)
+    return fig